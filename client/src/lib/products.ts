@@ -17,6 +17,22 @@ interface Metadata {
   }
 }
 
+interface CatalogProduct {
+  id: string
+  images: string[]
+  alt?: string
+}
+
+/**
+ * Precomputed by the scraper (catalog.json): brand -> model -> design name -> product,
+ * with the same brand/model/name rules as the filename parsing below
+ */
+interface Catalog {
+  version: number
+  image_base: string
+  brands: Record<string, Record<string, Record<string, CatalogProduct>>>
+}
+
 /**
  * Extract brand from filename
  * Examples:
@@ -38,7 +54,7 @@ function extractBrandFromFilename(filename: string): string {
   if (lower.includes('oneplus')) {
     return 'oneplus'
   }
-  if (lower.includes('xiaomi') || lower.includes('redmi') || lower.includes('mi')) {
+  if (lower.includes('xiaomi') || lower.includes('redmi') || /(?<![a-z0-9])mi(?![a-z0-9])/.test(lower)) {
     return 'xiaomi'
   }
   if (lower.includes('nothing')) {
@@ -240,9 +256,63 @@ function generateId(filename: string): string {
 }
 
 /**
- * Parse metadata and generate products
+ * Build a product with the storefront defaults
+ */
+function createProduct(id: string, name: string, brand: string, model: string, images: string[], alt: string): Product {
+  return {
+    id,
+    name,
+    description: `Premium ${brand === 'apple' ? 'iPhone' : brand} skin with ${name} design. High-quality materials and precision fit.`,
+    price: 499, // Default price
+    image: images[0],
+    images,
+    brand,
+    model,
+    inStock: true,
+    alt,
+  }
+}
+
+/**
+ * Load products from the scraper's precomputed catalog index, or null if it is unavailable
+ */
+async function loadProductsFromCatalog(): Promise<Product[] | null> {
+  try {
+    const response = await fetch('/catalog.json')
+    if (!response.ok) {
+      return null
+    }
+    
+    const catalog: Catalog = await response.json()
+    if (catalog.version !== 1 || !catalog.brands) {
+      return null
+    }
+    
+    const products: Product[] = []
+    for (const [brand, models] of Object.entries(catalog.brands)) {
+      for (const [model, designs] of Object.entries(models)) {
+        for (const [name, entry] of Object.entries(designs)) {
+          const images = entry.images.map(filename => `${catalog.image_base}${filename}`)
+          products.push(createProduct(entry.id, name, brand, model, images, entry.alt || name))
+        }
+      }
+    }
+    return products
+  } catch {
+    // Not deployed (or not JSON, e.g. the SPA fallback page): parse metadata.json instead
+    return null
+  }
+}
+
+/**
+ * Load products, preferring the precomputed catalog over parsing metadata.json
  */
 export async function loadProductsFromMetadata(): Promise<Product[]> {
+  const catalogProducts = await loadProductsFromCatalog()
+  if (catalogProducts) {
+    return catalogProducts
+  }
+  
   try {
     // Load metadata from public directory
     const response = await fetch('/metadata.json')
@@ -278,18 +348,7 @@ export async function loadProductsFromMetadata(): Promise<Product[]> {
         }
       } else {
         // Create new product
-        const product: Product = {
-          id: generateId(image.filename),
-          name,
-          description: `Premium ${brand === 'apple' ? 'iPhone' : brand} skin with ${name} design. High-quality materials and precision fit.`,
-          price: 499, // Default price
-          image: imagePath,
-          images: [imagePath],
-          brand,
-          model,
-          inStock: true,
-          alt: image.alt || name,
-        }
+        const product = createProduct(generateId(image.filename), name, brand, model, [imagePath], image.alt || name)
         productMap.set(productKey, product)
       }
     }
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: in-page background-image walker vs. the per-element handle loop
+
+Serves a synthetic large DOM from a local fixture server and times both
+ImageExtractor background scans against it.
+
+Usage: python3 benchmarks/bench_background_images.py [--elements 20000] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add scraper root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from playwright.async_api import async_playwright
+
+from benchmarks.fixture_server import FixtureServer, build_background_page
+from src.image_extractor import ImageExtractor
+
+
+async def time_call(func, repeat: int):
+    """Run an async callable `repeat` times, return (best seconds, last result)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+async def run(elements: int, repeat: int):
+    extractor = ImageExtractor()
+    
+    async with FixtureServer() as server:
+        server.add_page('/large.html', build_background_page(elements))
+        
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            page = await browser.new_page()
+            await page.goto(server.url('/large.html'), wait_until='load')
+            
+            dom_size = await page.evaluate("document.querySelectorAll('*').length")
+            print(f"DOM elements: {dom_size}")
+            
+            batch_time, batch_urls = await time_call(
+                lambda: extractor._collect_background_images_batch(page), repeat)
+            handle_time, handle_urls = await time_call(
+                lambda: extractor._collect_background_images_handles(page), repeat)
+            
+            await browser.close()
+    
+    print(f"{'method':<24}{'best (s)':>12}{'urls':>10}")
+    print(f"{'in-page walker':<24}{batch_time:>12.3f}{len(batch_urls):>10}")
+    print(f"{'handle loop':<24}{handle_time:>12.3f}{len(set(handle_urls)):>10}")
+    if batch_time > 0:
+        print(f"speedup: {handle_time / batch_time:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--elements', type=int, default=20000, help='Number of synthetic DOM rows')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per method (best is reported)')
+    args = parser.parse_args()
+    asyncio.run(run(args.elements, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: download cache hits, revalidations (304) and misses against a local stand-in CDN
+
+Serves images with ETag/Last-Modified/Cache-Control from the local fixture
+server and downloads the same set several times into one output directory:
+cold, stale (revalidated), changed upstream, refreshed, fresh (no requests)
+and finally a second image set under a cache size limit (LRU eviction). Each
+pass checks the cache's hit/revalidation/miss/eviction counts against the
+requests the server saw, and reports the time per pass.
+
+Usage: python3 benchmarks/bench_download_cache.py [--images 200] [--image-bytes 65536] [--concurrency 16]
+"""
+
+import argparse
+import asyncio
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add scraper root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.fixture_server import FixtureServer
+from src.image_downloader import ImageDownloader
+from src.logger import _backend
+
+
+def image_records(server: FixtureServer, prefix: str, count: int) -> list:
+    return [{'url': server.url(f"/cdn/shop/files/{prefix}-{idx}.png"), 'alt': '', 'title': ''}
+            for idx in range(count)]
+
+
+async def download_pass(server: FixtureServer, out_dir: Path, records: list, args,
+                        cache_max_bytes=None) -> dict:
+    """Download records once with a fresh downloader (cache loaded from disk), returns counts"""
+    for key in server.stats:
+        server.stats[key] = 0
+    downloader = ImageDownloader(out_dir, max_concurrent=args.concurrency, cache_max_bytes=cache_max_bytes)
+    start = time.perf_counter()
+    results = await downloader.download_images(records)
+    elapsed = time.perf_counter() - start
+    return dict(downloader.cache.stats,
+                saved=sum(1 for r in results if r),
+                requests=server.stats['image_requests'],
+                not_modified=server.stats['not_modified'],
+                cached_bytes=downloader.cache.total_bytes(),
+                seconds=elapsed)
+
+
+def check(name: str, counts: dict, expected: dict):
+    wrong = {key: (counts[key], value) for key, value in expected.items() if counts[key] != value}
+    assert not wrong, f"{name}: (got, expected) {wrong}"
+
+
+async def run(args):
+    _backend.console_handler.setLevel(logging.ERROR)
+    n = args.images
+    server = FixtureServer(image_bytes=args.image_bytes, validators=True, max_age=0)
+    await server.start()
+    out_dir = Path(tempfile.mkdtemp(prefix='bench_download_cache_'))
+    try:
+        records = image_records(server, 'design', n)
+        print(f"{n} images of {args.image_bytes} bytes, {args.concurrency} concurrent")
+        print(f"{'pass':<34}{'time (s)':>10}{'requests':>10}{'hits':>7}{'304s':>7}{'misses':>8}{'evicted':>9}")
+        
+        def report(name: str, counts: dict):
+            print(f"{name:<34}{counts['seconds']:>10.2f}{counts['requests']:>10}{counts['hits']:>7}"
+                  f"{counts['revalidations']:>7}{counts['misses']:>8}{counts['evictions']:>9}")
+        
+        passes = []
+        counts = await download_pass(server, out_dir, records, args)
+        check('cold', counts, {'saved': n, 'misses': n, 'requests': n, 'hits': 0, 'revalidations': 0})
+        passes.append(('cold', counts))
+        
+        counts = await download_pass(server, out_dir, records, args)
+        check('stale', counts, {'saved': n, 'revalidations': n, 'not_modified': n, 'misses': 0, 'hits': 0})
+        passes.append(('stale (max-age=0, 304)', counts))
+        
+        server.image_version += 1
+        counts = await download_pass(server, out_dir, records, args)
+        check('changed', counts, {'saved': n, 'misses': n, 'not_modified': 0, 'revalidations': 0})
+        passes.append(('changed upstream (new ETag)', counts))
+        
+        server.max_age = 3600
+        counts = await download_pass(server, out_dir, records, args)
+        check('refreshed', counts, {'saved': n, 'revalidations': n, 'not_modified': n})
+        passes.append(('revalidated, now max-age=3600', counts))
+        
+        counts = await download_pass(server, out_dir, records, args)
+        check('fresh', counts, {'saved': n, 'hits': n, 'requests': 0})
+        passes.append(('fresh (no requests)', counts))
+        
+        # A second image set under a limit of 1.5 sets: the first set is the least recently used
+        max_bytes = n * args.image_bytes * 3 // 2
+        counts = await download_pass(server, out_dir, image_records(server, 'other', n), args,
+                                     cache_max_bytes=max_bytes)
+        check('evict', counts, {'saved': n, 'misses': n})
+        assert counts['evictions'] > 0, "evict: nothing was evicted"
+        assert counts['cached_bytes'] <= max_bytes, f"evict: {counts['cached_bytes']} > {max_bytes} bytes"
+        passes.append((f"second set, limit {max_bytes // 1024} KiB", counts))
+        
+        for name, counts in passes:
+            report(name, counts)
+    finally:
+        await server.stop()
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=200, help="Images per set")
+    parser.add_argument('--image-bytes', type=int, default=64 * 1024, help="Size of each image")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent downloads")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
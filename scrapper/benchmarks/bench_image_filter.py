@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ImageFilter keyword classifier vs. the previous per-keyword any() scans
+
+Classifies synthetic image records (alt, title and URL built from keyword
+fragments and filler) with both and checks they agree.
+
+Usage: python3 benchmarks/bench_image_filter.py [--records 100000] [--seed 1]
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+# Add scraper root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.image_filter import ImageFilter, KeywordClassifier
+
+
+def legacy_classify(image_filter: ImageFilter, img: dict):
+    """The previous per-keyword substring checks, kept as the reference"""
+    alt_lower = img.get('alt', '').lower()
+    title_lower = img.get('title', '').lower()
+    url_lower = img.get('url', '').lower()
+    keywords = image_filter.keywords
+    is_design = any(keyword in alt_lower or keyword in title_lower or keyword in url_lower
+                    for keyword in keywords['design'])
+    is_phone = any(keyword in alt_lower or keyword in title_lower or keyword in url_lower
+                   for keyword in keywords['phone'])
+    is_excluded = any(kw in url_lower or kw in alt_lower for kw in keywords['excluded'])
+    return is_design, is_phone, is_excluded
+
+
+def build_records(count: int, image_filter: ImageFilter, seed: int) -> list:
+    """Image records that look like scraped Shopify images"""
+    rng = random.Random(seed)
+    words = [w for keywords in image_filter.keywords.values() for w in keywords]
+    filler = ['banner', 'collection', 'hero', 'back', 'front', 'v2', 'final', '1080x', 'web']
+
+    def phrase(n):
+        parts = []
+        for _ in range(n):
+            if rng.random() < 0.3:
+                parts.append(rng.choice(words))
+            elif rng.random() < 0.5:
+                parts.append(rng.choice(filler))
+            else:
+                parts.append(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))))
+        return parts
+
+    records = []
+    for _ in range(count):
+        name = '_'.join(phrase(rng.randint(2, 5)))
+        uid = ''.join(rng.choices('0123456789abcdef', k=32))
+        records.append({
+            'url': f"https://cdn.shopify.com/s/files/1/0000/files/{name}_{uid}.png?v=1759300487&width=4096",
+            'alt': ' '.join(phrase(rng.randint(0, 6))).title(),
+            'title': ' '.join(phrase(rng.randint(0, 2))),
+        })
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000, help="Number of synthetic image records")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed for the records")
+    args = parser.parse_args()
+    
+    image_filter = ImageFilter()
+    records = build_records(args.records, image_filter, args.seed)
+    
+    start = time.perf_counter()
+    legacy = [legacy_classify(image_filter, img) for img in records]
+    legacy_time = time.perf_counter() - start
+    
+    rows = [('legacy any() scans', legacy_time)]
+    engines = [('trie regex', False)]
+    if image_filter.classifier.automaton is not None:
+        engines.append(('aho-corasick', True))
+    else:
+        print("pyahocorasick not installed, timing the regex fallback only")
+    
+    for name, use_automaton in engines:
+        image_filter.classifier = KeywordClassifier(image_filter.keywords, use_automaton=use_automaton)
+        start = time.perf_counter()
+        compiled = [image_filter.classify(img) for img in records]
+        rows.append((name, time.perf_counter() - start))
+        mismatches = sum(1 for a, b in zip(legacy, compiled) if a != b)
+        print(f"{name}: {mismatches} classification mismatches out of {len(records)} records")
+    
+    print(f"{'classifier':<24}{'total (s)':>12}{'us/record':>12}{'speedup':>10}")
+    for name, seconds in rows:
+        print(f"{name:<24}{seconds:>12.3f}{seconds / len(records) * 1e6:>12.2f}{legacy_time / seconds:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: logging cost on the calling thread, synchronous handlers vs. the queue-based backend
+
+Logs per-image style DEBUG/INFO records the way the download loop does and
+reports how long the caller (i.e. the event loop) spends per record, with
+the file and console handlers called inline vs. on the listener thread.
+
+Usage: python3 benchmarks/bench_logging.py [--records 100000]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add scraper root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.logger import ScraperLogger, _backend
+
+
+def inline_logger(log_path: Path, console) -> logging.Logger:
+    """The previous setup: FileHandler + console StreamHandler called by the logging thread itself"""
+    logger = logging.getLogger('bench.inline')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    file_handler = logging.FileHandler(log_path)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    console_handler = logging.StreamHandler(console)
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+    logger.addHandler(file_handler)
+    logger.addHandler(console_handler)
+    return logger
+
+
+def run(records: int, log) -> float:
+    start = time.perf_counter()
+    for idx in range(records):
+        log(idx)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000, help="Records logged per mode")
+    args = parser.parse_args()
+    
+    work_dir = Path(tempfile.mkdtemp(prefix='bench_logging_'))
+    console = open(os.devnull, 'w')
+    try:
+        old = inline_logger(work_dir / 'inline.log', console)
+        
+        def log_inline(idx):
+            old.debug(f"Downloading: image_{idx}.jpg (attempt 1/3)")
+            if idx % 10 == 0:
+                old.info(f"Saved image_{idx}.jpg")
+        
+        inline_s = run(args.records, log_inline)
+        
+        # Same records through the queue backend, console silenced like above
+        _backend.console_handler.setStream(console)
+        new = ScraperLogger('bench.queued', str(work_dir / 'queued.log'))
+        
+        def log_queued(idx):
+            new.debug("Downloading: image_%d.jpg (attempt %d/%d)", idx, 1, 3)
+            if idx % 10 == 0:
+                new.info("Saved image_%d.jpg", idx)
+        
+        queued_s = run(args.records, log_queued)
+        start = time.perf_counter()
+        _backend.stop()
+        drain_s = time.perf_counter() - start
+        
+        print(f"{args.records} DEBUG records (+10% INFO), file + console handlers")
+        print(f"{'mode':<28}{'caller (s)':>12}{'us/record':>12}")
+        print(f"{'inline handlers':<28}{inline_s:>12.2f}{inline_s * 1e6 / args.records:>12.1f}")
+        print(f"{'queue + listener thread':<28}{queued_s:>12.2f}{queued_s * 1e6 / args.records:>12.1f}"
+              f"   (listener drained the rest in {drain_s:.2f}s)")
+    finally:
+        console.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
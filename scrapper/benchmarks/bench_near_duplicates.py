@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: near-duplicate grouping with multi-index hashing vs. all-pairs comparison
+
+Builds synthetic dHashes (designs rendered under several URLs/sizes, i.e. a
+base hash with a few flipped bits), groups them with NearDuplicateIndex and
+checks the groups against an all-pairs scan on a subset.
+
+Usage: python3 benchmarks/bench_near_duplicates.py [--images 100000] [--threshold 6] [--check 3000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add scraper root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.near_duplicates import NearDuplicateIndex, hamming
+
+
+def build_hashes(count: int, seed: int) -> list:
+    """(key, hex dHash, size) per image: up to 10 variants of each design, 0-4 bits apart from it"""
+    rng = random.Random(seed)
+    hashes = []
+    while len(hashes) < count:
+        base = rng.getrandbits(64)
+        for _ in range(rng.randint(1, 10)):
+            value = base
+            for _ in range(rng.randint(0, 4)):
+                value ^= 1 << rng.randrange(64)
+            hashes.append((len(hashes), f"{value:016x}", rng.randint(100, 4096)))
+    return hashes[:count]
+
+
+def group_all_pairs(hashes: list, threshold: int) -> list:
+    """Reference: the largest image left takes every other image within threshold of it, compared one by one"""
+    values = [int(h, 16) for _key, h, _size in hashes]
+    remaining = sorted(range(len(hashes)), key=lambda idx: (-hashes[idx][2], idx))
+    groups = []
+    while remaining:
+        kept = values[remaining[0]]
+        group = [idx for idx in remaining if hamming(values[idx], kept) <= threshold]
+        remaining = [idx for idx in remaining if hamming(values[idx], kept) > threshold]
+        if len(group) > 1:
+            groups.append(sorted(group))
+    return sorted(groups)
+
+
+def group_indexed(hashes: list, threshold: int) -> list:
+    index = NearDuplicateIndex(threshold)
+    for key, dhash, size in hashes:
+        index.add(key, dhash, size, size)
+    return index.groups()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=100000, help="Number of synthetic image hashes")
+    parser.add_argument('--threshold', type=int, default=6, help="Max Hamming distance within a group")
+    parser.add_argument('--check', type=int, default=3000, help="Subset size checked against all pairs")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+    
+    subset = build_hashes(args.check, args.seed)
+    start = time.perf_counter()
+    reference = group_all_pairs(subset, args.threshold)
+    pairs_time = time.perf_counter() - start
+    indexed = sorted(sorted(g) for g in group_indexed(subset, args.threshold))
+    print(f"{args.check} images: groups {'match' if indexed == reference else 'DIFFER'} "
+          f"({len(reference)} groups, all-pairs took {pairs_time:.2f}s)")
+    
+    hashes = build_hashes(args.images, args.seed)
+    start = time.perf_counter()
+    groups = group_indexed(hashes, args.threshold)
+    elapsed = time.perf_counter() - start
+    # All-pairs cost grows with n^2; extrapolated from the subset
+    estimate = pairs_time * (args.images / args.check) ** 2
+    print(f"{args.images} images: {len(groups)} groups, "
+          f"{sum(len(g) - 1 for g in groups)} duplicates in {elapsed:.2f}s "
+          f"(all-pairs estimate: {estimate:.0f}s, {estimate / elapsed:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
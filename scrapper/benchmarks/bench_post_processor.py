@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: image post-processing inline on the event loop vs. on the process pool
+
+Generates JPEGs, verifies/hashes/thumbnails them both ways and reports
+throughput and the worst event-loop stall (what concurrent downloads would
+feel) while processing runs.
+
+Usage: python3 benchmarks/bench_post_processor.py [--images 40] [--size 2048] [--workers 1,2,4]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add scraper root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from PIL import Image, ImageDraw
+
+from src.post_processor import PostProcessor, process_image, DEFAULT_THUMBNAIL_SIZES
+
+
+def make_images(directory: Path, count: int, size: int) -> list:
+    """JPEGs with gradients and shapes (so they compress like photos, not flat colour)"""
+    paths = []
+    for idx in range(count):
+        image = Image.linear_gradient('L').resize((size, size)).convert('RGB')
+        draw = ImageDraw.Draw(image)
+        for shape in range(20):
+            offset = (idx * 37 + shape * 101) % size
+            draw.ellipse((offset, offset // 2, offset + size // 8, offset // 2 + size // 8),
+                         fill=(shape * 12 % 256, idx * 7 % 256, 128))
+        path = directory / f"{idx:04d}{'%08x' % idx}.jpg"
+        image.save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Largest delay of a 10 ms timer while the benchmark runs"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(paths: list, work) -> tuple:
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    # Let the timer start before the work does
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await work(paths)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await lag_task
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=40, help="Number of generated images")
+    parser.add_argument('--size', type=int, default=2048, help="Width/height of the generated images")
+    parser.add_argument('--workers', default=f"1,{os.cpu_count() or 1}", help="Comma-separated pool sizes")
+    args = parser.parse_args()
+    
+    work_dir = Path(tempfile.mkdtemp(prefix='bench_post_'))
+    try:
+        paths = make_images(work_dir, args.images, args.size)
+        print(f"{args.images} JPEGs of {args.size}x{args.size}, {os.cpu_count()} CPUs")
+        rows = []
+        
+        async def inline(paths):
+            thumb_dir = work_dir / 'inline'
+            thumb_dir.mkdir()
+            for path in paths:
+                process_image(str(path), str(thumb_dir), DEFAULT_THUMBNAIL_SIZES, 80)
+        
+        rows.append(('inline (event loop)',) + asyncio.run(run(paths, inline)))
+        
+        for workers in sorted({int(w) for w in args.workers.split(',')}):
+            processor = PostProcessor(work_dir / f"pool{workers}", workers=workers)
+            
+            async def pooled(paths):
+                await asyncio.gather(*(processor.process(path) for path in paths))
+            
+            processor.start()
+            try:
+                rows.append((f"process pool x{workers}",) + asyncio.run(run(paths, pooled)))
+            finally:
+                processor.shutdown()
+        
+        baseline = rows[0][1]
+        print(f"{'mode':<24}{'total (s)':>12}{'images/s':>12}{'speedup':>10}{'max loop stall (ms)':>22}")
+        for name, seconds, lag in rows:
+            print(f"{name:<24}{seconds:>12.2f}{args.images / seconds:>12.1f}"
+                  f"{baseline / seconds:>9.1f}x{lag * 1000:>22.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: product JSON fast path with one pooled session vs. a new session per product
+
+Serves synthetic Shopify product JSON (/products/<handle>.js) from the local
+fixture server and reads every product's images and brands/models, reporting
+products per second and the per-product cost.
+
+Usage: python3 benchmarks/bench_product_json.py [--products 2000] [--variants 60] [--images 40]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add scraper root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.fixture_server import FixtureServer
+from src.shopify_product import ShopifyProductFetcher
+
+
+def build_product(idx: int, variants: int, images: int) -> dict:
+    """product.js payload: Brand/Model/Design options, one image per design"""
+    brands = ['Apple', 'Samsung', 'Google', 'OnePlus']
+    return {
+        'title': f"Skin {idx}",
+        'options': ['Brand', 'Model', 'Design'],
+        'images': [f"/img/skin{idx}-design{n}.png?v=1" for n in range(images)],
+        'variants': [
+            {
+                'option1': brands[n % len(brands)],
+                'option2': f"{brands[n % len(brands)]} Phone {n // len(brands)}",
+                'option3': f"Design {n % images}",
+                'title': f"Variant {n}"
+            }
+            for n in range(variants)
+        ]
+    }
+
+
+async def read_all(fetcher: ShopifyProductFetcher, urls: list, concurrency: int) -> int:
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def read(url):
+        async with semaphore:
+            return await fetcher.extract(url)
+    
+    results = await asyncio.gather(*(read(url) for url in urls))
+    return sum(1 for r in results if r)
+
+
+async def pooled(urls: list, concurrency: int) -> int:
+    async with ShopifyProductFetcher() as fetcher:
+        return await read_all(fetcher, urls, concurrency)
+
+
+async def session_per_product(urls: list, concurrency: int) -> int:
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def read(url):
+        async with semaphore:
+            async with ShopifyProductFetcher() as fetcher:
+                return await fetcher.extract(url)
+    
+    results = await asyncio.gather(*(read(url) for url in urls))
+    return sum(1 for r in results if r)
+
+
+async def run(args):
+    server = FixtureServer()
+    for idx in range(args.products):
+        server.add_json(f"/products/skin-{idx}.js", build_product(idx, args.variants, args.images))
+    await server.start()
+    try:
+        urls = [server.url(f"/products/skin-{idx}") for idx in range(args.products)]
+        print(f"{args.products} products, {args.variants} variants and {args.images} images each, "
+              f"{args.concurrency} concurrent")
+        print(f"{'mode':<24}{'total (s)':>12}{'products/s':>14}{'ms/product':>14}")
+        for name, mode in (('pooled session', pooled), ('session per product', session_per_product)):
+            start = time.perf_counter()
+            read = await mode(urls, args.concurrency)
+            elapsed = time.perf_counter() - start
+            assert read == args.products, f"{name}: read {read}/{args.products} products"
+            print(f"{name:<24}{elapsed:>12.2f}{args.products / elapsed:>14.0f}"
+                  f"{elapsed * 1000 / args.products:>14.2f}")
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=2000, help="Number of product pages")
+    parser.add_argument('--variants', type=int, default=60, help="Variants per product")
+    parser.add_argument('--images', type=int, default=40, help="Images per product")
+    parser.add_argument('--concurrency', type=int, default=16, help="Products read at the same time")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
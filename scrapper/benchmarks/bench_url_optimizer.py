@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: URLOptimizer rewrite engine vs. the previous per-call re.sub chain
+
+Runs both over a corpus of real image URLs captured by the scraper
+(client/public/metadata.json by default) and checks they agree.
+
+Usage: python3 benchmarks/bench_url_optimizer.py [--corpus metadata.json] [--repeat 200]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add scraper root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.url_optimizer import URLOptimizer, URLRewriter
+
+DEFAULT_CORPUS = Path(__file__).parent.parent.parent / 'client' / 'public' / 'metadata.json'
+
+
+def legacy_get_high_res_url(url: str) -> str:
+    """The previous implementation, kept as the reference for output and speed"""
+    url = re.sub(r'[?&](w|width|h|height|size|resize|scale)=\d+', '', url)
+    replacements = [
+        (r'_thumb', ''),
+        (r'_small', ''),
+        (r'_medium', ''),
+        (r'_large', ''),
+        (r'thumbnail', 'original'),
+        (r'thumb', 'original'),
+        (r'w_\d+', 'w_2048'),
+        (r'h_\d+', 'h_2048'),
+    ]
+    for pattern, replacement in replacements:
+        url = re.sub(pattern, replacement, url, flags=re.IGNORECASE)
+    if 'cdn.shopify.com' in url or 'shopifycdn.com' in url or 'cdn.shopifycdn.com' in url:
+        url = re.sub(r'[?&]width=\d+', '', url)
+        url = re.sub(r'[?&]height=\d+', '', url)
+        url = re.sub(r'[?&]quality=\d+', '', url)
+        url = re.sub(r'[?&]crop=\w+', '', url)
+        url = url.rstrip('?&')
+        if '?' in url:
+            url += '&width=4096&quality=100&format=auto'
+        else:
+            url += '?width=4096&quality=100&format=auto'
+    return url
+
+
+def load_corpus(path: Path) -> list:
+    """All image URLs (optimized and original) from a metadata.json"""
+    with open(path) as f:
+        metadata = json.load(f)
+    urls = []
+    for image in metadata.get('images', []):
+        for key in ('url', 'original_url'):
+            if image.get(key):
+                urls.append(image[key])
+    return urls
+
+
+def time_pass(func, urls: list, repeat: int) -> float:
+    """Seconds per URL over `repeat` passes of the corpus"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url in urls:
+            func(url)
+    return (time.perf_counter() - start) / (repeat * len(urls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', type=Path, default=DEFAULT_CORPUS, help="metadata.json to take URLs from")
+    parser.add_argument('--repeat', type=int, default=200, help="Passes over the corpus")
+    args = parser.parse_args()
+    
+    urls = load_corpus(args.corpus)
+    print(f"Corpus: {len(urls)} URLs ({len(set(urls))} distinct) from {args.corpus}")
+    
+    mismatches = [u for u in urls if legacy_get_high_res_url(u) != URLOptimizer.get_high_res_url(u)]
+    print(f"Output mismatches vs. legacy: {len(mismatches)}")
+    
+    # Uncached engine: a rewriter whose cache can hold nothing
+    uncached = URLRewriter(cache_size=0)
+    rows = [
+        ('legacy re.sub chain', time_pass(legacy_get_high_res_url, urls, args.repeat)),
+        ('compiled rules', time_pass(uncached.rewrite, urls, args.repeat)),
+        ('compiled + LRU', time_pass(URLOptimizer.get_high_res_url, urls, args.repeat)),
+    ]
+    
+    print(f"{'engine':<24}{'us/url':>10}{'speedup':>10}")
+    for name, seconds in rows:
+        print(f"{name:<24}{seconds * 1e6:>10.2f}{rows[0][1] / seconds:>9.1f}x")
+    print(f"LRU: {URLOptimizer.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
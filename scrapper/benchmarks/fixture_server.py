@@ -0,0 +1,273 @@
+"""
+Local aiohttp server for serving synthetic benchmark fixtures
+"""
+
+import asyncio
+import base64
+import html
+import json
+import random
+from typing import Dict, List, Optional
+from aiohttp import web
+
+
+# Smallest valid PNG (1x1, transparent) served for every fixture image
+PIXEL_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII='
+)
+
+
+# Last-Modified of every fixture image (with validators)
+LAST_MODIFIED = 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+# Brands and models offered in the storefront's device dropdowns
+STOREFRONT_DEVICES = {
+    'Apple': ['iPhone 15 Pro Max', 'iPhone 15 Pro', 'iPhone 15', 'iPhone 14 Pro Max', 'iPhone 14 Pro'],
+    'Samsung': ['Galaxy S24 Ultra', 'Galaxy S24', 'Galaxy S23'],
+    'Google': ['Pixel 8 Pro', 'Pixel 8'],
+}
+
+
+class FixtureServer:
+    """Serves in-memory HTML pages, JSON documents and placeholder images on localhost
+    
+    Images under /cdn/shop/files/ behave like a storefront CDN: each response
+    can be delayed (latency), a share of them fail with 503 (failure_rate,
+    seeded so runs are repeatable) and bodies are padded to image_bytes so
+    transfer sizes are realistic. Every name gets distinct bytes.
+    
+    With validators, images carry an ETag, Last-Modified and Cache-Control
+    max-age (max_age) and a matching If-None-Match gets a 304. Bumping
+    image_version changes every image's bytes and ETag.
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 failure_rate: float = 0.0, image_bytes: int = 0, seed: int = 1,
+                 validators: bool = False, max_age: int = 0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.image_bytes = image_bytes
+        self.validators = validators
+        self.max_age = max_age
+        self.image_version = 1
+        self.pages: Dict[str, str] = {}
+        self.documents: Dict[str, str] = {}
+        self.base_url: Optional[str] = None
+        self.stats = {'image_requests': 0, 'image_failures': 0, 'image_bytes': 0, 'not_modified': 0}
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        
+        self.app = web.Application()
+        self.app.router.add_get('/img/{name}', self._handle_image)
+        self.app.router.add_get('/cdn/shop/files/{name}', self._handle_cdn_image)
+        self.app.router.add_get('/{path:.*}', self._handle_page)
+    
+    def add_page(self, path: str, html: str):
+        """Register an HTML page under the given path"""
+        self.pages['/' + path.lstrip('/')] = html
+    
+    def add_json(self, path: str, data):
+        """Register a JSON document under the given path"""
+        self.documents['/' + path.lstrip('/')] = json.dumps(data)
+    
+    def add_product(self, handle: str, product: Dict, **page_options) -> str:
+        """Register a storefront product page and its /products/<handle>.js, returns the page URL path"""
+        path = f"/products/{handle}"
+        self.add_page(path, build_storefront_page(product, **page_options))
+        self.add_json(f"{path}.js", product)
+        return path
+    
+    def url(self, path: str) -> str:
+        """Absolute URL of a fixture path"""
+        return f"{self.base_url}/{path.lstrip('/')}"
+    
+    async def _handle_page(self, request: web.Request) -> web.Response:
+        document = self.documents.get(request.path)
+        if document is not None:
+            return web.Response(text=document, content_type='application/json')
+        html = self.pages.get(request.path)
+        if html is None:
+            raise web.HTTPNotFound()
+        return web.Response(text=html, content_type='text/html')
+    
+    async def _handle_image(self, request: web.Request) -> web.Response:
+        return web.Response(body=PIXEL_PNG, content_type='image/png')
+    
+    async def _handle_cdn_image(self, request: web.Request) -> web.Response:
+        self.stats['image_requests'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.stats['image_failures'] += 1
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        name = request.match_info['name']
+        headers = {}
+        if self.validators:
+            headers = {
+                'ETag': f'"{self.image_version}-{name}"',
+                'Last-Modified': LAST_MODIFIED,
+                'Cache-Control': f"max-age={self.max_age}",
+            }
+            if request.headers.get('If-None-Match') == headers['ETag']:
+                self.stats['not_modified'] += 1
+                return web.Response(status=304, headers=headers)
+        seed = name if self.image_version == 1 else f"{name}@{self.image_version}"
+        body = image_body(seed, self.image_bytes)
+        self.stats['image_bytes'] += len(body)
+        return web.Response(body=body, content_type='image/png', headers=headers)
+    
+    async def start(self) -> str:
+        """Start the server and return its base URL"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+    
+    async def stop(self):
+        """Stop the server"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    async def __aenter__(self) -> 'FixtureServer':
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+
+def build_background_page(element_count: int = 20000, inline_every: int = 10,
+                          class_count: int = 50, image_set_every: int = 40) -> str:
+    """Build a large synthetic DOM with inline, stylesheet and image-set() backgrounds"""
+    rules = [
+        f".bg-{i} {{ background-image: url('/img/class-{i}.png'); }}"
+        for i in range(class_count)
+    ]
+    rows = []
+    for i in range(element_count):
+        if image_set_every and i % image_set_every == 0:
+            style = (f" style=\"background-image: image-set(url('/img/set-{i}.png') 1x, "
+                     f"url('/img/set-{i}@2x.png') 2x)\"")
+        elif inline_every and i % inline_every == 0:
+            style = f" style=\"background-image: url('/img/inline-{i}.png')\""
+        else:
+            style = ''
+        css_class = f"bg-{i % class_count}" if class_count and i % 7 == 0 else 'cell'
+        rows.append(f'<div class="{css_class}"{style}><span>{i}</span></div>')
+    
+    return (
+        '<!DOCTYPE html><html><head><style>'
+        + '\n'.join(rules)
+        + '</style></head><body>'
+        + '\n'.join(rows)
+        + '</body></html>'
+    )
+
+
+def image_body(name: str, size: int = 0) -> bytes:
+    """The placeholder PNG padded (after IEND, still decodable) to size bytes, distinct per name"""
+    padding = max(0, size - len(PIXEL_PNG))
+    seed = name.encode() or b'-'
+    return PIXEL_PNG + (seed * (padding // len(seed) + 1))[:padding]
+
+
+def build_storefront_product(handle: str, design_count: int = 64,
+                             devices: Optional[Dict[str, List[str]]] = None) -> Dict:
+    """product.js payload: Brand/Model/Design variants, one gallery image per design"""
+    devices = devices or STOREFRONT_DEVICES
+    designs = [f"Design {n + 1}" for n in range(design_count)]
+    images = [f"/cdn/shop/files/{handle}-design-{n + 1}.png?v=1700000000&width=600" for n in range(design_count)]
+    variants = []
+    for brand, models in devices.items():
+        for model in models:
+            for design in designs[:4]:
+                variants.append({'option1': brand, 'option2': model, 'option3': design,
+                                 'title': f"{brand} / {model} / {design}"})
+    return {
+        'title': f"Build Your Skin {handle}",
+        'handle': handle,
+        'options': ['Brand', 'Model', 'Design'],
+        'images': images,
+        'media': [{'media_type': 'image', 'src': src, 'alt': f"{design} phone skin"}
+                  for src, design in zip(images, designs)],
+        'variants': variants,
+    }
+
+
+def build_storefront_page(product: Dict, lazy: bool = True, eager_images: int = 4,
+                          background_every: int = 8, dropdowns: bool = True) -> str:
+    """Shopify-like product page for a build_storefront_product() payload
+    
+    Gallery <img>s with srcset (lazy ones keep the URL in data-src until an
+    IntersectionObserver swaps it in), design swatches as inline background
+    images, brand/model dropdowns where the model list follows the brand, the
+    embedded product JSON, and a logo/banner the filter should drop.
+    """
+    devices: Dict[str, List[str]] = {}
+    for variant in product['variants']:
+        models = devices.setdefault(variant['option1'], [])
+        if variant['option2'] not in models:
+            models.append(variant['option2'])
+    
+    gallery = []
+    for idx, media in enumerate(product['media']):
+        src = media['src']
+        base = src.split('&width=')[0]
+        srcset = ', '.join(f"{base}&width={width} {width}w" for width in (360, 720, 1080))
+        alt = html.escape(media['alt'])
+        if lazy and idx >= eager_images:
+            gallery.append(f'<img class="lazy" data-src="{src}" data-srcset="{srcset}" alt="{alt}" '
+                           f'width="600" height="600" style="display:block;min-height:600px">')
+        else:
+            gallery.append(f'<img src="{src}" srcset="{srcset}" alt="{alt}" width="600" height="600">')
+        if background_every and idx % background_every == 0:
+            gallery.append(f'<div class="swatch" style="background-image: url(\'{base}&width=100\')"></div>')
+    
+    selects = ''
+    if dropdowns:
+        brand_options = ''.join(f'<option value="{html.escape(b)}">{html.escape(b)}</option>' for b in devices)
+        selects = ('<select name="brand" id="brand-select"><option value="">Select Brand</option>'
+                   f'{brand_options}</select>'
+                   '<select name="model" id="model-select"><option value="">Select Model</option></select>')
+    
+    script = """
+    const devices = %s;
+    const brand = document.getElementById('brand-select');
+    const model = document.getElementById('model-select');
+    if (brand && model) {
+        brand.addEventListener('change', () => {
+            // Models arrive a little later, like an app fetching them
+            setTimeout(() => {
+                model.innerHTML = '<option value="">Select Model</option>' + (devices[brand.value] || [])
+                    .map(m => `<option value="${m}">${m}</option>`).join('');
+            }, 30);
+        });
+    }
+    const observer = new IntersectionObserver(entries => {
+        for (const entry of entries) {
+            if (!entry.isIntersecting) continue;
+            const img = entry.target;
+            img.srcset = img.dataset.srcset;
+            img.src = img.dataset.src;
+            observer.unobserve(img);
+        }
+    }, {rootMargin: '200px'});
+    document.querySelectorAll('img.lazy').forEach(img => observer.observe(img));
+    """ % json.dumps(devices)
+    
+    return (
+        '<!DOCTYPE html><html><head><title>' + html.escape(product['title']) + '</title></head><body>'
+        '<header><img src="/cdn/shop/files/logo.png" alt="logo" width="120" height="40"></header>'
+        '<img src="/cdn/shop/files/summer_banner.jpg?v=1" alt="Summer sale banner" width="1600" height="400">'
+        f'<h1>{html.escape(product["title"])}</h1>{selects}'
+        f'<div class="gallery">{"".join(gallery)}</div>'
+        '<script type="application/json" id="product-json">'
+        + json.dumps(product).replace('</', '<\\/')
+        + f'</script><script>{script}</script></body></html>'
+    )
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: the scraper's stages and whole runs against a local fixture storefront
+
+Serves synthetic Shopify-like product pages (gallery images, lazy loading,
+inline background images, brand/model dropdowns, product JSON) and a CDN
+with configurable latency, failure rate and image size from a local aiohttp
+server, so nothing touches the live site. Times URLOptimizer, ImageFilter,
+ImageDownloader, the product JSON reader and ImageExtractor one by one, then
+PhoneImageScraper end to end (product JSON path and browser path). Stages
+that need Chromium are recorded as skipped when it cannot be launched.
+
+Each run appends one JSON line to benchmarks/results.jsonl (settings, git
+commit and per-stage timings) and is compared with the last run recorded
+with the same settings.
+
+Usage: python3 benchmarks/run_benchmarks.py [--pages 4] [--images 64] [--latency 0.02] [--failure-rate 0.05]
+                                            [--repeat 3] [--stages url_optimizer,image_downloader]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Add scraper root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from playwright.async_api import async_playwright
+
+from benchmarks.fixture_server import FixtureServer, build_storefront_product
+from src.image_downloader import ImageDownloader
+from src.image_extractor import ImageExtractor
+from src.image_filter import ImageFilter
+from src.logger import _backend
+from src.scraper import PhoneImageScraper, BROWSER_ARGS, CONTEXT_OPTIONS
+from src.shopify_product import ShopifyProductFetcher
+from src.url_optimizer import URLOptimizer, _default_rewriter
+
+
+RESULTS_FILE = Path(__file__).parent / 'results.jsonl'
+
+STAGES = ['url_optimizer', 'image_filter', 'image_downloader', 'product_json',
+          'image_extractor', 'scrape_product_json', 'scrape_browser']
+BROWSER_STAGES = {'image_extractor', 'scrape_browser'}
+
+# Changes smaller than this are reported as noise
+NOISE = 0.05
+
+
+class Storefront:
+    """The fixture storefront of one benchmark run: server, product pages and their image records"""
+    
+    def __init__(self, args):
+        self.args = args
+        self.server = FixtureServer(latency=args.latency, failure_rate=args.failure_rate,
+                                    image_bytes=args.image_bytes, seed=args.seed)
+        self.products = [build_storefront_product(f"skin-{idx}", args.images) for idx in range(args.pages)]
+        self.paths = [
+            self.server.add_product(product['handle'], product, lazy=not args.no_lazy,
+                                    background_every=args.background_every, dropdowns=not args.no_dropdowns)
+            for product in self.products
+        ]
+    
+    @property
+    def urls(self) -> List[str]:
+        return [self.server.url(path) for path in self.paths]
+    
+    def image_records(self) -> List[Dict]:
+        """Image records shaped like the extractor's output, as the filter and downloader take them"""
+        records = []
+        for product in self.products:
+            for media in product['media']:
+                url = self.server.url(media['src'])
+                records.append({'url': URLOptimizer.get_high_res_url(url), 'original_url': url,
+                                'alt': media['alt'], 'title': '', 'type': 'img'})
+        return records
+    
+    def reset_stats(self):
+        for key in self.server.stats:
+            self.server.stats[key] = 0
+
+
+async def measure(repeat: int, run: Callable, setup: Optional[Callable] = None) -> Dict:
+    """Time `run` (an async callable returning a dict of details) `repeat` times"""
+    times = []
+    details: Dict = {}
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        details = await (run(state) if setup else run())
+        times.append(time.perf_counter() - start)
+    items = details.pop('items', None)
+    result = {
+        'status': 'ok',
+        'runs': repeat,
+        'best_s': round(min(times), 6),
+        'median_s': round(statistics.median(times), 6),
+    }
+    if items:
+        result['items'] = items
+        result['items_per_s'] = round(items / statistics.median(times), 1)
+    result.update(details)
+    return result
+
+
+async def bench_url_optimizer(store: Storefront, work_dir: Path) -> Dict:
+    # Every storefront URL at three widths, rewritten cold (cache cleared first)
+    urls = [f"{r['original_url']}&width={width}" for r in store.image_records() for width in (360, 720, 1080)]
+    
+    async def run(_state):
+        for url in urls:
+            URLOptimizer.get_high_res_url(url)
+        return {'items': len(urls)}
+    
+    return await measure(store.args.repeat, run, setup=_default_rewriter.rewrite.cache_clear)
+
+
+async def bench_image_filter(store: Storefront, work_dir: Path) -> Dict:
+    image_filter = ImageFilter()
+    records = store.image_records()
+    # Add the page chrome the filter has to drop
+    records += [{'url': store.server.url('/cdn/shop/files/logo.png'), 'alt': 'logo', 'title': ''},
+                {'url': store.server.url('/cdn/shop/files/summer_banner.jpg'), 'alt': 'Summer sale banner',
+                 'title': ''}] * store.args.pages
+    
+    async def run():
+        phone, design, other = image_filter.filter_images(records)
+        return {'items': len(records), 'phone': len(phone), 'design': len(design), 'other': len(other)}
+    
+    return await measure(store.args.repeat, run)
+
+
+async def bench_image_downloader(store: Storefront, work_dir: Path) -> Dict:
+    records = store.image_records()
+    
+    def setup():
+        # Fresh directory each run: nothing cached, everything over the (flaky) CDN
+        out_dir = Path(tempfile.mkdtemp(dir=work_dir, prefix='download_'))
+        store.reset_stats()
+        return ImageDownloader(out_dir, max_concurrent=store.args.concurrency, use_cache=False)
+    
+    async def run(downloader: ImageDownloader):
+        results = await downloader.download_images(records)
+        saved = sum(1 for r in results if r)
+        return {'items': saved, 'failed': len(records) - saved,
+                'cdn_requests': store.server.stats['image_requests'],
+                'cdn_failures': store.server.stats['image_failures'],
+                'bytes': store.server.stats['image_bytes']}
+    
+    result = await measure(store.args.repeat, run, setup=setup)
+    result['mb_per_s'] = round(result.pop('bytes') / result['median_s'] / 1e6, 2)
+    return result
+
+
+async def bench_product_json(store: Storefront, work_dir: Path) -> Dict:
+    async def run():
+        async with ShopifyProductFetcher() as fetcher:
+            results = await asyncio.gather(*(fetcher.extract(url) for url in store.urls))
+        return {'items': sum(1 for r in results if r), 'images': sum(len(r[0]) for r in results if r)}
+    
+    return await measure(store.args.repeat, run)
+
+
+async def bench_image_extractor(store: Storefront, work_dir: Path) -> Dict:
+    extractor = ImageExtractor()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=BROWSER_ARGS)
+        try:
+            context = await browser.new_context(**CONTEXT_OPTIONS)
+            page = await context.new_page()
+            url = store.urls[0]
+            await page.goto(url, wait_until='load')
+            
+            async def run():
+                images = await extractor.extract_images_from_page(page, url)
+                return {'items': len(images)}
+            
+            return await measure(store.args.repeat, run)
+        finally:
+            await browser.close()
+
+
+async def scrape(store: Storefront, work_dir: Path, product_json: bool) -> Dict:
+    def setup():
+        store.reset_stats()
+        out_dir = Path(tempfile.mkdtemp(dir=work_dir, prefix='scrape_'))
+        return PhoneImageScraper(output_dir=str(out_dir), max_concurrent_downloads=store.args.concurrency,
+                                 use_download_cache=False, product_json=product_json)
+    
+    stage_totals: Dict = {}
+    
+    async def run(scraper: PhoneImageScraper):
+        metadata = await scraper.scrape_many(store.urls)
+        stage_totals.clear()
+        stage_totals.update(scraper.metrics.stage_totals())
+        return {'items': metadata['images_downloaded'], 'pages': metadata.get('pages_scraped'),
+                'found': metadata['total_images_found']}
+    
+    result = await measure(store.args.repeat, run, setup=setup)
+    # Stage times of the last run, from the scraper's own run metrics
+    result['stages'] = {name: entry['total_s'] for name, entry in stage_totals.items()}
+    return result
+
+
+async def bench_scrape_product_json(store: Storefront, work_dir: Path) -> Dict:
+    return await scrape(store, work_dir, product_json=True)
+
+
+async def bench_scrape_browser(store: Storefront, work_dir: Path) -> Dict:
+    return await scrape(store, work_dir, product_json=False)
+
+
+async def browser_unavailable() -> Optional[str]:
+    """Why Chromium cannot be used here, or None if it launches"""
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            await browser.close()
+    except Exception as e:
+        return str(e).strip().splitlines()[0]
+    return None
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(results_file: Path, config: Dict) -> Optional[Dict]:
+    """The last recorded run with the same settings"""
+    previous = None
+    try:
+        with open(results_file, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('config') == config:
+                    previous = record
+    except OSError:
+        pass
+    return previous
+
+
+def print_results(record: Dict, previous: Optional[Dict]):
+    print(f"\n{'stage':<22}{'median (s)':>12}{'best (s)':>12}{'items/s':>12}{'vs. previous':>16}")
+    for name, result in record['stages'].items():
+        if result['status'] != 'ok':
+            print(f"{name:<22}{result['status']:>12}   {result.get('reason', '')}")
+            continue
+        change = ''
+        before = (previous or {}).get('stages', {}).get(name, {})
+        if before.get('status') == 'ok' and before['median_s']:
+            delta = result['median_s'] / before['median_s'] - 1
+            change = f"{delta:+.1%}" + ('' if abs(delta) >= NOISE else ' (noise)')
+        items_per_s = result.get('items_per_s')
+        print(f"{name:<22}{result['median_s']:>12.4f}{result['best_s']:>12.4f}"
+              f"{items_per_s if items_per_s is not None else '':>12}{change:>16}")
+    if previous:
+        print(f"\nCompared with run of {previous['timestamp']} (commit {previous.get('commit')})")
+
+
+async def run(args):
+    config = {
+        'pages': args.pages, 'images': args.images, 'lazy': not args.no_lazy,
+        'background_every': args.background_every, 'dropdowns': not args.no_dropdowns,
+        'latency': args.latency, 'failure_rate': args.failure_rate, 'image_bytes': args.image_bytes,
+        'concurrency': args.concurrency, 'repeat': args.repeat, 'seed': args.seed,
+    }
+    stages = args.stages.split(',') if args.stages else STAGES
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))} (choose from {', '.join(STAGES)})")
+    
+    no_browser = None
+    if BROWSER_STAGES & set(stages):
+        no_browser = 'disabled (--no-browser)' if args.no_browser else await browser_unavailable()
+    
+    store = Storefront(args)
+    work_dir = Path(tempfile.mkdtemp(prefix='scraper_bench_'))
+    results: Dict[str, Dict] = {}
+    await store.server.start()
+    try:
+        print(f"Fixture storefront at {store.server.base_url}: {args.pages} pages x {args.images} images, "
+              f"CDN latency {args.latency * 1000:.0f} ms, failure rate {args.failure_rate:.0%}")
+        for name in stages:
+            if name in BROWSER_STAGES and no_browser:
+                results[name] = {'status': 'skipped', 'reason': f"browser unavailable: {no_browser}"}
+                continue
+            print(f"  {name}...", flush=True)
+            try:
+                results[name] = await globals()[f"bench_{name}"](store, work_dir)
+            except Exception as e:
+                results[name] = {'status': 'error', 'reason': f"{type(e).__name__}: {e}"}
+    finally:
+        await store.server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    record = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'label': args.label,
+        'python': platform.python_version(),
+        'config': config,
+        'stages': results,
+    }
+    previous = load_previous(args.output, config)
+    print_results(record, previous)
+    
+    if not args.no_save:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        print(f"Recorded in {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=4, help="Product pages in the storefront")
+    parser.add_argument('--images', type=int, default=64, help="Gallery images per page")
+    parser.add_argument('--no-lazy', action='store_true', help="Load every gallery image eagerly")
+    parser.add_argument('--background-every', type=int, default=8,
+                        help="Inline background-image swatch after every Nth image (0 = none)")
+    parser.add_argument('--no-dropdowns', action='store_true', help="Leave out the brand/model selects")
+    parser.add_argument('--latency', type=float, default=0.02, help="CDN delay per image in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.05, help="Share of image requests failing with 503")
+    parser.add_argument('--image-bytes', type=int, default=64 * 1024, help="Size of each served image")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent downloads")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per stage (median and best are reported)")
+    parser.add_argument('--seed', type=int, default=1, help="Seed of the CDN failure pattern")
+    parser.add_argument('--stages', help=f"Comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument('--no-browser', action='store_true', help="Skip the stages that need Chromium")
+    parser.add_argument('--label', help="Free-form note stored with the results (e.g. the change being measured)")
+    parser.add_argument('--output', type=Path, default=RESULTS_FILE, help="Results file (JSON lines)")
+    parser.add_argument('--no-save', action='store_true', help="Print the results without recording them")
+    parser.add_argument('--verbose', action='store_true',
+                        help="Show the scraper's log output (503s from the flaky CDN included)")
+    args = parser.parse_args()
+    
+    if not args.verbose:
+        _backend.console_handler.setLevel(logging.ERROR)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 Main entry point for the phone image scraper
 """
 
+import argparse
 import asyncio
 import sys
 from pathlib import Path
@@ -14,48 +15,159 @@ from src.scraper import PhoneImageScraper
 from src.logger import get_logger
 
 
+DEFAULT_URL = "https://www.layers.shop/products/build-your-skin"
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Phone Image Scraper")
+    parser.add_argument('url', nargs='?', help=f"Page to scrape (default: {DEFAULT_URL})")
+    parser.add_argument('output_dir', nargs='?', default="scraped_images", help="Output directory")
+    parser.add_argument('max_concurrent', nargs='?', default="5", help="Max concurrent downloads (default: 5)")
+    parser.add_argument('--urls-file', help="Crawl mode: file with one page URL per line")
+    parser.add_argument('--sitemap', help="Crawl mode: sitemap (or sitemap index) URL to read page URLs from")
+    parser.add_argument('--sitemap-filter', help="Only crawl sitemap URLs containing this text (e.g. /products/)")
+    parser.add_argument('--pages', type=int, default=4, help="Crawl mode: pages scraped concurrently (default: 4)")
+    parser.add_argument('--block-profile', default='off',
+                        help="Request blocking profile: off, balanced, lean or a JSON file (default: off)")
+    parser.add_argument('--measure-blocking', action='store_true',
+                        help="Load the URL with and without the blocking profile, report bytes/time saved and exit")
+    parser.add_argument('--readiness-config',
+                        help="JSON file with page-settle quiet window/ceiling (ms), optionally per site")
+    parser.add_argument('--no-scroll', action='store_true',
+                        help="Don't scroll pages to trigger lazy-loaded images")
+    parser.add_argument('--keywords',
+                        help="JSON file with design/phone/excluded keyword lists for image filtering")
+    parser.add_argument('--min-image-size', type=int, default=0,
+                        help="Probe image sizes first (one extra ranged GET per image); images smaller "
+                             "than this (px, longest side) are downloaded last. 0 disables probing (default: 0)")
+    parser.add_argument('--skip-small-images', action='store_true',
+                        help="Don't download images below --min-image-size at all")
+    parser.add_argument('--max-concurrent-limit', type=int,
+                        help="Let adaptive download concurrency grow from max_concurrent up to this "
+                             "(default: max_concurrent is the ceiling, concurrency only backs off)")
+    parser.add_argument('--fixed-concurrency', action='store_true',
+                        help="Keep download concurrency at max_concurrent instead of adapting it")
+    parser.add_argument('--connections-per-host', type=int,
+                        help="Max open connections per image host (default: 16)")
+    parser.add_argument('--post-process', action='store_true',
+                        help="Verify each downloaded image, record its size and perceptual hash "
+                             "and write WebP thumbnails (on a process pool)")
+    parser.add_argument('--post-workers', type=int, help="Post-processing worker processes (default: CPU count)")
+    parser.add_argument('--thumbnail-sizes', default='480',
+                        help="Comma-separated WebP thumbnail sizes in px, longest side (default: 480)")
+    parser.add_argument('--drop-corrupt', action='store_true',
+                        help="With --post-process, delete images that fail to decode")
+    parser.add_argument('--near-duplicates', type=int, nargs='?', const=6, metavar='BITS',
+                        help="Group images whose perceptual hashes differ by at most BITS of 64 (default: 6) "
+                             "and keep only the largest of each group in metadata.json (implies --post-process)")
+    parser.add_argument('--no-product-json', action='store_true',
+                        help="Always load pages in the browser, even Shopify product pages whose "
+                             "product JSON could be read directly")
+    parser.add_argument('--no-catalog', action='store_true',
+                        help="Don't write catalog.json (products by brand, model and design) after the run")
+    parser.add_argument('--metrics-file',
+                        help="Prometheus textfile to write run metrics to (default: <output_dir>/metrics.prom)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run: skip pages and images its run journal lists as done")
+    parser.add_argument('--delta', action='store_true',
+                        help="Only extract and download pages that changed since the last run in the output "
+                             "directory (by page fingerprint); delta.json lists the images added and removed")
+    parser.add_argument('--rebuild-metadata', action='store_true',
+                        help="Rebuild metadata.json and catalog.json from the output directory's "
+                             "metadata.jsonl (e.g. after an interrupted run) and exit")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore the download cache and fetch every image")
+    parser.add_argument('--cache-max-mb', type=int, help="Evict least recently used cached images above this size")
+    return parser.parse_args()
+
+
+def read_urls_file(path: str) -> list:
+    """Read page URLs from a file, skipping blank lines and # comments"""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
 async def main():
     """Main function"""
-    # Default URL
-    url = "https://www.layers.shop/products/build-your-skin"
-    
-    # Allow URL to be passed as command line argument
-    if len(sys.argv) > 1:
-        url = sys.argv[1]
-    
-    # Allow output directory to be passed as second argument
-    output_dir = "scraped_images"
-    if len(sys.argv) > 2:
-        output_dir = sys.argv[2]
+    args = parse_args()
+    output_dir = args.output_dir
     
     # Allow max concurrent downloads as third argument
     max_concurrent = 5
-    if len(sys.argv) > 3:
-        try:
-            max_concurrent = int(sys.argv[3])
-        except ValueError:
-            logger = get_logger()
-            logger.warning(f"Invalid max_concurrent value '{sys.argv[3]}', using default: 5")
+    try:
+        max_concurrent = int(args.max_concurrent)
+    except ValueError:
+        logger = get_logger()
+        logger.warning(f"Invalid max_concurrent value '{args.max_concurrent}', using default: 5")
+    
+    # Crawl mode when a URL list or sitemap is given
+    crawl_urls = read_urls_file(args.urls_file) if args.urls_file else []
+    crawl_mode = bool(crawl_urls or args.sitemap)
+    if crawl_mode and args.url:
+        crawl_urls.insert(0, args.url)
+    url = args.url or DEFAULT_URL
     
     logger = get_logger("Main")
     logger.info("=" * 60)
     logger.info("Phone Image Scraper")
     logger.info("=" * 60)
-    logger.info(f"URL: {url}")
+    if crawl_mode:
+        logger.info(f"URLs: {len(crawl_urls)} listed" + (f" + sitemap {args.sitemap}" if args.sitemap else ""))
+        logger.info(f"Concurrent pages: {args.pages}")
+    else:
+        logger.info(f"URL: {url}")
     logger.info(f"Output directory: {output_dir}")
-    logger.info(f"Max concurrent downloads: {max_concurrent}")
+    if args.max_concurrent_limit and not args.fixed_concurrency:
+        logger.info(f"Concurrent downloads: starting at {max_concurrent}, "
+                    f"max {max(args.max_concurrent_limit, max_concurrent)}")
+    else:
+        logger.info(f"Max concurrent downloads: {max_concurrent}")
     logger.info("=" * 60)
     logger.info("")
     
     log_file = str(Path(output_dir) / 'scraper.log')
     scraper = PhoneImageScraper(
-        output_dir=output_dir, 
+        output_dir=output_dir,
         max_concurrent_downloads=max_concurrent,
-        log_file=log_file
+        log_file=log_file,
+        use_download_cache=not args.no_cache,
+        download_cache_max_bytes=args.cache_max_mb * 1024 * 1024 if args.cache_max_mb else None,
+        blocking_profile=args.block_profile,
+        readiness_config=args.readiness_config,
+        auto_scroll=not args.no_scroll,
+        keywords_file=args.keywords,
+        min_image_size=args.min_image_size,
+        skip_small_images=args.skip_small_images,
+        adaptive_concurrency=not args.fixed_concurrency,
+        max_concurrent_limit=args.max_concurrent_limit,
+        connections_per_host=args.connections_per_host,
+        resume=args.resume,
+        post_process=args.post_process,
+        post_process_workers=args.post_workers,
+        thumbnail_sizes=[int(size) for size in args.thumbnail_sizes.split(',') if size.strip()],
+        drop_corrupt=args.drop_corrupt,
+        near_duplicate_threshold=args.near_duplicates,
+        product_json=not args.no_product_json,
+        build_catalog=not args.no_catalog,
+        metrics_file=args.metrics_file,
+        delta=args.delta
     )
     
     try:
-        await scraper.scrape_page(url)
+        if args.rebuild_metadata:
+            if not scraper.rebuild_metadata():
+                sys.exit(1)
+        elif args.measure_blocking:
+            await scraper.measure_blocking(url)
+        elif crawl_mode:
+            await scraper.scrape_many(
+                urls=crawl_urls,
+                sitemap_url=args.sitemap,
+                max_concurrent_pages=args.pages,
+                sitemap_filter=args.sitemap_filter
+            )
+        else:
+            await scraper.scrape_page(url)
     except KeyboardInterrupt:
         logger.warning("\nScraping interrupted by user.")
         sys.exit(1)
@@ -66,4 +178,3 @@ async def main():
 
 if __name__ == "__main__":
     asyncio.run(main())
-
@@ -0,0 +1,171 @@
+"""
+Adaptive (AIMD) concurrency limit for downloads
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional
+from .logger import get_logger
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that grows while requests go well and halves on trouble
+    
+    Additive increase: after `limit` fast successful requests the limit goes up
+    by one (about once per round of requests), as long as the smoothed latency
+    stays within latency_factor of the best latency seen. Multiplicative
+    decrease: a 429, 5xx, timeout or Retry-After multiplies the limit by
+    decrease_factor (at most once per cooldown). Retry-After also pauses all new
+    requests until it expires. Slots are handed out in FIFO order.
+    """
+    
+    def __init__(self, initial: int = 5, min_limit: int = 1, max_limit: int = 32,
+                 latency_factor: float = 2.0, decrease_factor: float = 0.5,
+                 cooldown: float = 1.0, sample_interval: float = 1.0):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, initial)
+        self.latency_factor = latency_factor
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.sample_interval = sample_interval
+        self.logger = get_logger("AdaptiveLimiter")
+        self.reset()
+    
+    def reset(self):
+        """Start a new run (limit back to initial, empty timeline)"""
+        self.limit = self.initial
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.peak_limit = self.limit
+        self.timeline: List[Dict] = []
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._paused_until = 0.0
+        self._wake_handle = None
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._latency_ewma: Optional[float] = None
+        self._best_latency: Optional[float] = None
+        self._start = time.monotonic()
+        self._last_sample = {'time': self._start, 'requests': 0, 'errors': 0, 'bytes': 0}
+    
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one unit of concurrency for the duration of the block"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+    
+    async def acquire(self):
+        """Wait for a free slot"""
+        if not self._waiters and self.in_flight < self.limit and time.monotonic() >= self._paused_until:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._wake()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was already handed to us
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+    
+    def release(self):
+        """Give a slot back"""
+        self.in_flight -= 1
+        self._wake()
+    
+    def _wake(self):
+        """Hand free slots to waiters (the slot is taken on their behalf)"""
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            if self._wake_handle is None:
+                self._wake_handle = asyncio.get_running_loop().call_later(delay, self._end_pause)
+            return
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+    
+    def _end_pause(self):
+        self._wake_handle = None
+        self._wake()
+    
+    def record(self, status: Optional[int], latency: float, nbytes: int = 0,
+               retry_after: Optional[float] = None):
+        """Feed back the outcome of one request
+        
+        Args:
+            status: HTTP status, or None for a timeout/connection error
+            latency: seconds until the response headers arrived
+            nbytes: body bytes received
+            retry_after: seconds from a Retry-After header
+        """
+        now = time.monotonic()
+        self.requests += 1
+        self.bytes += nbytes
+        
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+        if status is None or status == 429 or status >= 500 or retry_after:
+            self.errors += 1
+            if now - self._last_decrease >= self.cooldown:
+                old_limit = self.limit
+                self.limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+                self._last_decrease = now
+                self._successes = 0
+                self.logger.debug(f"Backing off: concurrency {old_limit} -> {self.limit} "
+                                  f"(status {status}, retry after {retry_after})")
+        else:
+            self._latency_ewma = latency if self._latency_ewma is None else 0.7 * self._latency_ewma + 0.3 * latency
+            self._best_latency = min(self._best_latency or self._latency_ewma, self._latency_ewma)
+            if self._latency_ewma <= self.latency_factor * self._best_latency:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self.peak_limit = max(self.peak_limit, self.limit)
+                    self._successes = 0
+                    self._wake()
+        
+        if now - self._last_sample['time'] >= self.sample_interval:
+            self.sample(now)
+    
+    def sample(self, now: Optional[float] = None):
+        """Append a point to the timeline (throughput since the previous point)"""
+        now = now or time.monotonic()
+        elapsed = max(now - self._last_sample['time'], 1e-6)
+        self.timeline.append({
+            't': round(now - self._start, 2),
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'requests_per_s': round((self.requests - self._last_sample['requests']) / elapsed, 2),
+            'bytes_per_s': round((self.bytes - self._last_sample['bytes']) / elapsed),
+            'errors': self.errors - self._last_sample['errors'],
+            'latency_ms': round(self._latency_ewma * 1000, 1) if self._latency_ewma is not None else None,
+        })
+        self._last_sample = {'time': now, 'requests': self.requests, 'errors': self.errors, 'bytes': self.bytes}
+    
+    def summary(self) -> Dict:
+        """Totals and the concurrency/throughput timeline of the run"""
+        elapsed = max(time.monotonic() - self._start, 1e-6)
+        return {
+            'final_limit': self.limit,
+            'peak_limit': self.peak_limit,
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'bytes_per_s': round(self.bytes / elapsed),
+            'timeline': self.timeline,
+        }
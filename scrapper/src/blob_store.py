@@ -0,0 +1,238 @@
+"""
+Content-addressed image store with URL-to-blob index
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+import aiofiles
+from .image_index import canonicalize_url
+from .logger import get_logger
+
+
+class BlobWriter:
+    """Hashes bytes while they stream in and stores them as a blob on commit
+
+    Data stays in memory until spill_bytes is exceeded, so bytes that turn out
+    to be a duplicate of an existing blob usually never touch the disk.
+    """
+    
+    def __init__(self, store: 'BlobStore', spill_bytes: int):
+        self.store = store
+        self.spill_bytes = spill_bytes
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self._buffer: List[bytes] = []
+        self._tmp_path: Optional[Path] = None
+        self._tmp_file = None
+    
+    async def write(self, chunk: bytes):
+        """Add a chunk of the body"""
+        self.digest.update(chunk)
+        self.size += len(chunk)
+        if self._tmp_file is None:
+            self._buffer.append(chunk)
+            if self.size > self.spill_bytes:
+                await self._spill()
+        else:
+            await self._tmp_file.write(chunk)
+    
+    async def _spill(self):
+        """Move the in-memory buffer to a temp file"""
+        self._tmp_path = self.store.tmp_dir / uuid.uuid4().hex
+        self._tmp_path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_file = await aiofiles.open(self._tmp_path, 'wb')
+        for chunk in self._buffer:
+            await self._tmp_file.write(chunk)
+        self._buffer.clear()
+    
+    async def commit(self, ext: str) -> Path:
+        """Store the blob (unless identical bytes are already stored), returns its path"""
+        blob_path = self.store.blob_path(self.digest.hexdigest(), ext)
+        if self._tmp_file is not None:
+            await self._tmp_file.close()
+            self._tmp_file = None
+        
+        if blob_path.exists():
+            self.store.stats['duplicate_bytes'] += self.size
+            await self.abort()
+            return blob_path
+        
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        if self._tmp_path is None:
+            # Write via a temp file so a crash never leaves a partial blob
+            self._tmp_path = self.store.tmp_dir / uuid.uuid4().hex
+            self._tmp_path.parent.mkdir(parents=True, exist_ok=True)
+            async with aiofiles.open(self._tmp_path, 'wb') as f:
+                await f.write(b''.join(self._buffer))
+            self._buffer.clear()
+        
+        # Create-if-absent: a concurrent download of the same bytes may have won the race
+        try:
+            os.link(self._tmp_path, blob_path)
+            self.store.stats['blobs_written'] += 1
+        except FileExistsError:
+            self.store.stats['duplicate_bytes'] += self.size
+        except OSError:
+            # No hard link support, fall back to an (atomic) rename
+            os.replace(self._tmp_path, blob_path)
+            self._tmp_path = None
+            self.store.stats['blobs_written'] += 1
+        await self.abort()
+        return blob_path
+    
+    async def abort(self):
+        """Discard everything written so far"""
+        self._buffer.clear()
+        if self._tmp_file is not None:
+            await self._tmp_file.close()
+            self._tmp_file = None
+        if self._tmp_path is not None:
+            try:
+                self._tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+            self._tmp_path = None
+
+
+class BlobStore:
+    """Stores each distinct image body once under its sha256 and maps URLs to blobs
+
+    Layout inside root_dir:
+        blobs/<aa>/<sha256><ext>   one file per distinct content
+        blob_index.json            canonical URL -> blob, plus exported names
+        <filename>                 readable hard link to the blob (for the client)
+    """
+    
+    def __init__(self, root_dir: Path, export_names: bool = True, spill_bytes: int = 8 * 1024 * 1024):
+        self.root_dir = Path(root_dir)
+        self.blobs_dir = self.root_dir / 'blobs'
+        self.tmp_dir = self.blobs_dir / '.tmp'
+        self.index_path = self.root_dir / 'blob_index.json'
+        self.export_names = export_names
+        self.spill_bytes = spill_bytes
+        self.logger = get_logger("BlobStore")
+        self.urls: Dict[str, Dict] = {}
+        self.names: Dict[str, str] = {}
+        self.stats = {'blobs_written': 0, 'duplicate_bytes': 0}
+    
+    def load(self):
+        """Load the URL index from disk"""
+        self.stats = {'blobs_written': 0, 'duplicate_bytes': 0}
+        # Partial blobs left behind by an interrupted run
+        if self.tmp_dir.exists():
+            for tmp_path in self.tmp_dir.iterdir():
+                tmp_path.unlink(missing_ok=True)
+        if not self.index_path.exists():
+            return
+        try:
+            with open(self.index_path) as f:
+                data = json.load(f)
+            self.urls = data.get('urls', {})
+            self.names = data.get('names', {})
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable blob index {self.index_path}: {e}")
+    
+    def save(self):
+        """Write the URL index to disk (atomically)"""
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'urls': self.urls, 'names': self.names}, f)
+        os.replace(tmp_path, self.index_path)
+    
+    def blob_path(self, blob_id: str, ext: str) -> Path:
+        """Path of a blob in the store"""
+        return self.blobs_dir / blob_id[:2] / f"{blob_id}{ext}"
+    
+    def is_blob_path(self, path: Path) -> bool:
+        """Whether a path points inside the blob directory"""
+        return self.blobs_dir in Path(path).parents
+    
+    @staticmethod
+    def blob_id_of(blob_path: Path) -> str:
+        """Blob ID (content sha256) of a blob path"""
+        return Path(blob_path).stem
+    
+    def writer(self) -> BlobWriter:
+        """Start writing a new blob"""
+        return BlobWriter(self, self.spill_bytes)
+    
+    def link(self, url: str, blob_path: Path, preferred_name: str) -> Path:
+        """Map a URL to a blob and export it under a readable file name
+
+        Returns the exported path (or the blob path if names are not exported).
+        A name already used by different content gets the blob ID prefix appended.
+        """
+        blob_id = self.blob_id_of(blob_path)
+        ext = blob_path.suffix
+        self.urls[canonicalize_url(url)] = {'blob_id': blob_id, 'ext': ext}
+        if not self.export_names:
+            return blob_path
+        
+        name = Path(preferred_name).with_suffix(ext).name
+        owner = self.names.get(name)
+        if owner is not None and owner != blob_id:
+            name = f"{Path(name).stem}-{blob_id[:8]}{ext}"
+            owner = self.names.get(name)
+        
+        named_path = self.root_dir / name
+        if owner != blob_id or not named_path.exists():
+            self._materialize(blob_path, named_path)
+            self.names[name] = blob_id
+        return named_path
+    
+    @staticmethod
+    def _materialize(blob_path: Path, named_path: Path):
+        """Hard-link a blob to its exported name (copy if links are not supported)"""
+        tmp_path = named_path.with_name(f".{named_path.name}.{uuid.uuid4().hex}")
+        try:
+            os.link(blob_path, tmp_path)
+        except OSError:
+            shutil.copyfile(blob_path, tmp_path)
+        os.replace(tmp_path, named_path)
+    
+    def unlink_url(self, url: str, blob_path: Path, preferred_name: str):
+        """Remove a URL's mapping and its exported name (as link() would have named it)
+
+        The blob itself is only removed once no other URL or name refers to it.
+        """
+        blob_id = self.blob_id_of(blob_path)
+        ext = Path(blob_path).suffix
+        self.urls.pop(canonicalize_url(url), None)
+        name = Path(preferred_name).with_suffix(ext).name
+        for candidate in (name, f"{Path(name).stem}-{blob_id[:8]}{ext}"):
+            if self.names.get(candidate) == blob_id:
+                del self.names[candidate]
+                try:
+                    (self.root_dir / candidate).unlink()
+                except FileNotFoundError:
+                    pass
+                break
+        in_use = (any(v['blob_id'] == blob_id for v in self.urls.values())
+                  or blob_id in self.names.values())
+        if not in_use:
+            try:
+                Path(blob_path).unlink()
+            except FileNotFoundError:
+                pass
+    
+    def delete_blob(self, blob_path: Path):
+        """Remove a blob, its exported names and the URLs pointing at it"""
+        blob_id = self.blob_id_of(blob_path)
+        for name in [n for n, owner in self.names.items() if owner == blob_id]:
+            del self.names[name]
+            try:
+                (self.root_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+        for key in [k for k, v in self.urls.items() if v['blob_id'] == blob_id]:
+            del self.urls[key]
+        try:
+            Path(blob_path).unlink()
+        except FileNotFoundError:
+            pass
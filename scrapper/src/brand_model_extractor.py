@@ -2,17 +2,223 @@
 Brand and model information extractor
 """
 
-import json
-from typing import Dict, List
+from typing import Dict, List, Optional
 from playwright.async_api import Page
-from bs4 import BeautifulSoup
 from .logger import get_logger
 
 
+BRAND_SELECTORS = [
+    'select[name*="brand"]',
+    'select[id*="brand"]',
+    'select[class*="brand"]',
+    '[data-brand]',
+    '.brand-select',
+    '#brand-select',
+    'select:has(option[value*="Apple"])',
+    'select:has(option[value*="Samsung"])'
+]
+
+MODEL_SELECTORS = [
+    'select[name*="model"]',
+    'select[id*="model"]',
+    'select[class*="model"]',
+    '[data-model]',
+    '.model-select',
+    '#model-select'
+]
+
+# Placeholder options that are not real brands/models
+SKIP_BRANDS = ['', 'Select Brand', 'Choose Brand', 'Select']
+SKIP_MODELS = ['', 'Select Model', 'Choose Model', 'Select']
+
+# Product option names that hold the brand and the model (Shopify variants)
+BRAND_OPTION_NAMES = ('brand', 'make', 'manufacturer')
+MODEL_OPTION_NAMES = ('model', 'device', 'phone')
+
+# Reads the brand and model dropdowns and the embedded product JSON in one
+# round-trip. With options.enumerate, also selects each brand in turn and
+# waits for the model dropdown to settle, so models are known per brand; if
+# the model list never reacts to the brand, models stay unassigned.
+BRAND_MODEL_SCRIPT = r"""
+async (options) => {
+    const firstMatch = (selectors, accept) => {
+        for (const selector of selectors) {
+            let element = null;
+            try {
+                element = document.querySelector(selector);
+            } catch (e) {
+                continue;  // selector not supported by this browser
+            }
+            if (element && (!accept || accept(element))) return element;
+        }
+        return null;
+    };
+    const readOptions = (element, skip) => {
+        if (!element) return [];
+        return Array.from(element.querySelectorAll('option'))
+            .map(option => ({
+                value: option.getAttribute('value'),
+                text: (option.innerText || option.textContent || '').trim()
+            }))
+            .filter(option => option.value && !skip.includes(option.value));
+    };
+    const modelSelect = () => firstMatch(options.modelSelectors);
+    const signature = () => {
+        const element = modelSelect();
+        return element ? Array.from(element.querySelectorAll('option'), o => o.value).join('\u0001') : '';
+    };
+    const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+    const brandSelect = firstMatch(options.brandSelectors,
+        element => element.tagName === 'SELECT' && readOptions(element, options.skipBrands).length > 0);
+    const brands = readOptions(brandSelect, options.skipBrands);
+    const staticModels = readOptions(modelSelect(), options.skipModels);
+
+    const models = {};
+    if (options.enumerate && brandSelect && modelSelect()) {
+        const original = brandSelect.value;
+        const select = value => {
+            brandSelect.value = value;
+            brandSelect.dispatchEvent(new Event('input', {bubbles: true}));
+            brandSelect.dispatchEvent(new Event('change', {bubbles: true}));
+        };
+        let reacted = false;
+        let misses = 0;
+        for (const brand of brands) {
+            let last = signature();
+            let lastChange = null;
+            const start = performance.now();
+            select(brand.value);
+            while (performance.now() - start < options.timeoutMs) {
+                await sleep(options.pollMs);
+                const current = signature();
+                if (current !== last) {
+                    last = current;
+                    lastChange = performance.now();
+                }
+                if (lastChange !== null && performance.now() - lastChange >= options.quietMs) break;
+            }
+            reacted = reacted || lastChange !== null;
+            misses = lastChange === null ? misses + 1 : 0;
+            if (!reacted && misses >= 2) {
+                // The model list does not depend on the brand
+                for (const key of Object.keys(models)) delete models[key];
+                break;
+            }
+            models[brand.value] = readOptions(modelSelect(), options.skipModels);
+        }
+        select(original);
+    }
+
+    // Product data embedded for the storefront (Shopify product JSON etc.)
+    const products = [];
+    for (const script of document.querySelectorAll('script[type="application/json"]')) {
+        let data;
+        try {
+            data = JSON.parse(script.textContent);
+        } catch (e) {
+            continue;
+        }
+        const product = data && typeof data === 'object' ? (data.product || data) : null;
+        if (!product || !Array.isArray(product.options) || !Array.isArray(product.variants)) continue;
+        products.push({
+            options: product.options,
+            variants: product.variants.map(v => ({option1: v.option1, option2: v.option2, option3: v.option3}))
+        });
+    }
+
+    return {brands, models, staticModels, products};
+}
+"""
+
+
+def _option_index(names: List[str], keywords: tuple) -> Optional[int]:
+    for idx, name in enumerate(names):
+        if any(keyword in name.lower() for keyword in keywords):
+            return idx
+    return None
+
+
+def parse_product_json(data: Dict) -> Dict:
+    """Brands and their models from Shopify product JSON (/products/<handle>.js or .json, or embedded)
+    
+    The brand and model are the variant options named like 'Brand'/'Model'
+    (or the first two options when the names say nothing).
+    """
+    product = data.get('product', data) if isinstance(data, dict) else {}
+    options = product.get('options') or []
+    # product.js lists option names, product.json option objects
+    names = [option.get('name', '') if isinstance(option, dict) else str(option) for option in options]
+    brand_idx = _option_index(names, BRAND_OPTION_NAMES)
+    model_idx = _option_index(names, MODEL_OPTION_NAMES)
+    if brand_idx is None and model_idx is None and len(names) >= 2:
+        brand_idx, model_idx = 0, 1
+    if brand_idx is None or model_idx is None or brand_idx == model_idx:
+        return {'brands': [], 'models': {}}
+    
+    brands_models = {'brands': [], 'models': {}}
+    seen = set()
+    for variant in product.get('variants') or []:
+        brand = variant.get(f"option{brand_idx + 1}")
+        model = variant.get(f"option{model_idx + 1}")
+        if not brand or not model or (brand, model) in seen:
+            continue
+        seen.add((brand, model))
+        if brand not in brands_models['models']:
+            brands_models['brands'].append({'value': brand, 'text': brand})
+            brands_models['models'][brand] = []
+        brands_models['models'][brand].append({'value': model, 'text': model})
+    return brands_models
+
+
+def _merge_key(value) -> str:
+    """Key two spellings of a brand/model share ('Apple ' and 'apple')"""
+    return str(value or '').strip().casefold()
+
+
+def merge_brands_models(all_brands_models: List[Dict]) -> Dict:
+    """Merge brand/model info from several pages, dropping duplicate entries
+
+    Entries are compared case-insensitively and without surrounding spaces;
+    the first one seen keeps its display text (and its key in 'models').
+    """
+    merged = {'brands': [], 'models': {}}
+    # Normalized brand -> the brand key used in merged['models']
+    brand_keys: Dict[str, str] = {}
+    seen_models = set()
+    for brands_models in all_brands_models:
+        for brand in brands_models.get('brands', []):
+            key = _merge_key(brand.get('value'))
+            if key not in brand_keys:
+                brand_keys[key] = brand.get('value')
+                merged['brands'].append(brand)
+        for brand, models in brands_models.get('models', {}).items():
+            brand = brand_keys.setdefault(_merge_key(brand), brand)
+            bucket = merged['models'].setdefault(brand, [])
+            for model in models:
+                key = (_merge_key(brand), _merge_key(model.get('value')))
+                if key not in seen_models:
+                    seen_models.add(key)
+                    bucket.append(model)
+    return merged
+
+
 class BrandModelExtractor:
     """Extracts brand and model information from pages"""
     
-    def __init__(self):
+    def __init__(self, enumerate_models: bool = True, quiet_ms: int = 150,
+                 timeout_ms: int = 1000, poll_ms: int = 50):
+        """
+        Args:
+            enumerate_models: select each brand in the dropdown to read its models
+            quiet_ms: how long the model list must stay unchanged after a brand switch
+            timeout_ms: max wait for the model list to react to a brand switch
+            poll_ms: how often the model list is checked
+        """
+        self.enumerate_models = enumerate_models
+        self.quiet_ms = quiet_ms
+        self.timeout_ms = timeout_ms
+        self.poll_ms = poll_ms
         self.logger = get_logger("BrandModelExtractor")
     
     async def extract_brand_model_info(self, page: Page) -> Dict[str, List[str]]:
@@ -30,97 +236,32 @@ class BrandModelExtractor:
             except Exception:
                 self.logger.warning("Device selection dropdowns not found, continuing...")
             
-            # Extract brands - try multiple selectors for Layers.shop
-            brand_selectors = [
-                'select[name*="brand"]',
-                'select[id*="brand"]',
-                'select[class*="brand"]',
-                '[data-brand]',
-                '.brand-select',
-                '#brand-select',
-                'select:has(option[value*="Apple"])',
-                'select:has(option[value*="Samsung"])'
-            ]
-            
-            brand_select = None
-            for selector in brand_selectors:
-                try:
-                    brand_elements = await page.query_selector_all(selector)
-                    if brand_elements:
-                        brand_select = brand_elements[0]
-                        tag_name = await brand_select.evaluate('el => el.tagName')
-                        if tag_name == 'SELECT':
-                            options = await brand_select.query_selector_all('option')
-                            for option in options:
-                                value = await option.get_attribute('value')
-                                text = await option.inner_text()
-                                if value and value not in ['', 'Select Brand', 'Choose Brand', 'Select']:
-                                    brands_models['brands'].append({
-                                        'value': value,
-                                        'text': text.strip()
-                                    })
-                            if brands_models['brands']:
-                                break
-                except Exception as e:
-                    continue
+            data = await page.evaluate(BRAND_MODEL_SCRIPT, {
+                'brandSelectors': BRAND_SELECTORS,
+                'modelSelectors': MODEL_SELECTORS,
+                'skipBrands': SKIP_BRANDS,
+                'skipModels': SKIP_MODELS,
+                'enumerate': self.enumerate_models,
+                'quietMs': self.quiet_ms,
+                'timeoutMs': self.timeout_ms,
+                'pollMs': self.poll_ms
+            })
             
-            # Extract models - may need to select a brand first
-            model_selectors = [
-                'select[name*="model"]',
-                'select[id*="model"]',
-                'select[class*="model"]',
-                '[data-model]',
-                '.model-select',
-                '#model-select'
-            ]
+            brands_models['brands'] = data['brands']
+            if data['models']:
+                brands_models['models'] = data['models']
+                self.logger.debug(f"Enumerated models for {len(data['models'])} brands")
+            elif data['staticModels']:
+                # Model list doesn't follow the brand dropdown (or enumeration is off)
+                brands_models['models']['unknown'] = data['staticModels']
             
-            # Try to get models directly
-            for selector in model_selectors:
-                try:
-                    model_elements = await page.query_selector_all(selector)
-                    if model_elements:
-                        model_select = model_elements[0]
-                        options = await model_select.query_selector_all('option')
-                        for option in options:
-                            value = await option.get_attribute('value')
-                            text = await option.inner_text()
-                            if value and value not in ['', 'Select Model', 'Choose Model', 'Select']:
-                                brand = 'unknown'  # Will be updated when brand is selected
-                                if brand not in brands_models['models']:
-                                    brands_models['models'][brand] = []
-                                brands_models['models'][brand].append({
-                                    'value': value,
-                                    'text': text.strip()
-                                })
-                        break
-                except:
-                    continue
-            
-            # Also try to extract from JavaScript/JSON data in the page
-            try:
-                html = await page.content()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                # Look for script tags with product data
-                scripts = soup.find_all('script', type='application/json')
-                for script in scripts:
-                    try:
-                        data = json.loads(script.string)
-                        # Try to find brand/model data in JSON
-                        if isinstance(data, dict):
-                            # Common Shopify patterns
-                            if 'product' in data:
-                                # Extract variant options
-                                pass
-                    except:
-                        continue
-            except:
-                pass
+            # Variant options of embedded product JSON fill in what the dropdowns don't show
+            products = [parse_product_json(product) for product in data['products']]
+            brands_models = merge_brands_models([brands_models] + products)
             
             self.logger.debug(f"Extracted {len(brands_models.get('brands', []))} brands")
             return brands_models
-            
+        
         except Exception as e:
             self.logger.warning(f"Error extracting brand/model info: {e}")
             return brands_models
-
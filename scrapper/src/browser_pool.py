@@ -0,0 +1,61 @@
+"""
+Bounded pool of browser contexts sharing a single browser process
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+from playwright.async_api import Browser, BrowserContext, Page
+from .logger import get_logger
+
+
+class BrowserContextPool:
+    """Hands out pages from a fixed number of contexts on one browser"""
+    
+    def __init__(self, browser: Browser, size: int = 4, context_options: Optional[Dict] = None):
+        self.browser = browser
+        self.size = max(1, size)
+        self.context_options = context_options or {}
+        self.logger = get_logger("BrowserContextPool")
+        self._contexts: List[BrowserContext] = []
+        self._available: asyncio.Queue = asyncio.Queue()
+    
+    async def start(self):
+        """Create the pooled contexts"""
+        for _ in range(self.size):
+            context = await self.browser.new_context(**self.context_options)
+            self._contexts.append(context)
+            self._available.put_nowait(context)
+        self.logger.debug(f"Created {self.size} browser contexts")
+    
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """Borrow a context, open a fresh page in it and return the context when done"""
+        context = await self._available.get()
+        page = None
+        try:
+            page = await context.new_page()
+            yield page
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception as e:
+                    self.logger.debug(f"Error closing page: {e}")
+            self._available.put_nowait(context)
+    
+    async def close(self):
+        """Close all pooled contexts"""
+        for context in self._contexts:
+            try:
+                await context.close()
+            except Exception as e:
+                self.logger.debug(f"Error closing context: {e}")
+        self._contexts.clear()
+    
+    async def __aenter__(self) -> 'BrowserContextPool':
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,193 @@
+"""
+Product catalog index (brand -> model -> design) built from metadata.json for the storefront
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+from .logger import get_logger
+
+
+CATALOG_VERSION = 1
+
+# Where the storefront serves the scraped images from (client/public/scraped_images)
+IMAGE_BASE = '/scraped_images/'
+
+# Searched in the lowercased filename, first match wins
+BRAND_HINTS = [
+    ('apple', re.compile(r'iphone|apple')),
+    ('samsung', re.compile(r'samsung|galaxy')),
+    ('google', re.compile(r'google|pixel')),
+    ('oneplus', re.compile(r'oneplus')),
+    # 'mi' only as a whole word ('Mi_11', not 'premium' or 'cosmic'); '_' counts as a separator
+    ('xiaomi', re.compile(r'xiaomi|redmi|(?<![a-z0-9])mi(?![a-z0-9])')),
+    ('nothing', re.compile(r'nothing')),
+    ('vivo', re.compile(r'vivo')),
+    ('oppo', re.compile(r'oppo')),
+    ('realme', re.compile(r'realme')),
+    ('motorola', re.compile(r'motorola')),
+]
+DEFAULT_BRAND = 'apple'
+
+# (pattern, model template), first match wins
+MODEL_PATTERNS = [
+    (re.compile(r'Phone[_\s]*(\d+)[_\s]*Pro', re.I), 'iPhone {} Pro'),
+    # "_or_pro_max" fits both; listed as Pro
+    (re.compile(r'iPhone[_\s]*(\d+)[_\s]*Pro[_\s]*or[_\s]*pro[_\s]*max', re.I), 'iPhone {} Pro'),
+    (re.compile(r'iPhone[_\s]*(\d+)[_\s]*Pro[_\s]*Max', re.I), 'iPhone {} Pro Max'),
+    (re.compile(r'iPhone(\d+)Pro', re.I), 'iPhone {} Pro'),
+    (re.compile(r'iPhone[_\s]*(\d+)[_\s]*Pro', re.I), 'iPhone {} Pro'),
+    (re.compile(r'iphone[_-](\d+)[_-]pro[_-]max', re.I), 'iPhone {} Pro Max'),
+    (re.compile(r'iphone[_-](\d+)[_-]pro', re.I), 'iPhone {} Pro'),
+    (re.compile(r'galaxy[_\s]*([a-z]?\d+)', re.I), 'Galaxy {}'),
+    (re.compile(r'pixel[_\s]*(\d+)', re.I), 'Pixel {}'),
+]
+DEFAULT_MODEL = 'iPhone 14 Pro'
+
+# Brand/model prefixes stripped from a filename to leave the design name
+NAME_PREFIX_PATTERNS = [
+    re.compile(r'^Phone[_\s]*\d+[_\s]*Pro[_\s]*', re.I),
+    re.compile(r'^iPhone[_\s]*\d+[_\s]*Pro[_\s]*(?:or[_\s]*pro[_\s]*max|Max|max)?[_\s]*', re.I),
+    re.compile(r'^iPhone[_\s]*\d+[_\s]*Pro[_\s]*Max[_\s]*', re.I),
+    re.compile(r'^iPhone\d+Pro', re.I),
+    re.compile(r'^iphone[_-]\d+[_-]pro[_-]?(max)?[_-]', re.I),
+    re.compile(r'^Samsung[_\s]*Galaxy[_\s]*[a-z]?\d+[_\s]*', re.I),
+    re.compile(r'^Google[_\s]*Pixel[_\s]*\d+[_\s]*', re.I),
+    re.compile(r'^[a-z]+[_-]', re.I),
+]
+DEFAULT_NAME = 'Premium Skin'
+
+EXTENSION_PATTERN = re.compile(r'\.(png|jpg|jpeg|webp)$', re.I)
+HASH_PATTERN = re.compile(r'[a-f0-9]{8,}', re.I)
+UUID_PATTERN = re.compile(r'[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}', re.I)
+
+# Banners, feature shots and tracking pixels rather than products
+NON_PRODUCT_FILENAME_PARTS = ('banner', 'feature', 'ga-audiences', '3m-skin', 'ultra-thin', 'zero-glue')
+NON_PRODUCT_ALT_PARTS = ('skin-detail_image', 'banner', 'image loading')
+PRODUCT_FILENAME_PARTS = ('iphone', 'samsung', 'pixel', 'galaxy', 'phone')
+
+
+def brand_from_filename(filename: str) -> str:
+    """Brand slug from an image filename ('iPhone_14_Pro_...' -> 'apple')"""
+    lower = filename.lower()
+    if lower.startswith('phone'):
+        return 'apple'
+    for brand, pattern in BRAND_HINTS:
+        if pattern.search(lower):
+            return brand
+    return DEFAULT_BRAND
+
+
+def model_from_filename(filename: str) -> str:
+    """Model from an image filename ('iPhone_14_Pro_Max_Cosmic_Warrior' -> 'iPhone 14 Pro Max')"""
+    name = EXTENSION_PATTERN.sub('', filename)
+    for pattern, template in MODEL_PATTERNS:
+        match = pattern.search(name)
+        if match:
+            return template.format(match.group(1))
+    return DEFAULT_MODEL
+
+
+def design_name(filename: str, alt: str) -> str:
+    """Design name: the alt text when meaningful, else the filename without brand/model/hashes"""
+    if alt and alt.strip() and 'skin-detail' not in alt.lower() and len(alt) > 2:
+        return alt.strip()
+    
+    name = EXTENSION_PATTERN.sub('', filename)
+    for pattern in NAME_PREFIX_PATTERNS:
+        name = pattern.sub('', name, count=1)
+    name = HASH_PATTERN.sub('', name)
+    # Split camelCase ("iPhone14ProBaadshah" leaves "Baadshah") and separators, then title-case
+    name = re.sub(r'([a-z])([A-Z])', r'\1 \2', name)
+    words = [word for word in re.split(r'[_\s-]+', name) if word]
+    name = ' '.join(word[0].upper() + word[1:].lower() for word in words)
+    return name.strip() or DEFAULT_NAME
+
+
+def is_product_image(image: Dict) -> bool:
+    """Whether an image is a product render (not a banner, feature shot or pixel)"""
+    filename = image.get('filename', '').lower()
+    alt = (image.get('alt') or '').lower()
+    if (any(part in filename for part in NON_PRODUCT_FILENAME_PARTS)
+            or any(part in alt for part in NON_PRODUCT_ALT_PARTS)
+            or len(filename) < 10):
+        return False
+    # Without alt text, only filenames that name a phone count
+    if not alt.strip():
+        return any(part in filename for part in PRODUCT_FILENAME_PARTS)
+    return True
+
+
+def product_id(filename: str) -> str:
+    """Stable product ID: the UUID in the filename, or the sanitized filename"""
+    match = UUID_PATTERN.search(filename)
+    if match:
+        return match.group(0)
+    return re.sub(r'[^a-z0-9]', '-', EXTENSION_PATTERN.sub('', filename), flags=re.I).lower()
+
+
+def build_catalog(images: List[Dict], source_url: Optional[str] = None) -> Dict:
+    """Group product images into {brands: {brand: {model: {design: product}}}}
+    
+    A product keeps the ID and alt text of its first image and lists its
+    image filenames (relative to image_base) in metadata order.
+    """
+    brands: Dict[str, Dict[str, Dict[str, Dict]]] = {}
+    products = 0
+    for image in images:
+        if not image.get('filename') or not is_product_image(image):
+            continue
+        filename = image['filename']
+        brand = brand_from_filename(filename)
+        model = model_from_filename(filename)
+        name = design_name(filename, image.get('alt') or '')
+        
+        designs = brands.setdefault(brand, {}).setdefault(model, {})
+        product = designs.get(name)
+        if product is None:
+            product = designs[name] = {'id': product_id(filename), 'images': []}
+            if image.get('alt'):
+                product['alt'] = image['alt']
+            products += 1
+        if filename not in product['images']:
+            product['images'].append(filename)
+    
+    return {
+        'version': CATALOG_VERSION,
+        'source_url': source_url,
+        'image_base': IMAGE_BASE,
+        'products': products,
+        'brands': brands
+    }
+
+
+class CatalogBuilder:
+    """Writes catalog.json next to metadata.json so the storefront skips filename parsing"""
+    
+    def __init__(self, output_dir: Path, name: str = 'catalog.json'):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / name
+        self.logger = get_logger("CatalogBuilder")
+    
+    def build(self, metadata_path: Optional[Path] = None) -> Optional[Path]:
+        """Build catalog.json from metadata.json, returns its path (None if there is no metadata)"""
+        metadata_path = Path(metadata_path or self.output_dir / 'metadata.json')
+        try:
+            with open(metadata_path, encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Cannot build catalog from {metadata_path}: {e}")
+            return None
+        
+        catalog = build_catalog(metadata.get('images') or [], metadata.get('source_url'))
+        # Compact separators: the storefront downloads this on every load
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(catalog, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        
+        self.logger.success(f"Catalog: {catalog['products']} products in {len(catalog['brands'])} brands "
+                            f"({self.path.stat().st_size} bytes)")
+        return self.path
@@ -0,0 +1,195 @@
+"""
+Persistent HTTP download cache with ETag/Last-Modified revalidation
+"""
+
+import json
+import os
+import re
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from .image_index import canonicalize_url
+from .logger import get_logger
+
+
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+class DownloadCache:
+    """On-disk index of downloaded files and their HTTP validators
+
+    Entries are keyed by canonical URL and remember the ETag, Last-Modified,
+    content hash, size and freshness lifetime of the file on disk. Fresh
+    entries are reused without a request, stale ones are revalidated with a
+    conditional GET. Total size is bounded with least-recently-used eviction.
+    """
+    
+    def __init__(self, root_dir: Path, max_bytes: Optional[int] = None,
+                 index_name: str = '.download_cache.json',
+                 remove_file: Optional[Callable[[Path], None]] = None):
+        self.root_dir = Path(root_dir)
+        self.index_path = self.root_dir / index_name
+        self.max_bytes = max_bytes
+        # Called with the path of an evicted file once no entry references it
+        self.remove_file = remove_file or self._unlink
+        self.logger = get_logger("DownloadCache")
+        self.entries: Dict[str, Dict] = {}
+        self._touched = set()
+        self.stats = {'hits': 0, 'revalidations': 0, 'misses': 0, 'evictions': 0}
+    
+    def load(self):
+        """Load the cache index from disk"""
+        self._touched.clear()
+        self.stats = {'hits': 0, 'revalidations': 0, 'misses': 0, 'evictions': 0}
+        if not self.index_path.exists():
+            self.entries = {}
+            return
+        try:
+            with open(self.index_path) as f:
+                self.entries = json.load(f)
+            self.logger.debug(f"Loaded {len(self.entries)} cache entries")
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable download cache {self.index_path}: {e}")
+            self.entries = {}
+    
+    def save(self):
+        """Write the cache index to disk (atomically)"""
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.index_path)
+    
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Get the entry for a URL if its file is still on disk"""
+        entry = self.entries.get(canonicalize_url(url))
+        if entry is None:
+            return None
+        path = self.path_of(entry)
+        if not path.exists() or path.stat().st_size != entry.get('size'):
+            return None
+        return entry
+    
+    def path_of(self, entry: Dict) -> Path:
+        """Absolute path of a cached file"""
+        return self.root_dir / entry['filepath']
+    
+    @staticmethod
+    def is_fresh(entry: Dict) -> bool:
+        """Whether the entry can be used without revalidating"""
+        expires = entry.get('expires')
+        return expires is not None and expires > time.time()
+    
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for revalidating an entry"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    @staticmethod
+    def _expiry(headers) -> Optional[float]:
+        """Freshness deadline from Cache-Control max-age or Expires"""
+        cache_control = headers.get('Cache-Control', '').lower()
+        if 'no-cache' in cache_control or 'no-store' in cache_control:
+            return None
+        match = MAX_AGE_PATTERN.search(cache_control)
+        if match:
+            return time.time() + int(match.group(1))
+        expires = headers.get('Expires')
+        if expires:
+            try:
+                return parsedate_to_datetime(expires).timestamp()
+            except (TypeError, ValueError):
+                return None
+        return None
+    
+    @staticmethod
+    def _unlink(path: Path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+    
+    def _touch(self, key: str, entry: Dict):
+        entry['last_access'] = time.time()
+        self._touched.add(key)
+    
+    def record_hit(self, url: str):
+        """Count a fresh entry served without a request"""
+        key = canonicalize_url(url)
+        self._touch(key, self.entries[key])
+        self.stats['hits'] += 1
+    
+    def record_revalidated(self, url: str, headers):
+        """Count a 304 response and refresh the entry's validators"""
+        key = canonicalize_url(url)
+        entry = self.entries[key]
+        entry['etag'] = headers.get('ETag', entry.get('etag'))
+        entry['last_modified'] = headers.get('Last-Modified', entry.get('last_modified'))
+        entry['expires'] = self._expiry(headers)
+        self._touch(key, entry)
+        self.stats['revalidations'] += 1
+    
+    def record_download(self, url: str, filepath: Path, headers, sha256: str, size: int):
+        """Count a full download and store its validators"""
+        key = canonicalize_url(url)
+        entry = {
+            'url': url,
+            'filepath': os.path.relpath(filepath, self.root_dir),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'expires': self._expiry(headers),
+            'sha256': sha256,
+            'size': size,
+        }
+        self.entries[key] = entry
+        self._touch(key, entry)
+        self.stats['misses'] += 1
+    
+    def forget(self, url: str):
+        """Drop a URL's entry (its file is left alone), so it is downloaded again next run"""
+        self.entries.pop(canonicalize_url(url), None)
+        self._touched.discard(canonicalize_url(url))
+    
+    def _files(self) -> Dict[str, List[str]]:
+        """Keys of the entries sharing each file (several URLs can point at one blob)"""
+        files: Dict[str, List[str]] = {}
+        for key, entry in self.entries.items():
+            files.setdefault(entry['filepath'], []).append(key)
+        return files
+    
+    def total_bytes(self) -> int:
+        """Size of all cached files, each shared file counted once"""
+        return sum(self.entries[keys[0]].get('size', 0) for keys in self._files().values())
+    
+    def evict(self):
+        """Drop least-recently-used files (with all their entries) until under max_bytes
+
+        A file is evicted as a whole, together with every entry pointing at
+        it, and never while one of them was used during the current run.
+        """
+        if self.max_bytes is None:
+            return
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        
+        files = self._files()
+        candidates = sorted(
+            (filepath for filepath, keys in files.items() if not self._touched.intersection(keys)),
+            key=lambda f: max(self.entries[k].get('last_access', 0) for k in files[f])
+        )
+        for filepath in candidates:
+            if total <= self.max_bytes:
+                break
+            entries = [self.entries.pop(key) for key in files[filepath]]
+            total -= entries[0].get('size', 0)
+            self.stats['evictions'] += len(entries)
+            self.remove_file(self.path_of(entries[0]))
+        self.logger.debug(f"Evicted {self.stats['evictions']} cache entries, {total} bytes cached")
@@ -3,109 +3,413 @@ Image downloader with async support and retry logic
 """
 
 import asyncio
+import re
+import time
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 from urllib.parse import urlparse
-from typing import Dict, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
 import aiohttp
-import aiofiles
+from .adaptive_limiter import AdaptiveLimiter
+from .blob_store import BlobStore
+from .download_cache import DownloadCache
+from .image_probe import ImageProbe
+from .post_processor import PostProcessor
+from .metrics import RunMetrics
+from .response_body_store import ResponseBodyStore
 from .logger import get_logger
 
 
+# aiohttp.TCPConnector settings: total and per-host connection caps, DNS cache
+# lifetime (seconds) and how long idle keep-alive connections are kept
+CONNECTOR_DEFAULTS = {
+    'limit': 100,
+    'limit_per_host': 16,
+    'ttl_dns_cache': 300,
+    'keepalive_timeout': 30,
+}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
 class ImageDownloader:
     """Handles downloading images with retry logic and concurrency control"""
     
-    def __init__(self, output_dir: Path, max_concurrent: int = 5, max_retries: int = 3):
+    def __init__(self, output_dir: Path, max_concurrent: int = 5, max_retries: int = 3,
+                 use_cache: bool = True, cache_max_bytes: Optional[int] = None,
+                 probe: Optional[ImageProbe] = None,
+                 size_policy: Optional[Callable[[Dict], str]] = None,
+                 adaptive_concurrency: bool = True, max_concurrent_limit: Optional[int] = None,
+                 connector_options: Optional[Dict] = None,
+                 post_processor: Optional[PostProcessor] = None,
+                 metrics: Optional[RunMetrics] = None):
         self.output_dir = output_dir
         self.max_concurrent = max_concurrent
         self.max_retries = max_retries
-        self.semaphore = asyncio.Semaphore(max_concurrent)
+        # Starts at max_concurrent and adapts between 1 and max_concurrent (backing off only),
+        # or up to max_concurrent_limit when one is given; fixed unless adaptive_concurrency
+        self.limiter = AdaptiveLimiter(
+            initial=max_concurrent,
+            min_limit=1 if adaptive_concurrency else max_concurrent,
+            max_limit=(max_concurrent_limit or max_concurrent) if adaptive_concurrency else max_concurrent
+        )
+        self.connector_options = dict(CONNECTOR_DEFAULTS, **(connector_options or {}))
         self.logger = get_logger("ImageDownloader")
         self.downloaded_count = 0
         self.failed_count = 0
+        self.reused_count = 0
+        self.resumed_count = 0
+        # Each distinct image body is stored once, URLs map to blobs
+        self.blob_store = BlobStore(output_dir)
+        # Remembers validators of earlier downloads so unchanged images are not fetched again
+        self.cache = DownloadCache(
+            output_dir,
+            max_bytes=cache_max_bytes,
+            remove_file=self.blob_store.delete_blob
+        ) if use_cache else None
+        # Optional probe stage: read dimensions first, then size_policy decides
+        # per image between 'download', 'defer' (download last) and 'skip'
+        self.probe = probe
+        self.size_policy = size_policy
+        self.skipped_images: List[Dict] = []
+        # Optional verify/hash/thumbnail stage, run on worker processes as files land
+        self.post_processor = post_processor
+        self.probe_stats: Dict[str, int] = {}
+        # Per-image latency, bytes, retries and failures for the run report
+        self.metrics = metrics or RunMetrics()
+    
+    @staticmethod
+    def _extension_for(content_type: str, url: str) -> str:
+        """File extension from the content-type, falling back to the URL"""
+        if 'jpeg' in content_type or 'jpg' in content_type:
+            return '.jpg'
+        elif 'png' in content_type:
+            return '.png'
+        elif 'webp' in content_type:
+            return '.webp'
+        return Path(urlparse(url).path).suffix or '.jpg'
+    
+    async def _store_body(self, url: str, filepath: Path, body: bytes, headers) -> Path:
+        """Store a body that is already in memory as a blob"""
+        ext = self._extension_for(headers.get('Content-Type', ''), url)
+        
+        writer = self.blob_store.writer()
+        await writer.write(body)
+        blob_path = await writer.commit(ext)
+        
+        if self.cache:
+            self.cache.record_download(url, blob_path, headers, BlobStore.blob_id_of(blob_path), writer.size)
+        self.downloaded_count += 1
+        return blob_path
+    
+    async def store_captured_body(self, url: str, filepath: Path,
+                                  body_store: ResponseBodyStore) -> Optional[Path]:
+        """Store a body the browser already fetched, without another request"""
+        body = await body_store.read(url)
+        if body is None:
+            return None
+        blob_path = await self._store_body(url, filepath, body, body_store.headers(url))
+        self.reused_count += 1
+        self.logger.debug("Reused browser response: %s", filepath.with_suffix(blob_path.suffix).name)
+        return blob_path
+    
+    async def probe_image(self, session: aiohttp.ClientSession, url: str,
+                          body_store: Optional[ResponseBodyStore] = None) -> Optional[Dict]:
+        """Dimensions of an image, read from wherever its bytes are cheapest to get"""
+        if body_store is not None and url in body_store:
+            body = await body_store.read(url)
+            if body is not None:
+                return ImageProbe.probe_bytes_of(body, 'browser')
+        
+        cached = self.cache.lookup(url) if self.cache else None
+        if cached and self.blob_store.is_blob_path(self.cache.path_of(cached)):
+            return await self.probe.probe_file(self.cache.path_of(cached))
+        # Only the ranged GET goes over the network: it takes a slot and its outcome feeds the limiter
+        async with self.limiter.slot():
+            return await self.probe.probe_url(session, url, on_response=self._record_probe)
+    
+    def _record_probe(self, status: Optional[int], latency: float, headers=None):
+        retry_after = parse_retry_after(headers.get('Retry-After')) if headers is not None else None
+        self.limiter.record(status, latency, retry_after=retry_after)
+        self.metrics.inc('probe_requests')
     
     async def download_image(self, session: aiohttp.ClientSession, url: str, 
-                           filepath: Path) -> bool:
-        """Download an image with retries"""
+                           filepath: Path) -> Optional[Path]:
+        """Download an image into the blob store with retries
+        
+        Returns the blob path, or None on failure. The body is hashed while
+        streaming and stored only if no blob with the same content exists.
+        """
+        cached = self.cache.lookup(url) if self.cache else None
+        if cached and not self.blob_store.is_blob_path(self.cache.path_of(cached)):
+            # Entry from before the content-addressed layout, fetch again
+            cached = None
+        if cached and self.cache.is_fresh(cached):
+            self.cache.record_hit(url)
+            self.downloaded_count += 1
+            self.metrics.inc('cache_hits')
+            self.logger.debug("Cache hit: %s", filepath.name)
+            return self.cache.path_of(cached)
+        
+        started = time.monotonic()
         for attempt in range(self.max_retries):
+            retry_delay = None
+            if attempt:
+                self.metrics.inc('download_retries')
             try:
-                self.logger.debug(f"Downloading: {filepath.name} (attempt {attempt + 1}/{self.max_retries})")
-                async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                    if response.status == 200:
-                        # Get file extension from URL or content-type
-                        content_type = response.headers.get('content-type', '')
-                        if 'jpeg' in content_type or 'jpg' in content_type:
-                            ext = '.jpg'
-                        elif 'png' in content_type:
-                            ext = '.png'
-                        elif 'webp' in content_type:
-                            ext = '.webp'
-                        else:
-                            ext = Path(urlparse(url).path).suffix or '.jpg'
-                        
-                        # Update filepath with correct extension
-                        filepath = filepath.with_suffix(ext)
-                        
-                        async with aiofiles.open(filepath, 'wb') as f:
-                            async for chunk in response.content.iter_chunked(8192):
-                                await f.write(chunk)
-                        
-                        self.downloaded_count += 1
-                        self.logger.debug(f"Successfully downloaded: {filepath.name}")
-                        return True
-                    else:
-                        self.logger.warning(f"HTTP {response.status} for {url}")
+                self.logger.debug("Downloading: %s (attempt %d/%d)", filepath.name, attempt + 1, self.max_retries)
+                headers = DownloadCache.conditional_headers(cached)
+                async with self.limiter.slot():
+                    start = time.monotonic()
+                    try:
+                        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                            latency = time.monotonic() - start
+                            self.metrics.observe('http_response_seconds', latency)
+                            if response.status == 304 and cached:
+                                # Unchanged since the last run, keep the file we already have
+                                self.limiter.record(response.status, latency)
+                                self.cache.record_revalidated(url, response.headers)
+                                self.downloaded_count += 1
+                                self.metrics.observe('image_download_seconds', time.monotonic() - started)
+                                self.logger.debug("Not modified: %s", filepath.name)
+                                return self.cache.path_of(cached)
+                            elif response.status == 200:
+                                # Get file extension from URL or content-type
+                                ext = self._extension_for(response.headers.get('content-type', ''), url)
+                                
+                                # Update filepath with correct extension
+                                filepath = filepath.with_suffix(ext)
+                                
+                                writer = self.blob_store.writer()
+                                try:
+                                    async for chunk in response.content.iter_chunked(8192):
+                                        await writer.write(chunk)
+                                    blob_path = await writer.commit(ext)
+                                except BaseException:
+                                    await writer.abort()
+                                    raise
+                                self.limiter.record(response.status, latency, writer.size)
+                                self.metrics.inc('download_bytes', writer.size)
+                                self.metrics.observe('image_download_seconds', time.monotonic() - started)
+                                
+                                if self.cache:
+                                    self.cache.record_download(url, blob_path, response.headers,
+                                                               BlobStore.blob_id_of(blob_path), writer.size)
+                                self.downloaded_count += 1
+                                self.logger.debug("Successfully downloaded: %s", filepath.name)
+                                return blob_path
+                            else:
+                                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                                self.limiter.record(response.status, latency, retry_after=retry_after)
+                                self.metrics.inc('http_errors')
+                                self.logger.warning("HTTP %d for %s", response.status, url)
+                                if response.status == 429 or response.status >= 500:
+                                    retry_delay = retry_after if retry_after is not None else 2 ** attempt
+                    except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                        self.limiter.record(None, time.monotonic() - start)
+                        self.metrics.inc('connection_errors')
+                        raise
+                if retry_delay is not None and attempt < self.max_retries - 1:
+                    # Throttled or server error: wait (outside the slot) before retrying
+                    await asyncio.sleep(retry_delay)
             except asyncio.TimeoutError:
-                self.logger.warning(f"Timeout downloading {filepath.name}")
+                self.logger.warning("Timeout downloading %s", filepath.name)
             except Exception as e:
-                self.logger.debug(f"Error downloading {filepath.name}: {e}")
+                self.logger.debug("Error downloading %s: %s", filepath.name, e)
                 if attempt < self.max_retries - 1:
                     await asyncio.sleep(2 ** attempt)  # Exponential backoff
                 else:
                     self.failed_count += 1
-                    self.logger.error(f"Failed to download {url} after {self.max_retries} attempts: {e}")
-        return False
+                    self.logger.error("Failed to download %s after %d attempts: %s", url, self.max_retries, e)
+        self.metrics.inc('download_failures')
+        return None
     
-    async def download_images(self, images: list[Dict]) -> list[Optional[Dict]]:
-        """Download multiple images concurrently"""
+    async def download_images(self, images: list[Dict],
+                              body_store: Optional[ResponseBodyStore] = None,
+                              on_result: Optional[Callable[[int, Dict], Awaitable]] = None,
+                              completed: Optional[Callable[[str], Optional[Dict]]] = None) -> list[Optional[Dict]]:
+        """Download multiple images concurrently
+        
+        Images whose body was already captured from the browser (body_store)
+        are stored directly; only the rest are fetched over HTTP. on_result is
+        awaited with (index, result) as soon as each image is saved. completed
+        returns the result of an image an earlier (resumed) run already saved,
+        which is then neither probed nor downloaded.
+        """
         self.downloaded_count = 0
         self.failed_count = 0
+        self.reused_count = 0
+        self.resumed_count = 0
+        self.skipped_images = []
+        self.probe_stats = {'browser': 0, 'cache': 0, 'range': 0, 'unknown': 0,
+                            'bodies_from_probe': 0, 'deferred': 0, 'skipped': 0}
         
-        async def download_with_semaphore(session, img_data, path):
-            async with self.semaphore:
-                success = await self.download_image(session, img_data['url'], path)
-                if success:
-                    return {
-                        'url': img_data['url'],
-                        'original_url': img_data.get('original_url', ''),
-                        'alt': img_data.get('alt', ''),
-                        'title': img_data.get('title', ''),
-                        'filepath': str(path),
-                        'filename': path.name
-                    }
-                return None
+        async def download_one(session, idx, img_data, path, probe):
+            # Network requests take a limiter slot inside download_image
+            blob_path = None
+            if body_store is not None and img_data['url'] in body_store:
+                blob_path = await self.store_captured_body(img_data['url'], path, body_store)
+            if blob_path is None and probe and 'body' in probe:
+                # The probe already read the whole (small) image
+                blob_path = await self._store_body(img_data['url'], path, probe['body'], probe['headers'])
+                self.probe_stats['bodies_from_probe'] += 1
+            if blob_path is None:
+                blob_path = await self.download_image(session, img_data['url'], path)
+            image_info = None
+            if blob_path and self.post_processor is not None:
+                image_info = await self.post_processor.process(blob_path)
+                if not image_info['ok'] and self.post_processor.drop_corrupt:
+                    # Only this image's link goes; the blob may back other names or cache entries
+                    self.blob_store.unlink_url(img_data['url'], blob_path, path.name)
+                    if self.cache:
+                        self.cache.forget(img_data['url'])
+                    self.post_processor.stats['dropped'] += 1
+                    return None
+            if blob_path:
+                saved_path = self.blob_store.link(img_data['url'], blob_path, path.name)
+                result = {
+                    'url': img_data['url'],
+                    'original_url': img_data.get('original_url', ''),
+                    'alt': img_data.get('alt', ''),
+                    'title': img_data.get('title', ''),
+                    'filepath': str(saved_path),
+                    'filename': saved_path.name,
+                    'blob_id': BlobStore.blob_id_of(blob_path),
+                    'blob_path': str(blob_path),
+                    'probe': img_data.get('probe')
+                }
+                if image_info is not None:
+                    result['image'] = image_info
+                if on_result is not None:
+                    await on_result(idx, result)
+                return result
+            return None
         
-        self.logger.info(f"Starting download of {len(images)} images (max {self.max_concurrent} concurrent)...")
+        self.blob_store.load()
+        if self.cache:
+            self.cache.load()
+        if self.post_processor is not None:
+            self.post_processor.start()
         
-        async with aiohttp.ClientSession() as session:
-            tasks = []
+        self.limiter.reset()
+        self.logger.info(f"Starting download of {len(images)} images ({self.max_concurrent} concurrent, "
+                         f"adapting up to {self.limiter.max_limit})...")
+        
+        connector = aiohttp.TCPConnector(**self.connector_options)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            filepaths = []
             for idx, img in enumerate(images):
                 # Create filename
                 url_path = urlparse(img['url']).path
                 filename = Path(url_path).name or f"image_{idx}"
                 # Clean filename
-                import re
                 filename = re.sub(r'[^\w\-_\.]', '_', filename)
                 if not filename.endswith(('.jpg', '.jpeg', '.png', '.webp')):
                     filename += '.jpg'
-                
-                filepath = self.output_dir / filename
-                
-                # Create download task
-                task = download_with_semaphore(session, img, filepath)
-                tasks.append(task)
+                filepaths.append(self.output_dir / filename)
+            
+            # Images saved by an earlier run (resumed run, unchanged pages) only need their name re-linked
+            resumed: Dict[int, Dict] = {}
+            if completed is not None:
+                for idx, img in enumerate(images):
+                    result = completed(img['url'])
+                    if result is not None:
+                        self.blob_store.link(result['url'], Path(result['blob_path']), result['filename'])
+                        resumed[idx] = result
+                        if on_result is not None:
+                            await on_result(idx, result)
+                self.resumed_count = len(resumed)
+                if resumed:
+                    self.logger.info(f"{len(resumed)} images already downloaded by an earlier run")
+            pending = [idx for idx in range(len(images)) if idx not in resumed]
+            
+            # Small (deferred) images wait until every other image is probed and downloaded
+            undeferred_left = len(pending)
+            undeferred_done = asyncio.Event()
+            
+            def undeferred_finished():
+                nonlocal undeferred_left
+                undeferred_left -= 1
+                if undeferred_left == 0:
+                    undeferred_done.set()
+            
+            async def probe_and_download(session, idx):
+                # Each image is probed (if enabled) and then downloaded right away,
+                # so the first files land without waiting for the slowest probe
+                img = images[idx]
+                counted = False
+                try:
+                    probe = None
+                    if self.probe is not None:
+                        probe = await self.probe_image(session, img['url'], body_store)
+                        if probe and probe.get('width'):
+                            self.probe_stats[probe['source']] += 1
+                            # Recorded on the image (without body/headers) for the filter and metadata
+                            img['probe'] = {k: v for k, v in probe.items() if k not in ('body', 'headers')}
+                        else:
+                            self.probe_stats['unknown'] += 1
+                        decision = self.size_policy(img) if self.size_policy else 'download'
+                        if decision == 'skip':
+                            self.probe_stats['skipped'] += 1
+                            self.skipped_images.append({'url': img['url'], 'probe': img.get('probe')})
+                            return None
+                        if decision == 'defer':
+                            self.probe_stats['deferred'] += 1
+                            counted = True
+                            undeferred_finished()
+                            await undeferred_done.wait()
+                    return await download_one(session, idx, img, filepaths[idx], probe)
+                finally:
+                    if not counted:
+                        undeferred_finished()
+            
+            downloaded = await asyncio.gather(*(probe_and_download(session, idx) for idx in pending))
+            if self.probe is not None:
+                self.logger.info(f"Probed {len(pending)} images: {self.probe_stats['skipped']} skipped and "
+                                 f"{self.probe_stats['deferred']} deferred as too small, "
+                                 f"{self.probe_stats['unknown']} of unknown size")
+            
+            # Results stay in input order, None for skipped or failed images
+            results: List[Optional[Dict]] = [None] * len(images)
+            for idx, result in resumed.items():
+                results[idx] = result
+            for idx, result in zip(pending, downloaded):
+                results[idx] = result
+            
+            self.logger.info(f"Download complete: {self.downloaded_count} succeeded, {self.failed_count} failed, "
+                             f"{self.reused_count} reused from the browser, {self.resumed_count} from earlier runs")
+            if self.post_processor is not None:
+                stats = self.post_processor.stats
+                self.logger.info(f"Post-processing: {stats['processed']} images verified, "
+                                 f"{stats['corrupt']} corrupt ({stats['dropped']} dropped)")
+            self.limiter.sample()
+            concurrency = self.limiter.summary()
+            self.logger.info(f"Concurrency: peak {concurrency['peak_limit']}, final {concurrency['final_limit']}, "
+                             f"{concurrency['errors']} throttled/failed requests, "
+                             f"{concurrency['bytes_per_s'] / 1024:.0f} KiB/s average")
             
-            results = await asyncio.gather(*tasks)
+            if self.cache:
+                self.cache.evict()
+                self.cache.save()
+                stats = self.cache.stats
+                self.logger.info(f"Download cache: {stats['hits']} hits, {stats['revalidations']} revalidated, "
+                                 f"{stats['misses']} misses, {stats['evictions']} evicted")
             
-            self.logger.info(f"Download complete: {self.downloaded_count} succeeded, {self.failed_count} failed")
+            self.blob_store.save()
+            unique_blobs = len({r['blob_id'] for r in results if r})
+            self.logger.info(f"Blob store: {unique_blobs} unique blobs for {self.downloaded_count} images, "
+                             f"{self.blob_store.stats['blobs_written']} written, "
+                             f"{self.blob_store.stats['duplicate_bytes']} duplicate bytes skipped")
             return results
 
@@ -2,128 +2,268 @@
 Image extractor for extracting images from web pages
 """
 
-import asyncio
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from urllib.parse import urljoin
 from playwright.async_api import Page
 from .url_optimizer import URLOptimizer
+from .image_index import ImageIndex
+from .page_readiness import PageReadiness
 from .logger import get_logger
 
 
+SRCSET_WIDTH_PATTERN = re.compile(r'(\d+)w')
+
+# Attributes read from every <img>, in the order returned by the batch script
+IMG_ATTRIBUTES = ['src', 'srcset', 'data-src', 'data-original', 'data-lazy-src', 'alt', 'title']
+
+# Reads IMG_ATTRIBUTES for every <img> in a single round-trip and returns
+# a compact array of arrays (null for missing attributes)
+IMG_ATTRIBUTES_SCRIPT = """
+(attrs) => Array.from(document.images, img => attrs.map(name => img.getAttribute(name)))
+"""
+
+# Walks every element once inside the page and returns [url, source] pairs for
+# background images, deduplicated and resolved against the document base URL.
+# Covers inline styles, computed styles (stylesheet rules) and image-set(),
+# keeping only the highest-density image-set() candidate.
+BACKGROUND_IMAGES_SCRIPT = r"""
+(options) => {
+    const found = new Map();
+    const URL_RE = /url\(\s*(['"]?)(.*?)\1\s*\)/g;
+    const IMAGE_SET_RE = /(?:-webkit-)?image-set\(((?:[^()]|\([^()]*\))*)\)/g;
+    const CANDIDATE_RE = /(?:url\(\s*(['"]?)(.*?)\1\s*\)|(['"])(.*?)\3)\s*(?:([\d.]+)(x|dppx|dpi|dpcm))?/g;
+    const DENSITY_UNITS = {x: 1, dppx: 1, dpi: 1 / 96, dpcm: 2.54 / 96};
+
+    const add = (url, source) => {
+        url = url.trim();
+        if (!url || url.startsWith('data:')) return;
+        try {
+            url = new URL(url, document.baseURI).href;
+        } catch (e) {
+            return;
+        }
+        if (!found.has(url)) found.set(url, source);
+    };
+
+    const parse = (value, source) => {
+        if (!value || value === 'none') return;
+        const rest = value.replace(IMAGE_SET_RE, (_, body) => {
+            let best = null;
+            let bestDensity = -1;
+            for (const m of body.matchAll(CANDIDATE_RE)) {
+                const url = m[2] !== undefined ? m[2] : m[4];
+                const density = m[5] ? parseFloat(m[5]) * DENSITY_UNITS[m[6]] : 1;
+                if (url && density > bestDensity) {
+                    best = url;
+                    bestDensity = density;
+                }
+            }
+            if (best) add(best, source);
+            return '';
+        });
+        for (const m of rest.matchAll(URL_RE)) add(m[2], source);
+    };
+
+    const pseudos = options.pseudo ? ['::before', '::after'] : [];
+    for (const el of document.querySelectorAll('*')) {
+        if (!el.style) continue;
+        parse(el.style.backgroundImage, 'inline');
+        if (options.computed) {
+            parse(getComputedStyle(el).backgroundImage, 'computed');
+            for (const pseudo of pseudos) {
+                parse(getComputedStyle(el, pseudo).backgroundImage, 'computed');
+            }
+        }
+    }
+    return Array.from(found);
+}
+"""
+
+
 class ImageExtractor:
     """Extracts images from web pages"""
     
-    def __init__(self):
+    def __init__(self, batch_evaluate: bool = True, computed_styles: bool = True,
+                 pseudo_elements: bool = False):
         self.url_optimizer = URLOptimizer()
         self.logger = get_logger("ImageExtractor")
+        # Read all <img> attributes and background images with in-page scripts
+        # instead of one round-trip per attribute per element
+        self.batch_evaluate = batch_evaluate
+        # Background scan options: also look at stylesheet-applied (computed)
+        # backgrounds, and at ::before/::after pseudo-elements
+        self.computed_styles = computed_styles
+        self.pseudo_elements = pseudo_elements
+    
+    async def _collect_img_attributes_batch(self, page: Page) -> List[Dict]:
+        """Read the attributes of every <img> element with a single page.evaluate call"""
+        rows = await page.evaluate(IMG_ATTRIBUTES_SCRIPT, IMG_ATTRIBUTES)
+        self.logger.debug("Found %d img elements (batch)", len(rows))
+        return [dict(zip(IMG_ATTRIBUTES, row)) for row in rows]
     
-    async def extract_images_from_page(self, page: Page, base_url: str, network_images: List[Dict] = None) -> List[Dict]:
-        """Extract all images from the current page state"""
-        images = []
+    async def _collect_img_attributes_handles(self, page: Page) -> List[Dict]:
+        """Read <img> attributes element by element (slower fallback path)"""
+        self.logger.debug("Querying all img elements...")
+        img_elements = await page.query_selector_all('img')
+        self.logger.debug("Found %d img elements", len(img_elements))
         
-        try:
-            self.logger.debug("Waiting for page to be ready...")
-            # Wait for images to load (with timeout, don't fail if it doesn't reach networkidle)
+        records = []
+        for idx, img in enumerate(img_elements):
+            if (idx + 1) % 10 == 0:
+                self.logger.debug("Processing image %d/%d", idx + 1, len(img_elements))
             try:
-                await page.wait_for_load_state('networkidle', timeout=10000)
-                self.logger.debug("Network reached idle state")
+                attrs = {name: await img.get_attribute(name) for name in IMG_ATTRIBUTES}
+                attrs['element'] = img
+                records.append(attrs)
+            except Exception as e:
+                self.logger.debug("Error processing image element %d: %s", idx, e)
+                continue
+        return records
+    
+    async def _collect_background_images_batch(self, page: Page) -> List[str]:
+        """Find background image URLs with a single in-page walk over the DOM"""
+        rows = await page.evaluate(BACKGROUND_IMAGES_SCRIPT, {
+            'computed': self.computed_styles,
+            'pseudo': self.pseudo_elements
+        })
+        self.logger.debug("Found %d unique background images (in-page scan)", len(rows))
+        return [url for url, _source in rows]
+    
+    async def _collect_background_images_handles(self, page: Page) -> List[str]:
+        """Find inline background image URLs element by element (slower fallback path)"""
+        urls = []
+        all_elements = await page.query_selector_all('*')
+        for elem in all_elements:
+            try:
+                style = await elem.get_attribute('style')
+                if style and 'background-image' in style:
+                    match = re.search(r'url\(["\']?([^"\']+)["\']?\)', style)
+                    if match:
+                        urls.append(match.group(1))
             except Exception:
-                self.logger.debug("Network did not reach idle, continuing anyway...")
-            
-            self.logger.debug("Waiting for lazy-loaded images...")
-            await asyncio.sleep(2)  # Additional wait for lazy-loaded images
+                continue
+        return urls
+    
+    @staticmethod
+    def _select_best_source(base_url: str, attrs: Dict) -> Tuple[Optional[str], Optional[int]]:
+        """Pick the best quality source from an <img> attribute record
+        
+        Returns (url, srcset width), the width is only known for srcset candidates.
+        """
+        # Priority: data-original > data-src > data-lazy-src > srcset (highest res) > src
+        data_original = attrs.get('data-original')
+        data_src = attrs.get('data-src')
+        data_lazy = attrs.get('data-lazy-src')
+        srcset = attrs.get('srcset')
+        src = attrs.get('src')
+        
+        if data_original:
+            return urljoin(base_url, data_original), None
+        if data_src:
+            return urljoin(base_url, data_src), None
+        if data_lazy:
+            return urljoin(base_url, data_lazy), None
+        if srcset:
+            # Extract highest resolution from srcset
+            candidates = []
+            for part in srcset.split(','):
+                match = SRCSET_WIDTH_PATTERN.search(part)
+                candidates.append((int(match.group(1)) if match else 0, part))
+            width, highest_res = max(candidates, key=lambda c: c[0])
+            return urljoin(base_url, highest_res.split()[0]), width or None
+        if src:
+            return urljoin(base_url, src), None
+        return None, None
+    
+    async def collect_img_images(self, page: Page, base_url: str, images: ImageIndex) -> int:
+        """Add the <img> elements currently in the page to an index, returns how many were new"""
+        # One in-page call, handle loop as fallback
+        img_records = None
+        if self.batch_evaluate:
+            try:
+                img_records = await self._collect_img_attributes_batch(page)
+            except Exception as e:
+                self.logger.debug("Batch attribute extraction failed, falling back to element handles: %s", e)
+        if img_records is None:
+            img_records = await self._collect_img_attributes_handles(page)
+        
+        new_count = 0
+        for idx, attrs in enumerate(img_records):
+            try:
+                image_url, srcset_width = self._select_best_source(base_url, attrs)
+                if image_url:
+                    # Get high-res version
+                    high_res_url = self.url_optimizer.get_high_res_url(image_url)
+                    
+                    if images.add({
+                        'url': high_res_url,
+                        'original_url': image_url,
+                        'alt': attrs.get('alt') or '',
+                        'title': attrs.get('title') or '',
+                        'element': attrs.get('element'),
+                        'srcset_width': srcset_width
+                    }):
+                        new_count += 1
+            except Exception as e:
+                self.logger.debug("Error processing image element %d: %s", idx, e)
+                continue
+        return new_count
+    
+    async def extract_images_from_page(self, page: Page, base_url: str, network_images: List[Dict] = None,
+                                       readiness: Optional[PageReadiness] = None,
+                                       images: Optional[ImageIndex] = None) -> List[Dict]:
+        """Extract all images from the current page state
+        
+        Pass the index filled while scrolling to keep images the page has
+        since removed from the DOM (e.g. recycled carousel slides).
+        """
+        # Deduplicates by canonical URL and merges metadata across <img>, CSS and network hits
+        images = images if images is not None else ImageIndex()
+        
+        try:
+            # Wait until lazy-loaded images stop appearing (returns at once if already settled)
+            self.logger.debug("Waiting for page to be ready...")
+            await (readiness or PageReadiness()).wait_until_ready(page, 'extraction')
             
-            # Get all img elements
-            self.logger.debug("Querying all img elements...")
-            img_elements = await page.query_selector_all('img')
-            self.logger.debug(f"Found {len(img_elements)} img elements")
+            await self.collect_img_images(page, base_url, images)
             
-            for idx, img in enumerate(img_elements):
-                if (idx + 1) % 10 == 0:
-                    self.logger.debug(f"Processing image {idx + 1}/{len(img_elements)}")
+            # Also check for background images in CSS (one in-page walk, handle loop as fallback)
+            bg_urls = None
+            if self.batch_evaluate:
                 try:
-                    # Get various image source attributes
-                    src = await img.get_attribute('src')
-                    srcset = await img.get_attribute('srcset')
-                    data_src = await img.get_attribute('data-src')
-                    data_original = await img.get_attribute('data-original')
-                    data_lazy = await img.get_attribute('data-lazy-src')
-                    
-                    # Get alt text and other metadata
-                    alt = await img.get_attribute('alt') or ''
-                    title = await img.get_attribute('title') or ''
-                    
-                    # Determine the best quality image URL
-                    image_url = None
-                    
-                    # Priority: data-original > data-src > srcset (highest res) > src
-                    if data_original:
-                        image_url = urljoin(base_url, data_original)
-                    elif data_src:
-                        image_url = urljoin(base_url, data_src)
-                    elif data_lazy:
-                        image_url = urljoin(base_url, data_lazy)
-                    elif srcset:
-                        # Extract highest resolution from srcset
-                        srcset_parts = srcset.split(',')
-                        highest_res = max(srcset_parts, key=lambda x: int(re.search(r'(\d+)w', x).group(1)) if re.search(r'(\d+)w', x) else 0)
-                        image_url = urljoin(base_url, highest_res.split()[0])
-                    elif src:
-                        image_url = urljoin(base_url, src)
-                    
-                    if image_url:
-                        # Get high-res version
-                        high_res_url = self.url_optimizer.get_high_res_url(image_url)
-                        
-                        images.append({
-                            'url': high_res_url,
-                            'original_url': image_url,
-                            'alt': alt,
-                            'title': title,
-                            'element': img
-                        })
-                        
+                    bg_urls = await self._collect_background_images_batch(page)
                 except Exception as e:
-                    self.logger.debug(f"Error processing image element {idx}: {e}")
-                    continue
+                    self.logger.debug("In-page background scan failed, falling back to element handles: %s", e)
+            if bg_urls is None:
+                bg_urls = await self._collect_background_images_handles(page)
             
-            # Also check for background images in CSS
-            all_elements = await page.query_selector_all('*')
-            for elem in all_elements:
-                try:
-                    style = await elem.get_attribute('style')
-                    if style and 'background-image' in style:
-                        match = re.search(r'url\(["\']?([^"\']+)["\']?\)', style)
-                        if match:
-                            bg_url = urljoin(base_url, match.group(1))
-                            high_res_url = self.url_optimizer.get_high_res_url(bg_url)
-                            images.append({
-                                'url': high_res_url,
-                                'original_url': bg_url,
-                                'alt': 'Background image',
-                                'title': '',
-                                'type': 'background'
-                            })
-                except:
-                    continue
+            for raw_url in bg_urls:
+                bg_url = urljoin(base_url, raw_url)
+                high_res_url = self.url_optimizer.get_high_res_url(bg_url)
+                images.add({
+                    'url': high_res_url,
+                    'original_url': bg_url,
+                    'alt': 'Background image',
+                    'title': '',
+                    'type': 'background'
+                })
             
             # Merge with network-intercepted images
             if network_images:
                 for net_img in network_images:
-                    if net_img['url'] not in [img['url'] for img in images]:
-                        images.append({
-                            'url': net_img['url'],
-                            'original_url': net_img['original_url'],
-                            'alt': '',
-                            'title': '',
-                            'type': 'network'
-                        })
+                    images.add({
+                        'url': net_img['url'],
+                        'original_url': net_img['original_url'],
+                        'alt': '',
+                        'title': '',
+                        'type': 'network'
+                    })
             
-            self.logger.debug(f"Extracted {len(images)} images from page elements")
-            return images
+            self.logger.debug("Extracted %d unique images from page elements", len(images))
+            return images.images()
             
         except Exception as e:
-            self.logger.error(f"Error extracting images: {e}")
-            return images
+            self.logger.error("Error extracting images: %s", e)
+            return images.images()
 
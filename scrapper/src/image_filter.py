@@ -2,7 +2,94 @@
 Image filter for categorizing and filtering images
 """
 
-from typing import List, Dict, Tuple
+import json
+import re
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # optional, falls back to a compiled regex
+    ahocorasick = None
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex alternation shaped like a prefix trie, matching the longest word at a position"""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+    
+    def build(node: Dict) -> str:
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Greedy optional: prefer the longer word when a shorter one ends here
+        if terminal:
+            return f"(?:{body})?"
+        return body
+    
+    return build(trie)
+
+
+class KeywordClassifier:
+    """Finds which keyword sets occur (as substrings) in a text with one scan
+    
+    Uses an Aho-Corasick automaton (pyahocorasick) when installed. Otherwise
+    all keywords are compiled into one trie-shaped regex that finds the longest
+    keyword starting at each candidate position; every shorter keyword matching
+    there is a prefix of it, so each keyword knows the sets of all its prefixes.
+    Both give the same answer as checking every keyword of every set.
+    """
+    
+    def __init__(self, keyword_sets: Dict[str, Iterable[str]], use_automaton: bool = True):
+        owners: Dict[str, set] = {}
+        for name, keywords in keyword_sets.items():
+            for keyword in keywords:
+                if keyword:
+                    owners.setdefault(keyword.lower(), set()).add(name)
+        
+        self.automaton = None
+        self.pattern = None
+        if not owners:
+            return
+        
+        if use_automaton and ahocorasick is not None:
+            # The automaton reports every (overlapping) match itself
+            self.automaton = ahocorasick.Automaton()
+            for keyword, names in owners.items():
+                self.automaton.add_word(keyword, frozenset(names))
+            self.automaton.make_automaton()
+            return
+        
+        self._sets_of: Dict[str, FrozenSet[str]] = {}
+        for keyword in owners:
+            names = set()
+            for end in range(1, len(keyword) + 1):
+                names |= owners.get(keyword[:end], set())
+            self._sets_of[keyword] = frozenset(names)
+        self.pattern = re.compile(_trie_pattern(owners))
+    
+    def classify(self, text: str) -> FrozenSet[str]:
+        """Names of the keyword sets with a keyword in the (lowercase) text"""
+        found = frozenset()
+        if not text:
+            return found
+        if self.automaton is not None:
+            for _end, names in self.automaton.iter(text):
+                found = found | names
+        elif self.pattern is not None:
+            # Resume right after each match's start so overlapping keywords are seen too
+            search = self.pattern.search
+            match = search(text)
+            while match is not None:
+                found = found | self._sets_of[match.group()]
+                match = search(text, match.start() + 1)
+        return found
 
 
 class ImageFilter:
@@ -33,6 +120,66 @@ class ImageFilter:
     # Excluded keywords (logos, icons, etc.)
     EXCLUDED_KEYWORDS = ['logo', 'icon', 'cart', 'menu', 'button', 'arrow', 'close']
     
+    def __init__(self, keywords_file: Optional[str] = None, min_image_size: int = 0,
+                 small_image_action: str = 'defer'):
+        """
+        Args:
+            keywords_file: optional JSON file with "design", "phone" and/or
+                "excluded" keyword lists, replacing the built-in lists
+            min_image_size: images whose longest side is below this (once the
+                downloader has probed them) are small: downloaded last or
+                skipped (size_decision); classification doesn't use sizes
+            small_image_action: what the downloader does with small images,
+                'defer' (download last) or 'skip'
+        """
+        if small_image_action not in ('defer', 'skip'):
+            raise ValueError(f"small_image_action must be 'defer' or 'skip', not '{small_image_action}'")
+        self.min_image_size = min_image_size
+        self.small_image_action = small_image_action
+        
+        keywords = {
+            'design': self.DESIGN_KEYWORDS,
+            'phone': self.PHONE_KEYWORDS,
+            'excluded': self.EXCLUDED_KEYWORDS,
+        }
+        if keywords_file:
+            with open(Path(keywords_file)) as f:
+                config = json.load(f)
+            unknown = set(config) - set(keywords)
+            if unknown:
+                raise ValueError(f"Unknown keyword lists in {keywords_file}: {', '.join(sorted(unknown))}")
+            keywords.update(config)
+        self.keywords = keywords
+        self.classifier = KeywordClassifier(keywords)
+    
+    def classify(self, img: Dict) -> Tuple[bool, bool, bool]:
+        """Whether an image record is a design, phone and/or excluded image"""
+        alt_hits = self.classifier.classify(img.get('alt', '').lower())
+        title_hits = self.classifier.classify(img.get('title', '').lower())
+        url_hits = self.classifier.classify(img.get('url', '').lower())
+        
+        all_hits = alt_hits | title_hits | url_hits
+        # Exclusions only look at the URL and alt text
+        is_excluded = 'excluded' in url_hits or 'excluded' in alt_hits
+        return 'design' in all_hits, 'phone' in all_hits, is_excluded
+    
+    @staticmethod
+    def image_size(img: Dict) -> Optional[Tuple[int, int]]:
+        """(width, height) of an image if it has been probed"""
+        probe = img.get('probe') or {}
+        if probe.get('width') and probe.get('height'):
+            return probe['width'], probe['height']
+        return None
+    
+    def is_small(self, img: Dict) -> bool:
+        """Whether an image is known to be smaller than min_image_size"""
+        size = self.image_size(img)
+        return size is not None and max(size) < self.min_image_size
+    
+    def size_decision(self, img: Dict) -> str:
+        """Download policy for a probed image: 'download', 'defer' or 'skip'"""
+        return self.small_image_action if self.is_small(img) else 'download'
+    
     def filter_images(self, images: List[Dict]) -> Tuple[List[Dict], List[Dict], List[Dict]]:
         """
         Filter images into phone images, design images, and other images
@@ -45,21 +192,7 @@ class ImageFilter:
         other_images = []
         
         for img in images:
-            alt_lower = img.get('alt', '').lower()
-            title_lower = img.get('title', '').lower()
-            url_lower = img.get('url', '').lower()
-            
-            # Check if it's a design pattern image
-            is_design = any(keyword in alt_lower or keyword in title_lower or keyword in url_lower
-                           for keyword in self.DESIGN_KEYWORDS)
-            
-            # Check if it's a phone/device image
-            is_phone = any(keyword in alt_lower or keyword in title_lower or keyword in url_lower 
-                           for keyword in self.PHONE_KEYWORDS)
-            
-            # Check if it should be excluded
-            is_excluded = any(kw in url_lower or kw in alt_lower 
-                            for kw in self.EXCLUDED_KEYWORDS)
+            is_design, is_phone, is_excluded = self.classify(img)
             
             if is_excluded:
                 continue
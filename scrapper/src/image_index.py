@@ -0,0 +1,106 @@
+"""
+Canonical-URL index for deduplicating image records
+"""
+
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+# Query parameters that never change the image that is served
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid',
+    'mc_cid', 'mc_eid', '_ga', '_gl', 'ref', 'ref_src', 'spm'
+}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Alt texts we generate ourselves; any real alt text from another hit wins
+PLACEHOLDER_ALTS = {'', 'Background image'}
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so that equivalent image URLs compare equal
+
+    Lowercases scheme and host, drops default ports and fragments, strips
+    tracking parameters and sorts the remaining query parameters.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((scheme, netloc, parts.path or '/', urlencode(query), ''))
+
+
+class ImageIndex:
+    """Deduplicates image records by canonical URL, merging metadata from duplicate hits"""
+    
+    def __init__(self):
+        self._records: Dict[str, Dict] = {}
+    
+    def add(self, image: Dict) -> bool:
+        """Add an image record, returns True if its URL was not seen before"""
+        key = canonicalize_url(image['url'])
+        source = image.get('type', 'img')
+        
+        existing = self._records.get(key)
+        if existing is None:
+            record = dict(image)
+            record['sources'] = [source]
+            self._records[key] = record
+            return True
+        
+        self._merge(existing, image, source)
+        return False
+    
+    @staticmethod
+    def _merge(existing: Dict, image: Dict, source: str):
+        """Fold metadata from a duplicate hit into the stored record"""
+        if source not in existing['sources']:
+            existing['sources'].append(source)
+        
+        # Prefer real alt/title text over empty or generated placeholders
+        for field in ('alt', 'title'):
+            if existing.get(field, '') in PLACEHOLDER_ALTS and image.get(field, '') not in PLACEHOLDER_ALTS:
+                existing[field] = image[field]
+        
+        # Keep the widest srcset candidate seen for this URL
+        width = image.get('srcset_width')
+        if width and width > (existing.get('srcset_width') or 0):
+            existing['srcset_width'] = width
+        
+        # Fill in anything the first hit did not know (element handle, content type, ...)
+        for field, value in image.items():
+            if field != 'type' and value is not None and existing.get(field) is None:
+                existing[field] = value
+    
+    def get(self, url: str) -> Optional[Dict]:
+        """Get the stored record for a URL"""
+        return self._records.get(canonicalize_url(url))
+    
+    def images(self) -> List[Dict]:
+        """All unique image records in discovery order"""
+        return list(self._records.values())
+    
+    def clear(self):
+        """Remove all records"""
+        self._records.clear()
+    
+    def __contains__(self, url: str) -> bool:
+        return canonicalize_url(url) in self._records
+    
+    def __len__(self) -> int:
+        return len(self._records)
@@ -0,0 +1,180 @@
+"""
+Image dimension probing from the first bytes of a file
+"""
+
+import asyncio
+import re
+import struct
+from pathlib import Path
+import time
+from typing import Callable, Dict, Optional
+import aiohttp
+import aiofiles
+from .logger import get_logger
+
+
+CONTENT_RANGE_PATTERN = re.compile(r'bytes\s+\d+-\d+/(\d+)')
+
+# JPEG start-of-frame markers (carry the image size); C4, C8 and CC are not frames
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _parse_jpeg(data: bytes) -> Optional[Dict]:
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte
+            i += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return {'format': 'jpeg', 'width': width, 'height': height}
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            # Markers without a length field
+            i += 2
+            continue
+        segment_length = struct.unpack('>H', data[i + 2:i + 4])[0]
+        i += 2 + segment_length
+    return None
+
+
+def _parse_webp(data: bytes) -> Optional[Dict]:
+    if len(data) < 30:
+        return None
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and data[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', data[26:30])
+        return {'format': 'webp', 'width': width & 0x3FFF, 'height': height & 0x3FFF}
+    if chunk == b'VP8L' and data[20] == 0x2F:
+        bits = struct.unpack('<I', data[21:25])[0]
+        return {'format': 'webp', 'width': (bits & 0x3FFF) + 1, 'height': ((bits >> 14) & 0x3FFF) + 1}
+    if chunk == b'VP8X':
+        width = int.from_bytes(data[24:27], 'little') + 1
+        height = int.from_bytes(data[27:30], 'little') + 1
+        return {'format': 'webp', 'width': width, 'height': height}
+    return None
+
+
+def _parse_avif(data: bytes) -> Optional[Dict]:
+    # Image spatial extents ('ispe') boxes hold width/height; the largest is the primary image
+    best = None
+    start = data.find(b'ispe')
+    while start != -1 and start + 16 <= len(data):
+        width, height = struct.unpack('>II', data[start + 8:start + 16])
+        if best is None or width * height > best[0] * best[1]:
+            best = (width, height)
+        start = data.find(b'ispe', start + 4)
+    if best is None:
+        return None
+    return {'format': 'avif', 'width': best[0], 'height': best[1]}
+
+
+def parse_image_header(data: bytes) -> Optional[Dict]:
+    """Format, width and height from the start of a JPEG/PNG/GIF/WebP/AVIF file
+    
+    Returns None for other formats or when more bytes are needed.
+    """
+    if data[:3] == b'\xff\xd8\xff':
+        return _parse_jpeg(data)
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        if len(data) < 24 or data[12:16] != b'IHDR':
+            return None
+        width, height = struct.unpack('>II', data[16:24])
+        return {'format': 'png', 'width': width, 'height': height}
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        if len(data) < 10:
+            return None
+        width, height = struct.unpack('<HH', data[6:10])
+        return {'format': 'gif', 'width': width, 'height': height}
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return _parse_webp(data)
+    if data[4:8] == b'ftyp' and b'avi' in data[8:64]:
+        return _parse_avif(data)
+    return None
+
+
+class ImageProbe:
+    """Reads image dimensions with a small ranged GET instead of the whole body"""
+    
+    def __init__(self, probe_bytes: int = 32 * 1024, timeout: int = 15):
+        self.probe_bytes = probe_bytes
+        self.timeout = timeout
+        self.logger = get_logger("ImageProbe")
+    
+    @staticmethod
+    def _total_size(response: aiohttp.ClientResponse) -> Optional[int]:
+        """Full body size from Content-Range (206) or Content-Length (200)"""
+        if response.status == 206:
+            match = CONTENT_RANGE_PATTERN.search(response.headers.get('Content-Range', ''))
+            return int(match.group(1)) if match else None
+        length = response.headers.get('Content-Length')
+        return int(length) if length and length.isdigit() else None
+    
+    async def probe_url(self, session: aiohttp.ClientSession, url: str,
+                        on_response: Optional[Callable] = None) -> Optional[Dict]:
+        """Probe an image over HTTP
+        
+        Returns format, width, height and bytes_total (when known). If the
+        whole image fit in the probed range, its body and headers are included
+        so it does not have to be fetched again. on_response is called with
+        (status, latency, headers) once the response headers arrive, or with
+        (None, elapsed, None) on a timeout or connection error.
+        """
+        headers = {'Range': f"bytes=0-{self.probe_bytes - 1}"}
+        start = time.monotonic()
+        try:
+            async with session.get(url, headers=headers,
+                                   timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                if on_response is not None:
+                    on_response(response.status, time.monotonic() - start, response.headers)
+                if response.status not in (200, 206):
+                    return None
+                total = self._total_size(response)
+                # Small images are read completely and kept
+                whole_body = total is not None and total <= self.probe_bytes
+                
+                data = bytearray()
+                info = None
+                async for chunk in response.content.iter_chunked(4096):
+                    data += chunk
+                    if info is None:
+                        info = parse_image_header(bytes(data))
+                    if (info is not None and not whole_body) or len(data) >= self.probe_bytes:
+                        break
+                if not response.content.at_eof():
+                    # Server ignored the range (or we have enough), don't read the rest
+                    response.close()
+                
+                result = dict(info or {}, bytes_total=total, source='range')
+                if whole_body and len(data) == total:
+                    result['body'] = bytes(data)
+                    result['headers'] = response.headers
+                return result
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+            if on_response is not None:
+                on_response(None, time.monotonic() - start, None)
+            self.logger.debug("Probe failed for %s: %s", url, e)
+            return None
+        except Exception as e:
+            self.logger.debug("Probe failed for %s: %s", url, e)
+            return None
+    
+    async def probe_file(self, path: Path) -> Optional[Dict]:
+        """Probe an image already on disk"""
+        try:
+            async with aiofiles.open(path, 'rb') as f:
+                data = await f.read(self.probe_bytes)
+        except OSError:
+            return None
+        info = parse_image_header(data)
+        return dict(info or {}, bytes_total=Path(path).stat().st_size, source='cache')
+    
+    @staticmethod
+    def probe_bytes_of(body: bytes, source: str) -> Dict:
+        """Probe an image body held in memory"""
+        return dict(parse_image_header(body) or {}, bytes_total=len(body), source=source)
@@ -0,0 +1,89 @@
+"""
+Scroll driver that makes lazy-loaded images request their real source
+"""
+
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from playwright.async_api import Page
+from .page_readiness import PageReadiness
+from .logger import get_logger
+
+
+SCROLL_METRICS_SCRIPT = """
+() => ({
+    y: window.scrollY,
+    viewport: window.innerHeight,
+    height: Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0)
+})
+"""
+
+SCROLL_STEP_SCRIPT = "() => window.scrollBy(0, window.innerHeight)"
+
+
+class LazyScroller:
+    """Scrolls a page one viewport at a time so IntersectionObserver lazy-loading fires
+
+    After each step it waits only until the newly triggered image requests
+    settle, then hands control to on_step (e.g. to collect the images now in
+    the DOM). Stops at the bottom once the page height no longer grows, or
+    after max_steps on infinite-scroll pages.
+    """
+    
+    def __init__(self, max_steps: int = 60, step_quiet_ms: int = 200, step_ceiling_ms: int = 3000):
+        self.max_steps = max_steps
+        self.step_quiet_ms = step_quiet_ms
+        self.step_ceiling_ms = step_ceiling_ms
+        self.logger = get_logger("LazyScroller")
+    
+    async def scroll(self, page: Page, readiness: PageReadiness,
+                     on_step: Optional[Callable[[], Awaitable[int]]] = None) -> Dict:
+        """Scroll to the bottom of the page, returns scroll statistics
+        
+        on_step is awaited before the first step and after every step and
+        returns the number of new images it found.
+        """
+        start = time.monotonic()
+        steps = 0
+        new_images = await on_step() if on_step else 0
+        wait_ms = 0.0
+        stopped = 'max_steps'
+        
+        metrics = await page.evaluate(SCROLL_METRICS_SCRIPT)
+        previous_height = metrics['height']
+        while steps < self.max_steps:
+            await page.evaluate(SCROLL_STEP_SCRIPT)
+            steps += 1
+            
+            # Wait for the images this step brought into view, not a fixed time
+            timing = await readiness.wait_until_ready(
+                page, 'scroll', quiet_ms=self.step_quiet_ms, ceiling_ms=self.step_ceiling_ms,
+                record=False, settle_from_now=True
+            )
+            wait_ms += timing['elapsed_ms']
+            if on_step:
+                new_images += await on_step()
+            
+            metrics = await page.evaluate(SCROLL_METRICS_SCRIPT)
+            at_bottom = metrics['y'] + metrics['viewport'] >= metrics['height'] - 1
+            if at_bottom and metrics['height'] <= previous_height:
+                stopped = 'bottom'
+                break
+            previous_height = max(previous_height, metrics['height'])
+        
+        stats = {
+            'steps': steps,
+            'stopped': stopped,
+            'page_height': metrics['height'],
+            'new_images': new_images,
+            'elapsed_ms': round((time.monotonic() - start) * 1000, 1),
+        }
+        # One summary entry instead of one per step
+        readiness.timings.append({
+            'label': 'scroll',
+            'elapsed_ms': round(wait_ms, 1),
+            'outcome': stopped,
+            'steps': steps,
+        })
+        self.logger.debug(f"Scrolled {steps} steps to {metrics['height']}px ({stopped}), "
+                          f"{new_images} images found while scrolling")
+        return stats
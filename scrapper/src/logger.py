@@ -2,83 +2,162 @@
 Logging utility for the scraper
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
-from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional
 
 
-class ScraperLogger:
-    """Custom logger for the scraper with file and console output"""
+# Rotate the log file at 10 MiB, keeping scraper.log.1 .. scraper.log.5
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records as they are, so %-formatting happens on the listener thread
     
-    def __init__(self, name: str = "PhoneImageScraper", log_file: str = None):
-        self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.DEBUG)
-        
-        # Prevent duplicate handlers
-        if self.logger.handlers:
+    The stock QueueHandler formats every record before queueing it (so it
+    can be pickled), which would put the formatting back on the event loop.
+    The queue here never leaves the process, so the record is passed as is.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _LogBackend:
+    """Console and rotating file handlers, run by a QueueListener on a background thread
+    
+    Loggers only put records on an in-memory queue; the listener thread does
+    the formatting and the console/disk writes, so logging never blocks the
+    event loop on I/O.
+    """
+    
+    def __init__(self):
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.handler = _DeferredQueueHandler(self.queue)
+        self.console_handler = logging.StreamHandler(sys.stdout)
+        self.console_handler.setLevel(logging.INFO)
+        self.console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+        self.file_handler: Optional[logging.Handler] = None
+        self.log_file: Optional[Path] = None
+        self.loggers: List[logging.Logger] = []
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self._start()
+        atexit.register(self.stop)
+    
+    def _start(self):
+        handlers = [self.console_handler] + ([self.file_handler] if self.file_handler else [])
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+    
+    def stop(self):
+        """Flush queued records and stop the listener thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+    
+    def set_log_file(self, log_file: str, max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT):
+        """Send DEBUG and above to a rotating log file (replacing any earlier one)"""
+        log_path = Path(log_file)
+        if log_path == self.log_file:
             return
-        
-        # Create formatters
-        detailed_formatter = logging.Formatter(
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        console_formatter = logging.Formatter(
-            '%(levelname)s: %(message)s'
-        )
+        ))
         
-        # Console handler (INFO and above)
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(console_formatter)
-        self.logger.addHandler(console_handler)
-        
-        # File handler (DEBUG and above)
+        # The listener's handler list is fixed, so restart it around the swap
+        self.stop()
+        if self.file_handler is not None:
+            self.file_handler.close()
+        self.file_handler = file_handler
+        self.log_file = log_path
+        self._start()
+        for logger in self.loggers:
+            logger.setLevel(self.level)
+    
+    @property
+    def level(self) -> int:
+        """Lowest level any handler takes; loggers drop anything below before formatting"""
+        return logging.DEBUG if self.file_handler is not None else self.console_handler.level
+    
+    def attach(self, logger: logging.Logger):
+        """Route a logger's records to the queue (only there, not to root handlers)"""
+        if logger not in self.loggers:
+            logger.propagate = False
+            logger.addHandler(self.handler)
+            self.loggers.append(logger)
+        logger.setLevel(self.level)
+
+
+class ScraperLogger:
+    """Custom logger for the scraper with file and console output
+    
+    Messages may use %-style arguments (logger.debug("Saved %s", name)),
+    which are only formatted if the record is emitted, on the logging thread.
+    Pass immutable values (or snapshots) as arguments for that reason.
+    """
+    
+    def __init__(self, name: str = "PhoneImageScraper", log_file: str = None):
         if log_file:
-            log_path = Path(log_file)
-            log_path.parent.mkdir(parents=True, exist_ok=True)
-            file_handler = logging.FileHandler(log_path)
-            file_handler.setLevel(logging.DEBUG)
-            file_handler.setFormatter(detailed_formatter)
-            self.logger.addHandler(file_handler)
-    
-    def debug(self, message: str):
+            _backend.set_log_file(log_file)
+        self.logger = logging.getLogger(name)
+        _backend.attach(self.logger)
+    
+    def debug(self, message: str, *args, **kwargs):
         """Log debug message"""
-        self.logger.debug(message)
+        self.logger.debug(message, *args, **kwargs)
     
-    def info(self, message: str):
+    def info(self, message: str, *args, **kwargs):
         """Log info message"""
-        self.logger.info(message)
+        self.logger.info(message, *args, **kwargs)
     
-    def warning(self, message: str):
+    def warning(self, message: str, *args, **kwargs):
         """Log warning message"""
-        self.logger.warning(message)
+        self.logger.warning(message, *args, **kwargs)
     
-    def error(self, message: str):
-        """Log error message"""
-        self.logger.error(message)
+    def error(self, message: str, *args, **kwargs):
+        """Log error message (exc_info=True adds the traceback)"""
+        self.logger.error(message, *args, **kwargs)
     
-    def critical(self, message: str):
+    def critical(self, message: str, *args, **kwargs):
         """Log critical message"""
-        self.logger.critical(message)
+        self.logger.critical(message, *args, **kwargs)
     
-    def success(self, message: str):
+    def success(self, message: str, *args, **kwargs):
         """Log success message (info level with checkmark)"""
-        self.logger.info(f"✓ {message}")
+        self.logger.info("✓ " + message, *args, **kwargs)
     
-    def progress(self, message: str):
+    def progress(self, message: str, *args, **kwargs):
         """Log progress message"""
-        self.logger.info(f"→ {message}")
+        self.logger.info("→ " + message, *args, **kwargs)
+
 
+_backend = _LogBackend()
+
+# One logger per component name
+_loggers: Dict[str, ScraperLogger] = {}
 
-# Global logger instance
-_logger_instance = None
 
 def get_logger(name: str = "PhoneImageScraper", log_file: str = None) -> ScraperLogger:
-    """Get or create logger instance"""
-    global _logger_instance
-    if _logger_instance is None:
-        _logger_instance = ScraperLogger(name, log_file)
-    return _logger_instance
+    """Get or create the logger of a component (log_file enables the shared rotating log file)"""
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers[name] = ScraperLogger(name, log_file)
+    elif log_file:
+        _backend.set_log_file(log_file)
+    return logger
+
 
+def shutdown_logging():
+    """Flush and stop the logging thread (also runs at interpreter exit)"""
+    _backend.stop()
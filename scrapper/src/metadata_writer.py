@@ -0,0 +1,148 @@
+"""
+Streaming metadata sink (JSON Lines) and legacy metadata.json builder
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import aiofiles
+from .logger import get_logger
+
+
+# Record fields that only exist in the JSONL file, not in metadata.json
+RECORD_FIELDS = ('type', 'index')
+
+
+class MetadataWriter:
+    """Appends one JSON line per downloaded image while a run is in progress
+    
+    metadata.jsonl starts with a 'run' record, gets an 'image' record as each
+    download completes (flushed right away, so a crash keeps everything written
+    so far) and ends with a 'summary' record holding the run totals.
+    build_json() turns it into the legacy metadata.json, streaming the images
+    instead of holding them in memory.
+    """
+    
+    def __init__(self, output_dir: Path, jsonl_name: str = 'metadata.jsonl',
+                 json_name: str = 'metadata.json'):
+        self.output_dir = Path(output_dir)
+        self.jsonl_path = self.output_dir / jsonl_name
+        self.json_path = self.output_dir / json_name
+        self.logger = get_logger("MetadataWriter")
+        self.records_written = 0
+        self._file = None
+        self._lock = asyncio.Lock()
+    
+    async def _write(self, record: Dict):
+        line = json.dumps(record) + '\n'
+        async with self._lock:
+            await self._file.write(line)
+            await self._file.flush()
+        self.records_written += 1
+    
+    async def open(self, source_url: str):
+        """Start a new metadata.jsonl (replacing the previous run's)"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.records_written = 0
+        self._file = await aiofiles.open(self.jsonl_path, 'w')
+        await self._write({
+            'type': 'run',
+            'source_url': source_url,
+            'started_at': datetime.now(timezone.utc).isoformat()
+        })
+    
+    async def write_image(self, index: int, image: Dict):
+        """Append the record of one downloaded image
+        
+        Args:
+            index: position of the image in the download list (metadata.json
+                keeps this order, whatever order downloads complete in)
+            image: the image's metadata.json entry
+        """
+        await self._write(dict(image, type='image', index=index))
+    
+    async def write_near_duplicates(self, groups: List[Dict]):
+        """Append near-duplicate groups ({'keep': index, 'duplicates': [{'index', 'url'}]})
+        
+        build_json() leaves the duplicates out of metadata.json and lists
+        their URLs on the kept image instead.
+        """
+        await self._write({'type': 'near_duplicates', 'groups': groups})
+    
+    async def write_summary(self, summary: Dict):
+        """Append the run totals"""
+        await self._write(dict(summary, type='summary'))
+    
+    async def close(self):
+        """Close metadata.jsonl"""
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+    
+    def _scan(self) -> Tuple[Dict, List[Tuple[int, int]], List[Dict]]:
+        """Header fields, (index, byte offset) of every image record and near-duplicate groups"""
+        header: Dict = {}
+        offsets = []
+        duplicate_groups: List[Dict] = []
+        with open(self.jsonl_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn last line of a run that was killed mid-write
+                    self.logger.warning(f"Skipping unreadable line at byte {offset} of {self.jsonl_path}")
+                    offset += len(line)
+                    continue
+                kind = record.get('type')
+                if kind == 'image':
+                    offsets.append((record.get('index', len(offsets)), offset))
+                elif kind == 'near_duplicates':
+                    duplicate_groups = record['groups']
+                elif kind in ('run', 'summary'):
+                    header.update({k: v for k, v in record.items() if k not in RECORD_FIELDS and k != 'started_at'})
+                offset += len(line)
+        return header, offsets, duplicate_groups
+    
+    def build_json(self) -> Optional[Path]:
+        """Write metadata.json (the format client/src/lib/products.ts reads) from metadata.jsonl
+        
+        Works on an unfinished run too: without a summary record the totals
+        that can be counted from the image records are filled in.
+        """
+        if not self.jsonl_path.exists():
+            self.logger.warning(f"No {self.jsonl_path.name} in {self.output_dir}")
+            return None
+        
+        header, offsets, duplicate_groups = self._scan()
+        duplicate_urls = {group['keep']: [d['url'] for d in group['duplicates']] for group in duplicate_groups}
+        removed = {d['index'] for group in duplicate_groups for d in group['duplicates']}
+        offsets = sorted(entry for entry in offsets if entry[0] not in removed)
+        header.setdefault('images_downloaded', len(offsets))
+        header.pop('images', None)
+        
+        # Same bytes as json.dumps(metadata, indent=2) with 'images' last, written one image at a time
+        head = json.dumps(header, indent=2)
+        tmp_path = self.json_path.with_name(self.json_path.name + '.tmp')
+        with open(self.jsonl_path, 'rb') as src, open(tmp_path, 'w') as out:
+            out.write(head[:-2] + ',\n' if header else '{\n')
+            if not offsets:
+                out.write('  "images": []\n}')
+            else:
+                out.write('  "images": [\n')
+                for position, (index, offset) in enumerate(offsets):
+                    src.seek(offset)
+                    image = json.loads(src.readline())
+                    for field in RECORD_FIELDS:
+                        image.pop(field, None)
+                    if index in duplicate_urls:
+                        image['near_duplicates'] = duplicate_urls[index]
+                    entry = json.dumps(image, indent=2).replace('\n', '\n    ')
+                    out.write(('    ' if position == 0 else ',\n    ') + entry)
+                out.write('\n  ]\n}')
+        os.replace(tmp_path, self.json_path)
+        self.logger.debug(f"Wrote {self.json_path} with {len(offsets)} images")
+        return self.json_path
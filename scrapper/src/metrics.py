@@ -0,0 +1,239 @@
+"""
+Run metrics: stage timing spans, histograms, counters and event-loop lag, exported as JSON and Prometheus text
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+from .logger import get_logger
+
+
+# Seconds; covers cached hits (ms) up to slow large images on a throttled CDN
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds a 50 ms timer fired late by
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Innermost open span of the current task, so concurrent pages get their own span trees
+_current_span = ContextVar('current_span', default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus style: upper bounds, plus +Inf)"""
+    
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate of the q-quantile, interpolated within its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[idx - 1] if idx else 0.0
+                upper = self.buckets[idx] if idx < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+    
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'p50': self._rounded(self.quantile(0.5)),
+            'p90': self._rounded(self.quantile(0.9)),
+            'p99': self._rounded(self.quantile(0.99)),
+            'max': round(self.max, 6),
+            # Cumulative counts per upper bound
+            'buckets': {
+                str(bound): sum(self.counts[:idx + 1]) for idx, bound in enumerate(self.buckets)
+            },
+        }
+    
+    @staticmethod
+    def _rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 6) if value is not None else None
+
+
+class RunMetrics:
+    """Collects the measurements of one scraper run
+    
+    span() times a stage (spans nest per asyncio task, so pages scraped
+    concurrently keep separate trees); inc() and observe() feed counters and
+    histograms; the loop lag monitor samples how late a timer fires, i.e. how
+    long the event loop was blocked. report() returns everything as one dict,
+    write() saves it as JSON plus a Prometheus textfile.
+    """
+    
+    def __init__(self, prefix: str = 'phone_scraper', lag_interval: float = 0.05):
+        self.prefix = prefix
+        self.lag_interval = lag_interval
+        self.logger = get_logger("RunMetrics")
+        self._lag_task: Optional[asyncio.Task] = None
+        self.reset()
+    
+    def reset(self):
+        """Start a new run"""
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.spans: List[Dict] = []
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.loop_lag = Histogram(LOOP_LAG_BUCKETS)
+    
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict]:
+        """Time the block as a stage; the yielded dict takes extra attributes"""
+        parent = _current_span.get()
+        token = _current_span.set(name)
+        record = {'name': name, 'parent': parent, **attrs}
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            record['start_s'] = round(start - self._start, 6)
+            record['duration_s'] = round(time.perf_counter() - start, 6)
+            self.spans.append(record)
+    
+    def inc(self, name: str, value: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+    
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(buckets)
+        histogram.observe(value)
+    
+    def start_loop_monitor(self):
+        """Start sampling event-loop lag (call from inside the running loop)"""
+        if self._lag_task is None:
+            self._lag_task = asyncio.get_running_loop().create_task(self._sample_loop_lag())
+    
+    async def stop_loop_monitor(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            try:
+                await self._lag_task
+            except asyncio.CancelledError:
+                pass
+            self._lag_task = None
+    
+    async def _sample_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.loop_lag.observe(max(0.0, loop.time() - expected))
+    
+    def finish(self):
+        """Freeze the run duration"""
+        self.finished = time.perf_counter()
+    
+    def stage_totals(self) -> Dict[str, Dict]:
+        """Per stage name: how often it ran, total/max time (concurrent spans add up beyond wall time)"""
+        totals: Dict[str, Dict] = {}
+        for span in self.spans:
+            entry = totals.setdefault(span['name'], {'count': 0, 'total_s': 0.0, 'max_s': 0.0, 'errors': 0})
+            entry['count'] += 1
+            entry['total_s'] += span['duration_s']
+            entry['max_s'] = max(entry['max_s'], span['duration_s'])
+            entry['errors'] += 'error' in span
+        for entry in totals.values():
+            entry['total_s'] = round(entry['total_s'], 6)
+        return totals
+    
+    def report(self) -> Dict:
+        """Machine-readable run report"""
+        duration = (self.finished or time.perf_counter()) - self._start
+        download_s = sum(s['duration_s'] for s in self.spans if s['name'] == 'download')
+        download_bytes = self.counters.get('download_bytes', 0)
+        return {
+            'started_at': self.started_at,
+            'duration_s': round(duration, 6),
+            'stages': self.stage_totals(),
+            'spans': sorted(self.spans, key=lambda s: s['start_s']),
+            'counters': dict(self.counters),
+            'histograms': {name: h.summary() for name, h in self.histograms.items()},
+            'download_bytes_per_s': round(download_bytes / download_s) if download_s else None,
+            'event_loop_lag': self.loop_lag.summary(),
+        }
+    
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition format (for node_exporter's textfile collector)"""
+        report = self.report()
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_run_duration_seconds Wall time of the last run",
+            f"# TYPE {p}_run_duration_seconds gauge",
+            f"{p}_run_duration_seconds {report['duration_s']}",
+            f"# HELP {p}_last_run_timestamp_seconds Start time of the last run",
+            f"# TYPE {p}_last_run_timestamp_seconds gauge",
+            f"{p}_last_run_timestamp_seconds {self.started_at:.3f}",
+            f"# HELP {p}_stage_seconds_total Time spent per stage (summed over concurrent pages)",
+            f"# TYPE {p}_stage_seconds_total counter",
+        ]
+        for stage, entry in report['stages'].items():
+            lines.append(f'{p}_stage_seconds_total{{stage="{_label(stage)}"}} {entry["total_s"]}')
+        lines += [f"# HELP {p}_stage_runs_total Times each stage ran", f"# TYPE {p}_stage_runs_total counter"]
+        for stage, entry in report['stages'].items():
+            lines.append(f'{p}_stage_runs_total{{stage="{_label(stage)}"}} {entry["count"]}')
+        
+        for name, value in sorted(self.counters.items()):
+            lines += [f"# TYPE {p}_{name}_total counter", f"{p}_{name}_total {value}"]
+        if report['download_bytes_per_s'] is not None:
+            lines += [f"# TYPE {p}_download_bytes_per_second gauge",
+                      f"{p}_download_bytes_per_second {report['download_bytes_per_s']}"]
+        
+        histograms = dict(self.histograms, event_loop_lag_seconds=self.loop_lag)
+        for name, histogram in sorted(histograms.items()):
+            lines.append(f"# TYPE {p}_{name} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{p}_{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_{name}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"{p}_{name}_sum {histogram.sum:.6f}")
+            lines.append(f"{p}_{name}_count {histogram.count}")
+        return '\n'.join(lines) + '\n'
+    
+    def write(self, report_path: Path, prometheus_path: Optional[Path] = None):
+        """Write the JSON run report and the Prometheus textfile (temp file + rename, so scrapers never see half a file)"""
+        outputs = [(Path(report_path), json.dumps(self.report(), indent=2))]
+        if prometheus_path:
+            outputs.append((Path(prometheus_path), self.prometheus_text()))
+        for path, text in outputs:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f".{path.name}.tmp")
+                tmp_path.write_text(text, encoding='utf-8')
+                os.replace(tmp_path, path)
+            except OSError as e:
+                self.logger.warning(f"Could not write metrics to {path}: {e}")
+
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,139 @@
+"""
+Near-duplicate image grouping by perceptual hash (multi-index hashing over dHash)
+"""
+
+from itertools import combinations
+from typing import Dict, Hashable, List, Tuple
+from .logger import get_logger
+
+
+if hasattr(int, 'bit_count'):
+    # Python 3.10+: popcount without building a string
+    def hamming(a: int, b: int) -> int:
+        """Number of differing bits"""
+        return (a ^ b).bit_count()
+else:
+    def hamming(a: int, b: int) -> int:
+        """Number of differing bits"""
+        return bin(a ^ b).count('1')
+
+
+class MultiIndexHash:
+    """Multi-index hashing: finds all hashes within a Hamming radius without scanning them all
+    
+    The hash is split into `chunks` bit ranges, each with its own lookup table.
+    Two hashes within distance r differ by at most r // chunks bits in at least
+    one chunk (pigeonhole), so a search only looks up that chunk's few
+    neighbouring values in each table and checks the handful of candidates.
+    """
+    
+    def __init__(self, radius: int, bits: int = 64, chunks: int = 4):
+        self.radius = radius
+        self.sub_radius = radius // chunks
+        self.ranges = []
+        for idx in range(chunks):
+            start = bits * idx // chunks
+            width = bits * (idx + 1) // chunks - start
+            # XOR masks of every value within sub_radius bits of a chunk value
+            flips = [0]
+            for count in range(1, self.sub_radius + 1):
+                flips += [sum(1 << bit for bit in combo) for combo in combinations(range(width), count)]
+            self.ranges.append((start, (1 << width) - 1, flips))
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in range(chunks)]
+    
+    def add(self, value: int):
+        """Insert a hash (callers insert each distinct hash once)"""
+        for (start, mask, _flips), table in zip(self.ranges, self.tables):
+            table.setdefault((value >> start) & mask, []).append(value)
+    
+    def search(self, value: int) -> List[Tuple[int, int]]:
+        """All (hash, distance) pairs within radius of value, value itself included"""
+        candidates = set()
+        for (start, mask, flips), table in zip(self.ranges, self.tables):
+            chunk = (value >> start) & mask
+            for flip in flips:
+                bucket = table.get(chunk ^ flip)
+                if bucket:
+                    candidates.update(bucket)
+        found = []
+        for other in candidates:
+            distance = hamming(value, other)
+            if distance <= self.radius:
+                found.append((other, distance))
+        return found
+
+
+class NearDuplicateIndex:
+    """Groups images whose dHashes are within a Hamming distance threshold
+    
+    Images with identical hashes share one index entry, and every distinct
+    hash is compared only with the candidates its chunk lookups return, so
+    building the groups stays far from O(n^2) pairwise comparisons. The
+    connected components of the "within threshold" relation are split so
+    that every member of a group is within threshold of the group's kept
+    (highest-resolution) image: a chain A~B~C never merges A and C when
+    they are further apart.
+    """
+    
+    def __init__(self, threshold: int = 6):
+        self.threshold = threshold
+        self.logger = get_logger("NearDuplicateIndex")
+        self.hashes = MultiIndexHash(threshold)
+        # Distinct hash -> keys of the images with that hash
+        self.members: Dict[int, List[Hashable]] = {}
+        self.pixels: Dict[Hashable, int] = {}
+        
+        # Union-find over distinct hashes, linked as they are added
+        self._parent: Dict[int, int] = {}
+    
+    def _find(self, value: int) -> int:
+        parent = self._parent
+        while parent[value] != value:
+            parent[value] = parent[parent[value]]
+            value = parent[value]
+        return value
+    
+    def add(self, key: Hashable, dhash: str, width: int = 0, height: int = 0):
+        """Index an image by its hex dHash"""
+        value = int(dhash, 16)
+        if value not in self.members:
+            # Each new hash is linked to the near hashes already indexed, so every pair is compared once
+            self._parent[value] = value
+            for other, _distance in self.hashes.search(value):
+                root_a, root_b = self._find(value), self._find(other)
+                if root_a != root_b:
+                    self._parent[root_b] = root_a
+            self.members[value] = []
+            self.hashes.add(value)
+        self.members[value].append(key)
+        self.pixels[key] = width * height
+    
+    def groups(self) -> List[List[Hashable]]:
+        """Groups of two or more near-duplicate images, best (largest) image first"""
+        find = self._find
+        clusters: Dict[int, List[Tuple[Hashable, int]]] = {}
+        for value, keys in self.members.items():
+            clusters.setdefault(find(value), []).extend((key, value) for key in keys)
+        
+        # Largest first; ties keep the image that was indexed first
+        order = {key: idx for idx, key in enumerate(self.pixels)}
+        groups = []
+        split = 0
+        for members in clusters.values():
+            if len(members) < 2:
+                continue
+            remaining = sorted(members, key=lambda member: (-self.pixels[member[0]], order[member[0]]))
+            parts = 0
+            while remaining:
+                # The largest image left keeps everything within threshold of itself
+                _kept, kept_value = remaining[0]
+                group = [m for m in remaining if hamming(m[1], kept_value) <= self.threshold]
+                remaining = [m for m in remaining if hamming(m[1], kept_value) > self.threshold]
+                parts += 1
+                if len(group) > 1:
+                    groups.append([key for key, _value in group])
+            if parts > 1:
+                split += 1
+        if split:
+            self.logger.debug("Split %d chained components into groups around their kept image", split)
+        return groups
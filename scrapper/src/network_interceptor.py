@@ -2,20 +2,57 @@
 Network request interceptor for capturing high-quality image URLs
 """
 
-from typing import List, Dict
+import asyncio
+from typing import List, Dict, Optional
 from playwright.async_api import Page
 from .url_optimizer import URLOptimizer
+from .image_index import ImageIndex, canonicalize_url
+from .response_body_store import ResponseBodyStore
 from .logger import get_logger
 
 
 class NetworkInterceptor:
     """Intercepts network requests to capture high-quality image URLs"""
     
-    def __init__(self):
-        self.network_images: List[Dict] = []
+    def __init__(self, body_store: Optional[ResponseBodyStore] = None):
+        # Responses for the same image (retries, redirects, re-renders) collapse to one record
+        self.network_images = ImageIndex()
         self.url_optimizer = URLOptimizer()
         self.logger = get_logger("NetworkInterceptor")
         self.capture_count = 0
+        # When set, bodies of images that need no high-res refetch are kept,
+        # so they do not have to be downloaded a second time
+        self.body_store = body_store
+        # In-flight body captures by canonical URL, so repeated responses fetch a body once
+        self._pending_bodies: Dict[str, asyncio.Task] = {}
+    
+    async def _capture_body(self, response, url: str):
+        """Save an image response body into the body store"""
+        try:
+            body = await response.body()
+            await self.body_store.put(url, body, response.headers)
+        except Exception as e:
+            # Body can be gone already (navigation, redirect, page closed)
+            self.logger.debug("Could not capture body of %s: %s", url, e)
+    
+    def record_image_url(self, url: str, content_type: str = '', status: Optional[int] = None) -> str:
+        """Record an image URL seen on the network, returns its high-res URL
+        
+        Also used by the resource blocker for image requests it aborts.
+        """
+        # Try to get the full-size image URL
+        high_res_url = self.url_optimizer.get_high_res_url(url)
+        self.network_images.add({
+            'url': high_res_url,
+            'original_url': url,
+            'content_type': content_type,
+            'status': status,
+            'type': 'network'
+        })
+        self.capture_count += 1
+        if self.capture_count % 10 == 0:
+            self.logger.debug("Captured %d images from network requests", self.capture_count)
+        return high_res_url
     
     async def setup_interception(self, page: Page):
         """Set up network request interception"""
@@ -25,24 +62,27 @@ class NetworkInterceptor:
             
             # Capture image requests
             if 'image' in content_type.lower() or any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.avif']):
-                # Try to get the full-size image URL
-                high_res_url = self.url_optimizer.get_high_res_url(url)
-                self.network_images.append({
-                    'url': high_res_url,
-                    'original_url': url,
-                    'content_type': content_type,
-                    'status': response.status
-                })
-                self.capture_count += 1
-                if self.capture_count % 10 == 0:
-                    self.logger.debug(f"Captured {self.capture_count} images from network requests")
+                high_res_url = self.record_image_url(url, content_type, response.status)
+                
+                # Keep the bytes the browser already fetched when the URL is already the best version
+                if self.body_store is not None and high_res_url == url and response.status == 200:
+                    key = canonicalize_url(url)
+                    if key not in self._pending_bodies and url not in self.body_store:
+                        task = asyncio.ensure_future(self._capture_body(response, url))
+                        self._pending_bodies[key] = task
+                        task.add_done_callback(lambda _task: self._pending_bodies.pop(key, None))
         
         page.on("response", handle_response)
         self.logger.debug("Network response interceptor registered")
     
+    async def drain(self):
+        """Wait for in-flight body captures (call before the page is closed)"""
+        if self._pending_bodies:
+            await asyncio.gather(*self._pending_bodies.values(), return_exceptions=True)
+    
     def get_captured_images(self) -> List[Dict]:
         """Get all captured network images"""
-        return self.network_images.copy()
+        return self.network_images.images()
     
     def clear(self):
         """Clear captured images"""
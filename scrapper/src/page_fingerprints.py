@@ -0,0 +1,244 @@
+"""
+Per-page fingerprints of the previous run, for delta runs and added/removed image reports
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from .image_index import canonicalize_url
+from .logger import get_logger
+
+
+FINGERPRINT_VERSION = 1
+
+# Product JSON fields that change without the images or devices changing (prices, stock, timestamps)
+VOLATILE_PRODUCT_KEYS = frozenset({
+    'available', 'inventory_quantity', 'inventory_management', 'inventory_policy',
+    'price', 'price_min', 'price_max', 'price_varies',
+    'compare_at_price', 'compare_at_price_min', 'compare_at_price_max', 'compare_at_price_varies',
+    'updated_at', 'published_at',
+})
+
+
+def _digest(value) -> str:
+    """Short SHA-256 of a JSON-serializable value (key order doesn't matter)"""
+    data = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:32]
+
+
+def _without_volatile(value):
+    if isinstance(value, dict):
+        return {k: _without_volatile(v) for k, v in value.items() if k not in VOLATILE_PRODUCT_KEYS}
+    if isinstance(value, list):
+        return [_without_volatile(v) for v in value]
+    return value
+
+
+def product_json_hash(product: Dict) -> str:
+    """Hash of a product's JSON, leaving out prices, stock and timestamps"""
+    return _digest(_without_volatile(product))
+
+
+def image_url_set(images: Iterable[Dict]) -> List[str]:
+    """Sorted canonical URLs of image records"""
+    return sorted({canonicalize_url(img['url']) for img in images})
+
+
+def brand_model_set(brands_models: Dict) -> Dict[str, List[str]]:
+    """{brand: sorted models}, independent of the order the page lists them in"""
+    devices: Dict[str, set] = {}
+    for brand in brands_models.get('brands', []):
+        devices.setdefault(brand.get('value') or brand.get('text'), set())
+    for brand, models in brands_models.get('models', {}).items():
+        devices.setdefault(brand, set()).update(m.get('value') or m.get('text') for m in models)
+    return {brand: sorted(filter(None, models)) for brand, models in devices.items() if brand}
+
+
+def page_fingerprint(result: Dict, product_hash: Optional[str] = None) -> Dict:
+    """Fingerprint of a page result: product JSON hash, relevant image URL set and brand/model set"""
+    return {
+        'product_json': result.get('product_json_hash') or product_hash,
+        'images': _digest(image_url_set(result['relevant_images'])),
+        'brands_models': _digest(brand_model_set(result['brands_models'])),
+    }
+
+
+class PageFingerprints:
+    """Fingerprints, page results and downloads of the previous run's pages (page_fingerprints.json)
+    
+    A page whose product JSON hash is unchanged can reuse its previous page
+    result without being extracted again (previous_result); a page whose
+    whole fingerprint is unchanged reuses its previous downloads
+    (classify + completed_image). save() records this run's pages and writes
+    delta.json with the images added and removed since the previous run.
+    
+    Pages outside a run keep their entries, so scraping one page after a
+    crawl does not report the rest as gone. Pages are only dropped as gone
+    by a crawl of the same sitemap/URL list that no longer lists them.
+    """
+    
+    def __init__(self, output_dir: Path, name: str = 'page_fingerprints.json', delta_name: str = 'delta.json'):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / name
+        self.delta_path = self.output_dir / delta_name
+        self.logger = get_logger("PageFingerprints")
+        self.previous_run: Optional[str] = None
+        self.pages: Dict[str, Dict] = {}
+        # Page URLs of each crawl, by crawl key
+        self.crawls: Dict[str, List[str]] = {}
+        # Product JSON hashes read by the cheap check, for pages then extracted in the browser
+        self.product_hashes: Dict[str, str] = {}
+        self._reusable: Dict[str, Dict] = {}
+        self.images_reused = 0
+    
+    def load(self):
+        """Read the previous run's fingerprints"""
+        self.previous_run = None
+        self.pages = {}
+        self.crawls = {}
+        self.product_hashes = {}
+        self._reusable = {}
+        self.images_reused = 0
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable {self.path.name}: {e}")
+            return
+        if data.get('version') != FINGERPRINT_VERSION:
+            self.logger.info(f"{self.path.name} has another format version, starting over")
+            return
+        self.previous_run = data.get('created_at')
+        self.pages = data.get('pages') or {}
+        self.crawls = data.get('crawls') or {}
+        self.logger.info(f"Fingerprints of {len(self.pages)} pages from the run of {self.previous_run}")
+    
+    def previous_result(self, url: str, product_hash: str) -> Optional[Dict]:
+        """The previous page result if the page's product JSON is unchanged, else None"""
+        self.product_hashes[url] = product_hash
+        entry = self.pages.get(url)
+        if entry is None or entry['fingerprint'].get('product_json') != product_hash:
+            return None
+        return dict(entry['result'], source='previous_run')
+    
+    def fingerprint(self, result: Dict) -> Dict:
+        return page_fingerprint(result, self.product_hashes.get(result['url']))
+    
+    def classify(self, page_results: List[Dict], reuse_downloads: bool = True) -> Dict[str, str]:
+        """'new', 'changed' or 'unchanged' per page URL
+        
+        With reuse_downloads, the previous downloads of unchanged pages are
+        offered to the downloader through completed_image().
+        """
+        statuses = {}
+        for result in page_results:
+            entry = self.pages.get(result['url'])
+            if entry is None:
+                statuses[result['url']] = 'new'
+            elif result.get('source') == 'previous_run' or entry['fingerprint'] == self.fingerprint(result):
+                statuses[result['url']] = 'unchanged'
+                if reuse_downloads:
+                    for image in entry.get('images', []):
+                        self._reusable[canonicalize_url(image['url'])] = image
+            else:
+                statuses[result['url']] = 'changed'
+        return statuses
+    
+    def completed_image(self, url: str) -> Optional[Dict]:
+        """Previous download result of an image of an unchanged page, if its files are still there"""
+        result = self._reusable.get(canonicalize_url(url))
+        if result is None:
+            return None
+        if not (Path(result['blob_path']).exists() and Path(result['filepath']).exists()):
+            return None
+        self.images_reused += 1
+        return result
+    
+    @staticmethod
+    def crawl_key(sitemap_url: Optional[str] = None, sitemap_filter: Optional[str] = None,
+                  urls: Iterable[str] = ()) -> str:
+        """Key of a crawl: its sitemap (and filter) and the URLs given explicitly"""
+        return _digest({'sitemap': sitemap_url, 'filter': sitemap_filter, 'urls': sorted(set(urls))})
+    
+    def save(self, page_results: List[Dict], downloads: List[Optional[Dict]], statuses: Dict[str, str],
+             failed_urls: Iterable[str] = (), crawl: Optional[str] = None) -> Dict:
+        """Write page_fingerprints.json and delta.json, returns the delta summary
+        
+        Pages that failed this time keep their previous entry, so their
+        images are not reported as removed because of a passing error, and
+        so do pages this run did not cover. With crawl (a crawl_key), pages
+        the previous run of the same crawl listed and this one doesn't are
+        gone: they are dropped and their images reported as removed.
+        """
+        failed_urls = list(failed_urls)
+        by_url = {canonicalize_url(r['url']): r for r in downloads if r}
+        pages: Dict[str, Dict] = {}
+        for result in page_results:
+            keys = dict.fromkeys(canonicalize_url(img['url']) for img in result['relevant_images'])
+            stored = result
+            if result.get('source') == 'previous_run':
+                # Keep how the page was originally extracted
+                stored = dict(result, source=self.pages[result['url']]['result'].get('source'))
+            pages[result['url']] = {
+                'fingerprint': self.fingerprint(result),
+                'result': stored,
+                'images': [by_url[key] for key in keys if key in by_url],
+            }
+        carried = [url for url in failed_urls if url in self.pages and url not in pages]
+        crawls = dict(self.crawls)
+        gone = []
+        if crawl is not None:
+            crawl_urls = set(pages) | set(failed_urls)
+            gone = [url for url in self.crawls.get(crawl, []) if url not in crawl_urls and url in self.pages]
+            crawls[crawl] = sorted(crawl_urls)
+        for url, entry in self.pages.items():
+            if url not in pages and url not in gone:
+                pages[url] = entry
+        
+        current = {canonicalize_url(img['url']): img for entry in pages.values() for img in entry['images']}
+        previous = {canonicalize_url(img['url']): img for entry in self.pages.values() for img in entry['images']}
+        added = [img for key, img in current.items() if key not in previous]
+        removed = [img for key, img in previous.items() if key not in current]
+        
+        created_at = datetime.now(timezone.utc).isoformat()
+        page_status = {status: [url for url, s in statuses.items() if s == status]
+                       for status in ('new', 'changed', 'unchanged')}
+        page_status['failed'] = carried
+        page_status['gone'] = gone
+        delta = {
+            'created_at': created_at,
+            'previous_run': self.previous_run,
+            'pages': page_status,
+            'added': added,
+            'removed': removed,
+        }
+        self._write(self.path, {'version': FINGERPRINT_VERSION, 'created_at': created_at,
+                                'pages': pages, 'crawls': crawls})
+        self._write(self.delta_path, delta)
+        
+        summary = {
+            'previous_run': self.previous_run,
+            'pages_new': len(page_status['new']),
+            'pages_changed': len(page_status['changed']),
+            'pages_unchanged': len(page_status['unchanged']),
+            'pages_gone': len(gone),
+            'images_added': len(added),
+            'images_removed': len(removed),
+            'images_reused': self.images_reused,
+        }
+        self.logger.info(f"Delta: {summary['pages_changed']} changed, {summary['pages_new']} new, "
+                         f"{summary['pages_unchanged']} unchanged pages; {len(added)} images added, "
+                         f"{len(removed)} removed ({self.delta_path.name})")
+        return summary
+    
+    @staticmethod
+    def _write(path: Path, data: Dict):
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
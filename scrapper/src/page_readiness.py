@@ -0,0 +1,186 @@
+"""
+Adaptive page readiness: wait until the page's image set stops changing
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Union
+from urllib.parse import urlsplit
+from playwright.async_api import Page, Request
+from .logger import get_logger
+
+
+# Quiet window and ceiling per wait, overridable per site
+DEFAULT_READINESS = {
+    'quiet_ms': 500,      # image set unchanged and no image requests for this long
+    'ceiling_ms': 8000,   # never wait longer than this
+    'poll_ms': 100,       # how often the state is checked
+}
+
+# Records when the page's image set last changed: <img>/<picture>/<source>
+# nodes added or removed, their src/srcset/data-src changing, or an inline
+# background image changing. Safe to run more than once.
+READINESS_OBSERVER_SCRIPT = r"""
+() => {
+    if (window.__scraperReadiness) return;
+    const state = window.__scraperReadiness = {lastChange: performance.now(), changes: 0};
+    const IMAGE_TAGS = new Set(['IMG', 'PICTURE', 'SOURCE']);
+    const lastBackground = new WeakMap();
+
+    const touchesImages = (node) => node.nodeType === 1 && (
+        IMAGE_TAGS.has(node.tagName) || node.querySelector('img, picture, source') !== null
+    );
+    const backgroundChanged = (el) => {
+        const bg = el.style ? el.style.backgroundImage : '';
+        if (!bg || bg === 'none' || lastBackground.get(el) === bg) return false;
+        lastBackground.set(el, bg);
+        return true;
+    };
+
+    const observer = new MutationObserver((mutations) => {
+        for (const m of mutations) {
+            const changed = m.type === 'attributes'
+                ? (m.attributeName === 'style' ? backgroundChanged(m.target) : IMAGE_TAGS.has(m.target.tagName))
+                : Array.prototype.some.call(m.addedNodes, touchesImages)
+                    || Array.prototype.some.call(m.removedNodes, touchesImages);
+            if (changed) {
+                state.lastChange = performance.now();
+                state.changes++;
+                return;
+            }
+        }
+    });
+    observer.observe(document, {
+        subtree: true, childList: true, attributes: true,
+        attributeFilter: ['src', 'srcset', 'data-src', 'data-srcset', 'style']
+    });
+}
+"""
+
+READINESS_STATE_SCRIPT = """
+() => window.__scraperReadiness
+    ? {sinceChange: performance.now() - window.__scraperReadiness.lastChange,
+       changes: window.__scraperReadiness.changes}
+    : null
+"""
+
+
+def load_readiness_config(config: Union[None, str, Dict]) -> Dict:
+    """Load readiness settings from a dict or JSON file
+
+    Format: {"default": {...}, "sites": {"www.layers.shop": {"ceiling_ms": 12000}}}
+    """
+    if config is None:
+        return {}
+    if isinstance(config, dict):
+        return config
+    with open(Path(config)) as f:
+        return json.load(f)
+
+
+class PageReadiness:
+    """Waits until a page's image set is stable instead of sleeping for fixed times
+
+    A wait finishes as soon as no image-related DOM mutation happened and no
+    image request was in flight for the quiet window, or when the ceiling is hit.
+    """
+    
+    def __init__(self, config: Union[None, str, Dict] = None):
+        self.config = load_readiness_config(config)
+        self.logger = get_logger("PageReadiness")
+        self.timings: List[Dict] = []
+        self._inflight: Set[Request] = set()
+        self._last_network_activity = time.monotonic()
+        self._attached = False
+    
+    def settings_for(self, url: str) -> Dict:
+        """Readiness settings for a page URL (defaults, then config default, then site)"""
+        host = (urlsplit(url).hostname or '').lower()
+        settings = dict(DEFAULT_READINESS)
+        settings.update(self.config.get('default', {}))
+        settings.update(self.config.get('sites', {}).get(host, {}))
+        return settings
+    
+    def _on_request(self, request: Request):
+        if request.resource_type == 'image':
+            self._inflight.add(request)
+            self._last_network_activity = time.monotonic()
+    
+    def _on_request_done(self, request: Request):
+        if request in self._inflight:
+            self._inflight.discard(request)
+            self._last_network_activity = time.monotonic()
+    
+    async def attach(self, page: Page):
+        """Start tracking image requests and DOM changes (call before navigating)"""
+        if self._attached:
+            return
+        page.on('request', self._on_request)
+        page.on('requestfinished', self._on_request_done)
+        page.on('requestfailed', self._on_request_done)
+        await page.add_init_script(f"({READINESS_OBSERVER_SCRIPT})()")
+        self._attached = True
+    
+    @property
+    def inflight_images(self) -> int:
+        """Number of image requests currently in flight"""
+        return len(self._inflight)
+    
+    async def wait_until_ready(self, page: Page, label: str = 'wait',
+                               quiet_ms: Optional[int] = None, ceiling_ms: Optional[int] = None,
+                               record: bool = True, settle_from_now: bool = False) -> Dict:
+        """Wait for the image set to settle, returns (and unless record=False, records) the wait's timing
+        
+        With settle_from_now the quiet window also starts at the call, for waits
+        right after an action (like a scroll) whose effects have not started yet.
+        """
+        if not self._attached:
+            # Late attach: only requests started from now on are tracked
+            await self.attach(page)
+        
+        settings = self.settings_for(page.url)
+        quiet_ms = quiet_ms if quiet_ms is not None else settings['quiet_ms']
+        ceiling_ms = ceiling_ms if ceiling_ms is not None else settings['ceiling_ms']
+        poll = settings['poll_ms'] / 1000
+        
+        start = time.monotonic()
+        outcome = 'ceiling'
+        changes = 0
+        while True:
+            try:
+                # Also installs the observer on documents loaded before attach()
+                await page.evaluate(READINESS_OBSERVER_SCRIPT)
+                state = await page.evaluate(READINESS_STATE_SCRIPT)
+            except Exception as e:
+                # Navigation in progress, try again on the next poll
+                self.logger.debug("Readiness check failed: %s", e)
+                state = None
+            
+            now = time.monotonic()
+            if state is not None:
+                changes = state['changes']
+                network_quiet_ms = (now - self._last_network_activity) * 1000
+                if settle_from_now:
+                    network_quiet_ms = min(network_quiet_ms, (now - start) * 1000)
+                if (not self._inflight and state['sinceChange'] >= quiet_ms
+                        and network_quiet_ms >= quiet_ms):
+                    outcome = 'quiet'
+                    break
+            if (now - start) * 1000 >= ceiling_ms:
+                break
+            await asyncio.sleep(poll)
+        
+        timing = {
+            'label': label,
+            'elapsed_ms': round((time.monotonic() - start) * 1000, 1),
+            'outcome': outcome,
+            'dom_changes': changes,
+            'inflight_images': len(self._inflight),
+        }
+        if record:
+            self.timings.append(timing)
+        self.logger.debug("Ready after %s ms (%s: %s, %d image requests in flight)",
+                          timing['elapsed_ms'], label, outcome, timing['inflight_images'])
+        return timing
@@ -0,0 +1,125 @@
+"""
+Post-download image processing (verify, dimensions, perceptual hash, WebP thumbnails) in a process pool
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+from PIL import Image
+from .logger import get_logger
+
+
+DEFAULT_THUMBNAIL_SIZES = (480,)
+
+
+def dhash(image: Image.Image) -> str:
+    """64-bit difference hash (hex): brightness gradients of a 9x8 grayscale copy"""
+    pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            bits = (bits << 1) | (left > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def process_image(path: str, thumb_dir: str, thumbnail_sizes: Sequence[int], quality: int) -> Dict:
+    """Decode one image file and write its thumbnails (runs in a worker process)
+    
+    Returns ok, format, width, height, mode, dhash and the thumbnail paths by
+    size, or ok=False with the error when the file does not decode.
+    """
+    try:
+        with Image.open(path) as image:
+            image.verify()
+        # verify() leaves the image unusable, decode it fully from a fresh handle
+        with Image.open(path) as image:
+            image.load()
+            info = {
+                'ok': True,
+                'format': (image.format or '').lower(),
+                'width': image.width,
+                'height': image.height,
+                'mode': image.mode,
+                'dhash': dhash(image),
+                'thumbnails': {}
+            }
+            if image.mode not in ('RGB', 'RGBA'):
+                has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+            
+            # Only sizes below the image's own, but always at least the smallest one
+            longest = max(image.width, image.height)
+            sizes = sorted(set(thumbnail_sizes))
+            sizes = [size for size in sizes if size < longest] or sizes[:1]
+            blob_id = Path(path).stem
+            for size in sizes:
+                thumb_path = Path(thumb_dir) / f"{blob_id}-{size}.webp"
+                if not thumb_path.exists():
+                    thumb = image.copy()
+                    thumb.thumbnail((size, size), Image.LANCZOS)
+                    # Temp file + rename, like every other file the scraper writes
+                    tmp_path = thumb_path.with_name(f".{thumb_path.name}.{os.getpid()}")
+                    thumb.save(tmp_path, 'WEBP', quality=quality, method=4)
+                    os.replace(tmp_path, thumb_path)
+                info['thumbnails'][str(size)] = str(thumb_path)
+            return info
+    except Exception as e:
+        return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+
+
+class PostProcessor:
+    """Runs process_image for downloaded blobs on a pool of worker processes
+    
+    Decoding and encoding are CPU-bound, so they run outside the event loop
+    and use all cores; the download loop only awaits the results. Each blob is
+    processed once, however many URLs point at it.
+    """
+    
+    def __init__(self, output_dir: Path, workers: Optional[int] = None,
+                 thumbnail_sizes: Sequence[int] = DEFAULT_THUMBNAIL_SIZES,
+                 quality: int = 80, drop_corrupt: bool = False):
+        self.output_dir = Path(output_dir)
+        self.thumb_dir = self.output_dir / 'thumbs'
+        self.workers = workers or os.cpu_count() or 1
+        self.thumbnail_sizes = tuple(thumbnail_sizes)
+        self.quality = quality
+        self.drop_corrupt = drop_corrupt
+        self.logger = get_logger("PostProcessor")
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self.stats = {'processed': 0, 'corrupt': 0, 'dropped': 0}
+    
+    def start(self):
+        """Start the worker processes"""
+        self.thumb_dir.mkdir(parents=True, exist_ok=True)
+        self._tasks = {}
+        self.stats = {'processed': 0, 'corrupt': 0, 'dropped': 0}
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+    
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+    
+    async def process(self, blob_path: Path) -> Dict:
+        """Verify a blob and create its thumbnails, without blocking the event loop"""
+        key = str(blob_path)
+        task = self._tasks.get(key)
+        if task is None:
+            loop = asyncio.get_running_loop()
+            task = loop.run_in_executor(
+                self.executor, process_image, key, str(self.thumb_dir), self.thumbnail_sizes, self.quality
+            )
+            self._tasks[key] = task
+            info = await task
+            self.stats['processed'] += 1
+            if not info['ok']:
+                self.stats['corrupt'] += 1
+                self.logger.warning("Corrupt image %s: %s", blob_path, info['error'])
+            return info
+        return await task
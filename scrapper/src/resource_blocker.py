@@ -0,0 +1,222 @@
+"""
+Request blocking for the scraper's browser pages
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+from playwright.async_api import Browser, Page, Route
+from .url_optimizer import URLOptimizer
+from .logger import get_logger
+
+
+# Hosts that never serve anything the scraper needs
+ANALYTICS_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net',
+    'facebook.net', 'hotjar.com', 'clarity.ms',
+    'segment.io', 'segment.com', 'klaviyo.com', 'tiktok.com', 'snapchat.com',
+    'pinterest.com', 'bat.bing.com', 'criteo.com', 'nr-data.net',
+    'monorail-edge.shopifysvc.com'
+]
+
+# Built-in profiles, see ResourceBlocker for the meaning of each field
+BLOCKING_PROFILES: Dict[str, Dict] = {
+    'off': {},
+    'balanced': {
+        'block_types': ['font', 'media'],
+        'block_domains': ANALYTICS_DOMAINS,
+    },
+    'lean': {
+        'block_types': ['font', 'media', 'manifest', 'other'],
+        'block_domains': ANALYTICS_DOMAINS,
+        'block_third_party_scripts': True,
+        'allow_domains': ['cdn.shopify.com', 'shopifycdn.com'],
+        'image_mode': 'url_only',
+    },
+}
+
+
+def resolve_profile(spec: Optional[str], url: str = '') -> Dict:
+    """Turn a profile name or JSON file path into a profile dict for a page URL
+
+    A JSON file holds either a single profile, or per-site profiles:
+        {"default": "balanced", "sites": {"www.layers.shop": {...} or "lean"}}
+    """
+    if not spec:
+        return {}
+    if spec in BLOCKING_PROFILES:
+        return dict(BLOCKING_PROFILES[spec], name=spec)
+    
+    path = Path(spec)
+    if not path.exists():
+        raise ValueError(f"Unknown blocking profile '{spec}' (use {', '.join(BLOCKING_PROFILES)} or a JSON file)")
+    with open(path) as f:
+        config = json.load(f)
+    
+    if 'sites' not in config and 'default' not in config:
+        return dict(config, name=config.get('name', path.stem))
+    
+    # Check every named profile up front, so a typo fails when the config is first read
+    named = [config.get('default', 'off')] + list(config.get('sites', {}).values())
+    for name in named:
+        if isinstance(name, str) and name not in BLOCKING_PROFILES:
+            raise ValueError(f"Unknown blocking profile '{name}' in {path} (use {', '.join(BLOCKING_PROFILES)})")
+    
+    host = (urlsplit(url).hostname or '').lower()
+    profile = config.get('sites', {}).get(host, config.get('default', 'off'))
+    if isinstance(profile, str):
+        return dict(BLOCKING_PROFILES[profile], name=profile)
+    return dict(profile, name=profile.get('name', host or path.stem))
+
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    """Whether host equals or is a subdomain of one of the domains"""
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+def _site_of(host: str) -> str:
+    """Rough registrable domain (last two labels) used for first-party checks"""
+    return '.'.join(host.split('.')[-2:])
+
+
+class ResourceBlocker:
+    """Aborts unneeded requests of a page according to a blocking profile
+
+    Profile fields:
+        block_types: resource types to abort (font, media, stylesheet, script, ...)
+        allow_types: if set, only these resource types (plus documents) may load
+        block_domains: hosts (and their subdomains) to abort
+        allow_domains: hosts that are never blocked by type/domain rules
+        block_third_party_scripts: abort scripts not served from the page's own site
+        image_mode: 'load' (default) or 'url_only' -- record image URLs, then abort
+            the request if the image will be refetched at higher resolution anyway
+    """
+    
+    def __init__(self, profile: Dict, on_image_url: Optional[Callable[[str], None]] = None):
+        self.name = profile.get('name', 'custom')
+        self.block_types = set(profile.get('block_types', []))
+        self.allow_types = set(profile.get('allow_types', []))
+        self.block_domains = list(profile.get('block_domains', []))
+        self.allow_domains = list(profile.get('allow_domains', []))
+        self.block_third_party_scripts = profile.get('block_third_party_scripts', False)
+        self.image_mode = profile.get('image_mode', 'load')
+        self.on_image_url = on_image_url
+        self.url_optimizer = URLOptimizer()
+        self.logger = get_logger("ResourceBlocker")
+        self.first_party_site = ''
+        self.stats = {'allowed': 0, 'blocked': 0, 'blocked_by_reason': {}, 'blocked_by_type': {}}
+    
+    @property
+    def is_active(self) -> bool:
+        """Whether the profile blocks anything at all"""
+        return bool(self.block_types or self.allow_types or self.block_domains
+                    or self.block_third_party_scripts or self.image_mode == 'url_only')
+    
+    async def attach(self, page: Page, url: str):
+        """Route all requests of the page through the blocker"""
+        self.first_party_site = _site_of((urlsplit(url).hostname or '').lower())
+        if self.is_active:
+            await page.route('**/*', self._handle_route)
+            self.logger.debug(f"Request blocking profile '{self.name}' enabled")
+    
+    def _block_reason(self, url: str, resource_type: str) -> Optional[str]:
+        """Why a request should be blocked, or None to let it through"""
+        if resource_type == 'document':
+            return None
+        host = (urlsplit(url).hostname or '').lower()
+        
+        if resource_type == 'image' and self.image_mode == 'url_only':
+            if self.on_image_url:
+                self.on_image_url(url)
+            # Images already at their best URL still load so their bodies can be reused
+            if self.url_optimizer.get_high_res_url(url) != url:
+                return 'image_url_only'
+        
+        if _host_matches(host, self.allow_domains):
+            return None
+        if _host_matches(host, self.block_domains):
+            return 'domain'
+        if self.allow_types and resource_type not in self.allow_types:
+            return 'type'
+        if resource_type in self.block_types:
+            return 'type'
+        if (self.block_third_party_scripts and resource_type == 'script'
+                and _site_of(host) != self.first_party_site):
+            return 'third_party_script'
+        return None
+    
+    async def _handle_route(self, route: Route):
+        request = route.request
+        reason = self._block_reason(request.url, request.resource_type)
+        try:
+            if reason is None:
+                self.stats['allowed'] += 1
+                await route.continue_()
+                return
+            self.stats['blocked'] += 1
+            by_reason = self.stats['blocked_by_reason']
+            by_reason[reason] = by_reason.get(reason, 0) + 1
+            by_type = self.stats['blocked_by_type']
+            by_type[request.resource_type] = by_type.get(request.resource_type, 0) + 1
+            await route.abort('blockedbyclient')
+        except Exception as e:
+            # Page closed or request already handled
+            self.logger.debug("Route handling failed for %s: %s", request.url, e)
+
+
+async def _load_once(browser: Browser, url: str, context_options: Dict,
+                     profile: Optional[Dict], timeout: int) -> Dict:
+    """Load a page in a fresh context and measure bytes transferred and load time"""
+    context = await browser.new_context(**context_options)
+    try:
+        page = await context.new_page()
+        blocker = ResourceBlocker(profile or {})
+        await blocker.attach(page, url)
+        
+        size_tasks = []
+        page.on('requestfinished', lambda request: size_tasks.append(asyncio.ensure_future(request.sizes())))
+        
+        start = time.perf_counter()
+        await page.goto(url, wait_until='load', timeout=timeout)
+        load_ms = (time.perf_counter() - start) * 1000
+        try:
+            await page.wait_for_load_state('networkidle', timeout=10000)
+        except Exception:
+            pass
+        
+        sizes = await asyncio.gather(*size_tasks, return_exceptions=True)
+        transferred = sum(
+            s['responseBodySize'] + s['responseHeadersSize']
+            for s in sizes if isinstance(s, dict)
+        )
+        return {
+            'bytes': transferred,
+            'requests': len(size_tasks),
+            'load_ms': round(load_ms, 1),
+            'blocked': blocker.stats['blocked'],
+            'blocked_by_reason': blocker.stats['blocked_by_reason'],
+        }
+    finally:
+        await context.close()
+
+
+async def measure_profile(browser: Browser, url: str, profile: Dict,
+                          context_options: Optional[Dict] = None, timeout: int = 60000) -> Dict:
+    """Compare a page load without blocking against a load with the profile
+
+    Returns bytes and page-load time saved, for tuning a profile per site.
+    """
+    context_options = context_options or {}
+    baseline = await _load_once(browser, url, context_options, None, timeout)
+    blocked = await _load_once(browser, url, context_options, profile, timeout)
+    return {
+        'url': url,
+        'profile': profile.get('name', 'custom'),
+        'baseline': baseline,
+        'with_profile': blocked,
+        'bytes_saved': baseline['bytes'] - blocked['bytes'],
+        'load_time_saved_ms': round(baseline['load_ms'] - blocked['load_ms'], 1),
+    }
@@ -0,0 +1,112 @@
+"""
+Store for image response bodies captured from the browser
+"""
+
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Set
+import aiofiles
+from .image_index import canonicalize_url
+from .logger import get_logger
+
+
+# Response headers kept with a body (needed later for the download cache)
+KEPT_HEADERS = {
+    'content-type': 'Content-Type',
+    'etag': 'ETag',
+    'last-modified': 'Last-Modified',
+    'cache-control': 'Cache-Control',
+    'expires': 'Expires',
+}
+
+
+class ResponseBodyStore:
+    """Keeps captured bodies in memory up to a byte cap and spills the rest to disk"""
+    
+    def __init__(self, memory_limit: int = 64 * 1024 * 1024, spill_dir: Optional[Path] = None):
+        self.memory_limit = memory_limit
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.logger = get_logger("ResponseBodyStore")
+        self.memory_bytes = 0
+        self.spilled_bytes = 0
+        self._entries: Dict[str, Dict] = {}
+        # URLs whose body is being written (a spill write yields to the loop)
+        self._pending: Set[str] = set()
+        self._own_spill_dir = False
+    
+    def _ensure_spill_dir(self) -> Path:
+        if self.spill_dir is None:
+            self.spill_dir = Path(tempfile.mkdtemp(prefix='scraper-bodies-'))
+            self._own_spill_dir = True
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        return self.spill_dir
+    
+    async def put(self, url: str, body: bytes, headers: Dict[str, str]) -> bool:
+        """Store a body with its (lowercase-keyed) response headers
+        
+        Returns False if the URL is already stored or being stored. The
+        check and the reservation happen before the first await, so two
+        responses for the same URL never both write a body.
+        """
+        key = canonicalize_url(url)
+        if key in self._entries or key in self._pending:
+            return False
+        self._pending.add(key)
+        
+        try:
+            entry = {
+                'headers': {name: headers[raw] for raw, name in KEPT_HEADERS.items() if raw in headers},
+                'size': len(body)
+            }
+            if self.memory_bytes + len(body) <= self.memory_limit:
+                entry['body'] = body
+                self.memory_bytes += len(body)
+            else:
+                path = self._ensure_spill_dir() / uuid.uuid4().hex
+                async with aiofiles.open(path, 'wb') as f:
+                    await f.write(body)
+                entry['path'] = path
+                self.spilled_bytes += len(body)
+            self._entries[key] = entry
+        finally:
+            self._pending.discard(key)
+        return True
+    
+    def headers(self, url: str) -> Optional[Dict[str, str]]:
+        """Response headers of a stored body"""
+        entry = self._entries.get(canonicalize_url(url))
+        return entry['headers'] if entry else None
+    
+    async def read(self, url: str) -> Optional[bytes]:
+        """Get a stored body (from memory or the spill file)"""
+        entry = self._entries.get(canonicalize_url(url))
+        if entry is None:
+            return None
+        if 'body' in entry:
+            return entry['body']
+        async with aiofiles.open(entry['path'], 'rb') as f:
+            return await f.read()
+    
+    def clear(self):
+        """Drop all bodies and remove spill files"""
+        for entry in self._entries.values():
+            if 'path' in entry:
+                try:
+                    entry['path'].unlink()
+                except FileNotFoundError:
+                    pass
+        self._entries.clear()
+        self.memory_bytes = 0
+        self.spilled_bytes = 0
+        if self._own_spill_dir and self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+            self._own_spill_dir = False
+    
+    def __contains__(self, url: str) -> bool:
+        return canonicalize_url(url) in self._entries
+    
+    def __len__(self) -> int:
+        return len(self._entries)
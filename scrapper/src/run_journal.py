@@ -0,0 +1,108 @@
+"""
+Checkpoint journal of completed pages and downloads, for resuming runs
+"""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, Optional
+import aiofiles
+from .image_index import canonicalize_url
+from .logger import get_logger
+
+
+class RunJournal:
+    """Append-only record of what a run has finished (run_journal.jsonl)
+    
+    A 'page' record holds the extraction result of a page, an 'image' record
+    the download result of an image with its blob ID (sha256) and size. Each
+    record is flushed as soon as the work is done, so after a crash a resumed
+    run skips everything journaled and redoes only failed or missing items.
+    """
+    
+    def __init__(self, output_dir: Path, name: str = 'run_journal.jsonl'):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / name
+        self.logger = get_logger("RunJournal")
+        self.pages: Dict[str, Dict] = {}
+        self.images: Dict[str, Dict] = {}
+        self._file = None
+        self._lock = asyncio.Lock()
+    
+    def load(self):
+        """Read the journal of the previous run"""
+        self.pages = {}
+        self.images = {}
+        if not self.path.exists():
+            return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn last line of a run that was killed mid-write
+                    continue
+                if record.get('type') == 'page':
+                    self.pages[record['url']] = record['result']
+                elif record.get('type') == 'image':
+                    self.images[canonicalize_url(record['url'])] = record
+        self.logger.info(f"Journal: {len(self.pages)} pages and {len(self.images)} images completed previously")
+    
+    async def open(self, resume: bool = False):
+        """Start journaling; a fresh run (resume=False) forgets the previous journal"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if resume:
+            self.load()
+        else:
+            self.pages = {}
+            self.images = {}
+        self._file = await aiofiles.open(self.path, 'a' if resume else 'w')
+    
+    async def close(self):
+        """Close the journal file"""
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+    
+    async def _write(self, record: Dict):
+        if self._file is None:
+            return
+        async with self._lock:
+            await self._file.write(json.dumps(record) + '\n')
+            await self._file.flush()
+    
+    def completed_page(self, url: str) -> Optional[Dict]:
+        """Extraction result of a page finished by the previous run"""
+        return self.pages.get(url)
+    
+    def completed_image(self, url: str) -> Optional[Dict]:
+        """Download result of an image finished by the previous run, if its files are intact"""
+        record = self.images.get(canonicalize_url(url))
+        if record is None:
+            return None
+        result = record['result']
+        for path in (Path(result['blob_path']), Path(result['filepath'])):
+            if not path.exists() or path.stat().st_size != record['size']:
+                return None
+        return result
+    
+    async def record_page(self, result: Dict):
+        """Journal an extracted page"""
+        self.pages[result['url']] = result
+        await self._write({'type': 'page', 'url': result['url'], 'result': result})
+    
+    async def record_image(self, result: Dict):
+        """Journal a downloaded image with its content hash and size"""
+        key = canonicalize_url(result['url'])
+        previous = self.images.get(key)
+        if previous is not None and previous['blob_id'] == result['blob_id']:
+            return
+        record = {
+            'type': 'image',
+            'url': result['url'],
+            'blob_id': result['blob_id'],
+            'size': Path(result['blob_path']).stat().st_size,
+            'result': result
+        }
+        self.images[key] = record
+        await self._write(record)
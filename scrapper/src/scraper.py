@@ -5,23 +5,69 @@ Main scraper orchestrator
 import asyncio
 import json
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import aiofiles
-from playwright.async_api import async_playwright, Page, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright, Browser, Page, TimeoutError as PlaywrightTimeoutError
 
+from .browser_pool import BrowserContextPool
 from .network_interceptor import NetworkInterceptor
+from .response_body_store import ResponseBodyStore
+from .resource_blocker import ResourceBlocker, resolve_profile, measure_profile
 from .image_extractor import ImageExtractor
 from .image_downloader import ImageDownloader
 from .image_filter import ImageFilter
-from .brand_model_extractor import BrandModelExtractor
+from .image_probe import ImageProbe
+from .brand_model_extractor import BrandModelExtractor, merge_brands_models
+from .image_index import ImageIndex
+from .page_readiness import PageReadiness, load_readiness_config
+from .lazy_scroller import LazyScroller
+from .metadata_writer import MetadataWriter
+from .catalog import CatalogBuilder
+from .metrics import RunMetrics
+from .post_processor import PostProcessor, DEFAULT_THUMBNAIL_SIZES
+from .near_duplicates import NearDuplicateIndex
+from .page_fingerprints import PageFingerprints, product_json_hash
+from .run_journal import RunJournal
+from .sitemap import SitemapReader
+from .shopify_product import ShopifyProductFetcher
 from .logger import get_logger
 
 
+BROWSER_ARGS = ['--disable-blink-features=AutomationControlled']
+
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+
 class PhoneImageScraper:
     """Main scraper class that orchestrates all components"""
     
     def __init__(self, output_dir: str = "scraped_images", max_concurrent_downloads: int = 5, 
-                 log_file: Optional[str] = None):
+                 log_file: Optional[str] = None, use_download_cache: bool = True,
+                 download_cache_max_bytes: Optional[int] = None,
+                 capture_response_bodies: bool = True,
+                 body_memory_limit: int = 64 * 1024 * 1024,
+                 blocking_profile: Optional[str] = 'off',
+                 readiness_config: Optional[str] = None,
+                 auto_scroll: bool = True,
+                 keywords_file: Optional[str] = None,
+                 min_image_size: int = 0,
+                 skip_small_images: bool = False,
+                 adaptive_concurrency: bool = True,
+                 max_concurrent_limit: Optional[int] = None,
+                 connections_per_host: Optional[int] = None,
+                 resume: bool = False,
+                 post_process: bool = False,
+                 post_process_workers: Optional[int] = None,
+                 thumbnail_sizes: Sequence[int] = DEFAULT_THUMBNAIL_SIZES,
+                 drop_corrupt: bool = False,
+                 near_duplicate_threshold: Optional[int] = None,
+                 product_json: bool = True,
+                 build_catalog: bool = True,
+                 metrics_file: Optional[str] = None,
+                 delta: bool = False):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.max_concurrent_downloads = max_concurrent_downloads
@@ -30,17 +76,74 @@ class PhoneImageScraper:
         log_path = log_file or str(self.output_dir / 'scraper.log')
         self.logger = get_logger("PhoneImageScraper", log_path)
         
+        # Request blocking profile name (or JSON file), validated up front
+        self.blocking_profile = blocking_profile
+        resolve_profile(blocking_profile)
+        
+        # Quiet window and ceilings for page readiness waits (dict or JSON file, per site)
+        self.readiness_config = load_readiness_config(readiness_config)
+        
+        # Image bodies the browser already loaded (reused instead of downloading again)
+        self.body_store = ResponseBodyStore(body_memory_limit) if capture_response_bodies else None
+        
+        # Stage spans, download histograms and loop lag, written to run_report.json and a
+        # Prometheus textfile (metrics.prom unless metrics_file points e.g. at node_exporter's directory)
+        self.metrics = RunMetrics()
+        self.metrics_file = Path(metrics_file) if metrics_file else self.output_dir / 'metrics.prom'
+        
         # Initialize components
-        self.network_interceptor = NetworkInterceptor()
+        self.network_interceptor = NetworkInterceptor(self.body_store)
         self.image_extractor = ImageExtractor()
+        self.lazy_scroller = LazyScroller() if auto_scroll else None
+        # Images whose longest side is below min_image_size are downloaded last (or skipped)
+        self.image_filter = ImageFilter(
+            keywords_file,
+            min_image_size=min_image_size,
+            small_image_action='skip' if skip_small_images else 'defer'
+        )
         self.image_downloader = ImageDownloader(
             self.output_dir, 
-            max_concurrent=max_concurrent_downloads
+            max_concurrent=max_concurrent_downloads,
+            use_cache=use_download_cache,
+            cache_max_bytes=download_cache_max_bytes,
+            probe=ImageProbe() if min_image_size > 0 else None,
+            size_policy=self.image_filter.size_decision,
+            adaptive_concurrency=adaptive_concurrency,
+            max_concurrent_limit=max_concurrent_limit,
+            connector_options={'limit_per_host': connections_per_host} if connections_per_host else None,
+            post_processor=PostProcessor(
+                self.output_dir,
+                workers=post_process_workers,
+                thumbnail_sizes=thumbnail_sizes,
+                drop_corrupt=drop_corrupt
+            ) if post_process or near_duplicate_threshold is not None else None,
+            metrics=self.metrics
         )
-        self.image_filter = ImageFilter()
         self.brand_model_extractor = BrandModelExtractor()
+        
+        # Shopify product pages are read from /products/<handle>.js(on) without a browser when possible
+        self.product_json = product_json
+        
+        # brand -> model -> design index for the storefront, written after metadata.json
+        self.catalog_builder = CatalogBuilder(self.output_dir) if build_catalog else None
+        
+        # Max dHash distance (bits of 64) for two images to count as the same render;
+        # needs post-processing, which computes the hashes
+        self.near_duplicate_threshold = near_duplicate_threshold
+        
+        # Completed pages/downloads, so an interrupted run can be resumed
+        self.resume = resume
+        self.journal = RunJournal(self.output_dir)
+        
+        # Per-page fingerprints are recorded on every run (with delta.json listing added/removed
+        # images); delta runs use the previous ones to skip unchanged pages and their downloads
+        self.delta = delta
+        self.fingerprints = PageFingerprints(self.output_dir)
+        # Images taken from the journal of the resumed run (fingerprint reuse is counted separately)
+        self.images_resumed = 0
     
-    async def _navigate_with_retry(self, page: Page, url: str, max_retries: int = 3) -> bool:
+    async def _navigate_with_retry(self, page: Page, url: str, max_retries: int = 3,
+                                   readiness: Optional[PageReadiness] = None) -> bool:
         """Navigate to page with retry logic and flexible wait strategies"""
         wait_strategies = [
             ('load', 30000),           # Wait for load event (30s)
@@ -57,19 +160,12 @@ class PhoneImageScraper:
                     await page.goto(url, wait_until=wait_until, timeout=timeout)
                     self.logger.success(f"Page loaded successfully using '{wait_until}' strategy")
                     
-                    # Additional wait for dynamic content
-                    self.logger.debug("Waiting for dynamic content to load...")
-                    await asyncio.sleep(2)
-                    
-                    # Try to wait for network to be idle (but don't fail if it times out)
-                    try:
-                        await page.wait_for_load_state('networkidle', timeout=10000)
-                        self.logger.debug("Network reached idle state")
-                    except PlaywrightTimeoutError:
-                        self.logger.warning("Network did not reach idle state, continuing anyway...")
+                    # Wait until dynamic content stops changing the page's images
+                    if readiness is not None:
+                        await readiness.wait_until_ready(page, 'navigation')
                     
                     return True
-                    
+                
                 except PlaywrightTimeoutError as e:
                     self.logger.warning(f"Timeout with '{wait_until}' strategy: {e}")
                     continue
@@ -86,118 +182,562 @@ class PhoneImageScraper:
         
         return False
     
+    async def _launch_browser(self, playwright) -> Browser:
+        """Launch Chromium with the scraper's settings"""
+        self.logger.debug("Launching browser...")
+        # Launch browser with high-quality settings
+        browser = await playwright.chromium.launch(
+            headless=True,
+            args=BROWSER_ARGS
+        )
+        self.logger.success("Browser launched")
+        return browser
+    
+    async def _extract_page(self, page: Page, url: str, network_interceptor: NetworkInterceptor) -> Dict:
+        """Load one page and extract, filter and categorize its images
+        
+        Returns a page result with brand/model info, image counts and the
+        list of relevant (phone + design) images to download.
+        """
+        # Set up network interception
+        self.logger.progress("Setting up network interception...")
+        await network_interceptor.setup_interception(page)
+        self.logger.success("Network interception enabled")
+        
+        # Skip fonts, analytics, etc. according to the blocking profile
+        blocker = ResourceBlocker(
+            resolve_profile(self.blocking_profile, url),
+            on_image_url=network_interceptor.record_image_url
+        )
+        await blocker.attach(page, url)
+        
+        # Track image requests and DOM changes so waits end once the page settles
+        readiness = PageReadiness(self.readiness_config)
+        await readiness.attach(page)
+        
+        # Navigate to the page with retry logic
+        self.logger.progress(f"Navigating to page: {url}")
+        with self.metrics.span('navigate'):
+            navigation_success = await self._navigate_with_retry(page, url, readiness=readiness)
+        
+        if not navigation_success:
+            self.logger.error("Failed to navigate to page after all retries")
+            raise Exception("Failed to load page after multiple attempts")
+        
+        # Extract brand and model information
+        self.logger.progress("Extracting brand and model information...")
+        try:
+            with self.metrics.span('brand_model'):
+                brands_models = await self.brand_model_extractor.extract_brand_model_info(page)
+            self.logger.success(f"Found {len(brands_models.get('brands', []))} brands")
+        except Exception as e:
+            self.logger.warning(f"Error extracting brand/model info: {e}")
+            brands_models = {'brands': [], 'models': {}}
+        
+        # Scroll through the page so lazy-loaded images load, collecting <img>s as they appear
+        page_images = ImageIndex()
+        scroll_stats = None
+        if self.lazy_scroller is not None:
+            self.logger.progress("Scrolling to trigger lazy-loaded images...")
+            try:
+                with self.metrics.span('scroll'):
+                    scroll_stats = await self.lazy_scroller.scroll(
+                        page, readiness,
+                        on_step=lambda: self.image_extractor.collect_img_images(page, url, page_images)
+                    )
+                self.logger.success(f"Scrolled {scroll_stats['steps']} steps, "
+                                    f"{scroll_stats['new_images']} images found while scrolling")
+            except Exception as e:
+                self.logger.warning(f"Error while scrolling page: {e}")
+        
+        # Extract all images
+        self.logger.progress("Extracting images from page...")
+        network_images = network_interceptor.get_captured_images()
+        self.logger.debug(f"Captured {len(network_images)} images from network requests")
+        
+        with self.metrics.span('extract_images'):
+            images = await self.image_extractor.extract_images_from_page(
+                page, url, network_images, readiness, images=page_images
+            )
+        self.logger.success(f"Found {len(images)} total images")
+        
+        # Finish body captures while the page is still open
+        await network_interceptor.drain()
+        
+        if blocker.is_active:
+            self.logger.info(f"  Requests blocked: {blocker.stats['blocked']} "
+                             f"(profile '{blocker.name}', {blocker.stats['allowed']} allowed)")
+        wait_ms = sum(t['elapsed_ms'] for t in readiness.timings)
+        wait_outcomes = ', '.join(f"{t['label']}: {t['outcome']}" for t in readiness.timings)
+        self.logger.info(f"  Waited {wait_ms:.0f} ms for the page to settle ({wait_outcomes})")
+        
+        return self._page_result(url, images, brands_models, {
+            'source': 'browser',
+            'requests_blocked': blocker.stats['blocked'],
+            'wait_timings': readiness.timings,
+            'scroll': scroll_stats
+        })
+    
+    def _page_result(self, url: str, images: List[Dict], brands_models: Dict, extraction: Dict) -> Dict:
+        """Filter and categorize a page's images into its page result"""
+        # Filter images
+        self.logger.progress("Filtering images...")
+        with self.metrics.span('filter'):
+            phone_images, design_images, other_images = self.image_filter.filter_images(images)
+        self.logger.info(f"  Phone images: {len(phone_images)}")
+        self.logger.info(f"  Design images: {len(design_images)}")
+        self.logger.info(f"  Other images: {len(other_images)}")
+        
+        # Combine phone and design images
+        all_relevant_images = phone_images + design_images
+        
+        # If still no images, use all
+        if not all_relevant_images:
+            self.logger.warning("No phone/design images found, using all images")
+            all_relevant_images = images
+        
+        # Element handles (from the handle-loop fallback) die with the page and can't be journaled
+        all_relevant_images = [{k: v for k, v in img.items() if k != 'element'} for img in all_relevant_images]
+        
+        return {
+            'url': url,
+            'total_images_found': len(images),
+            'phone_images_count': len(phone_images),
+            'design_images_count': len(design_images),
+            'other_images_count': len(other_images),
+            'brands_models': brands_models,
+            **extraction,
+            'relevant_images': all_relevant_images
+        }
+    
+    async def _extract_product_json(self, fetcher: ShopifyProductFetcher, url: str,
+                                    products: Optional[Dict[str, Optional[Dict]]] = None) -> Optional[Dict]:
+        """Page result from the Shopify product JSON, or None when the page needs the browser
+        
+        products holds product JSON already fetched by the fingerprint check
+        (None for pages without it), which is then not fetched again.
+        """
+        try:
+            product = products[url] if products and url in products else await fetcher.fetch_product(url)
+            extracted = fetcher.extract_product(product, url) if product is not None else None
+        except Exception as e:
+            self.logger.warning(f"Error reading product JSON for {url}: {e}")
+            return None
+        if product is None:
+            self.logger.debug("No product JSON for %s, using the browser", url)
+            return None
+        # Designs rendered by JS and custom device pickers only show up in the browser
+        if extracted is None:
+            self.logger.info("Product JSON of %s lists no images, falling back to the browser", url)
+            return None
+        images, brands_models = extracted
+        if not brands_models['brands']:
+            self.logger.info("Product JSON of %s has no brand/model options, falling back to the browser", url)
+            return None
+        self.logger.success(f"Read {len(images)} images and {len(brands_models['brands'])} brands "
+                            f"from product JSON: {url}")
+        return self._page_result(url, images, brands_models, {
+            'source': 'product_json',
+            'product_json_hash': product_json_hash(product),
+            'requests_blocked': 0,
+            'wait_timings': [],
+            'scroll': None
+        })
+    
+    async def _extract_pages_from_json(self, urls: List[str],
+                                       products: Optional[Dict[str, Optional[Dict]]] = None) -> Dict[str, Dict]:
+        """Page results of every URL whose product JSON could be read (one pooled session)"""
+        if not self.product_json:
+            return {}
+        with self.metrics.span('product_json', pages=len(urls)):
+            async with ShopifyProductFetcher(CONTEXT_OPTIONS['user_agent']) as fetcher:
+                results = await asyncio.gather(*(
+                    self._extract_product_json(fetcher, url, products) for url in urls
+                ))
+        return {url: result for url, result in zip(urls, results) if result is not None}
+    
+    async def _check_fingerprints(self, urls: List[str]) -> Tuple[Dict[str, Dict], Dict[str, Optional[Dict]]]:
+        """Delta runs: cheap check of each page's product JSON against the previous run's fingerprint
+        
+        Returns the previous page results of unchanged pages (which need no
+        extraction) and the product JSON fetched for the other pages.
+        """
+        if not self.delta or not self.fingerprints.pages:
+            return {}, {}
+        with self.metrics.span('fingerprint', pages=len(urls)):
+            async with ShopifyProductFetcher(CONTEXT_OPTIONS['user_agent']) as fetcher:
+                products = await asyncio.gather(*(fetcher.fetch_product(url) for url in urls))
+        unchanged = {}
+        fetched = {}
+        for url, product in zip(urls, products):
+            result = self.fingerprints.previous_result(url, product_json_hash(product)) if product else None
+            if result is not None:
+                unchanged[url] = result
+            else:
+                fetched[url] = product
+        self.logger.info(f"Fingerprint check: {len(unchanged)}/{len(urls)} pages unchanged since the last run")
+        return unchanged, fetched
+    
+    def _completed_image(self, url: str) -> Optional[Dict]:
+        """Download result to reuse instead of downloading: resumed run first, then unchanged pages"""
+        result = self.journal.completed_image(url) if self.resume else None
+        if result is not None:
+            self.images_resumed += 1
+        elif self.delta:
+            result = self.fingerprints.completed_image(url)
+        return result
+    
+    async def _download_and_save(self, source_url: str, page_results: List[Dict],
+                                 extra_metadata: Optional[Dict] = None,
+                                 failed_urls: Sequence[str] = (), crawl: Optional[str] = None) -> Dict:
+        """Download the relevant images of all page results and write the metadata
+        
+        Image records are streamed to metadata.jsonl as downloads complete,
+        followed by a summary record; metadata.json is then built from it.
+        Page fingerprints and delta.json (images added/removed since the
+        previous run) are written alongside. Returns the summary
+        (metadata.json without the image list).
+        """
+        # Unchanged pages of a delta run reuse their previous downloads
+        page_status = self.fingerprints.classify(page_results, reuse_downloads=self.delta)
+        self.images_resumed = 0
+        
+        # Images shared between pages are downloaded once
+        download_index = ImageIndex()
+        for result in page_results:
+            for img in result['relevant_images']:
+                download_index.add(dict(img, page_url=result['url']))
+        all_relevant_images = download_index.images()
+        
+        # Download images, recording each one as soon as it is saved
+        self.logger.progress(f"Downloading {len(all_relevant_images)} images...")
+        metadata_writer = MetadataWriter(self.output_dir)
+        await metadata_writer.open(source_url)
+        
+        async def record_image(index: int, result: Dict):
+            await metadata_writer.write_image(index, result)
+            await self.journal.record_image(result)
+        
+        try:
+            with self.metrics.span('download', images=len(all_relevant_images)):
+                results = await self.image_downloader.download_images(
+                    all_relevant_images,
+                    body_store=self.body_store,
+                    on_result=record_image,
+                    completed=self._completed_image if self.resume or self.delta else None
+                )
+            downloaded_count = len([r for r in results if r])
+            self.logger.success(f"Downloaded {downloaded_count}/{len(all_relevant_images)} images")
+            
+            # Save metadata
+            self.logger.progress("Saving metadata...")
+            metadata = {
+                'source_url': source_url,
+                'total_images_found': sum(r['total_images_found'] for r in page_results),
+                'phone_images_count': sum(r['phone_images_count'] for r in page_results),
+                'design_images_count': sum(r['design_images_count'] for r in page_results),
+                'other_images_count': sum(r['other_images_count'] for r in page_results),
+                'images_downloaded': downloaded_count,
+                'unique_blobs': len({r['blob_id'] for r in results if r}),
+                'bodies_reused': self.image_downloader.reused_count,
+                'requests_blocked': sum(r.get('requests_blocked', 0) for r in page_results),
+                'brands_models': merge_brands_models([r['brands_models'] for r in page_results]),
+                'wait_timings': [dict(t, page_url=r['url']) for r in page_results for t in r.get('wait_timings', [])],
+            }
+            if self.image_downloader.cache:
+                metadata['download_cache'] = dict(self.image_downloader.cache.stats)
+            metadata['download_concurrency'] = self.image_downloader.limiter.summary()
+            if self.image_downloader.probe:
+                metadata['probe'] = dict(self.image_downloader.probe_stats)
+                metadata['skipped_small_images'] = self.image_downloader.skipped_images
+            if self.image_downloader.post_processor:
+                metadata['post_processing'] = dict(self.image_downloader.post_processor.stats)
+            if self.near_duplicate_threshold is not None:
+                with self.metrics.span('near_duplicates'):
+                    metadata['near_duplicates'] = await self._group_near_duplicates(results, metadata_writer)
+            if self.resume:
+                metadata['images_resumed'] = self.images_resumed
+            metadata['delta'] = self.fingerprints.save(page_results, results, page_status, failed_urls, crawl)
+            if extra_metadata:
+                metadata.update(extra_metadata)
+            await metadata_writer.write_summary(metadata)
+        finally:
+            await metadata_writer.close()
+            if self.image_downloader.post_processor is not None:
+                self.image_downloader.post_processor.shutdown()
+            if self.body_store is not None:
+                self.body_store.clear()
+        
+        with self.metrics.span('metadata'):
+            metadata_path = metadata_writer.build_json()
+        
+        self.logger.success("Metadata saved")
+        if self.catalog_builder is not None and metadata_path:
+            with self.metrics.span('catalog'):
+                self.catalog_builder.build(metadata_path)
+        
+        self.logger.info("")
+        self.logger.info("=" * 60)
+        self.logger.success("Scraping complete!")
+        self.logger.info("=" * 60)
+        self.logger.info(f"  Total images found: {metadata['total_images_found']}")
+        self.logger.info(f"  Phone images: {metadata['phone_images_count']}")
+        self.logger.info(f"  Design images: {metadata['design_images_count']}")
+        self.logger.info(f"  Images downloaded: {metadata['images_downloaded']}")
+        self.logger.info(f"  Output directory: {self.output_dir.absolute()}")
+        self.logger.info(f"  Metadata saved to: {metadata_path} ({metadata_writer.jsonl_path.name})")
+        self.logger.info("=" * 60)
+        
+        return metadata
+    
+    async def _group_near_duplicates(self, results: List[Optional[Dict]], metadata_writer: MetadataWriter) -> Dict:
+        """Group downloaded images by dHash and keep the highest-resolution one of each group"""
+        index = NearDuplicateIndex(self.near_duplicate_threshold)
+        for idx, result in enumerate(results):
+            info = (result or {}).get('image') or {}
+            if info.get('dhash'):
+                index.add(idx, info['dhash'], info.get('width', 0), info.get('height', 0))
+        groups = index.groups()
+        
+        await metadata_writer.write_near_duplicates([
+            {
+                'keep': group[0],
+                'duplicates': [{'index': idx, 'url': results[idx]['url']} for idx in group[1:]]
+            }
+            for group in groups
+        ])
+        removed = sum(len(group) - 1 for group in groups)
+        self.logger.info(f"Near-duplicates: {len(groups)} groups, {removed} images left out of metadata.json "
+                         f"(threshold {self.near_duplicate_threshold} bits)")
+        return {'threshold': self.near_duplicate_threshold, 'groups': len(groups), 'images_removed': removed}
+    
+    def rebuild_metadata(self) -> Optional[Path]:
+        """Rebuild metadata.json (and catalog.json) from the metadata.jsonl of the last (possibly interrupted) run"""
+        metadata_path = MetadataWriter(self.output_dir).build_json()
+        if metadata_path:
+            self.logger.success(f"Metadata rebuilt: {metadata_path}")
+            if self.catalog_builder is not None:
+                self.catalog_builder.build(metadata_path)
+        return metadata_path
+    
+    async def measure_blocking(self, url: str) -> Dict:
+        """Load a page with and without the blocking profile and report what it saves
+        
+        Writes blocking_report.json to the output directory.
+        """
+        profile = resolve_profile(self.blocking_profile, url)
+        self.logger.progress(f"Measuring blocking profile '{profile.get('name', 'off')}' on {url}")
+        async with async_playwright() as p:
+            browser = await self._launch_browser(p)
+            try:
+                report = await measure_profile(browser, url, profile, CONTEXT_OPTIONS)
+            finally:
+                await browser.close()
+        
+        report_path = self.output_dir / 'blocking_report.json'
+        async with aiofiles.open(report_path, 'w') as f:
+            await f.write(json.dumps(report, indent=2))
+        
+        self.logger.info(f"  Baseline: {report['baseline']['bytes']} bytes, {report['baseline']['load_ms']} ms")
+        self.logger.info(f"  With profile: {report['with_profile']['bytes']} bytes, "
+                         f"{report['with_profile']['load_ms']} ms, {report['with_profile']['blocked']} requests blocked")
+        self.logger.success(f"Saved {report['bytes_saved']} bytes and {report['load_time_saved_ms']} ms "
+                            f"(report: {report_path})")
+        return report
+    
+    def _start_metrics(self):
+        """Start measuring a run"""
+        self.metrics.reset()
+        self.metrics.start_loop_monitor()
+    
+    async def _write_metrics(self):
+        """Finish the run's measurements and write run_report.json and the Prometheus textfile"""
+        await self.metrics.stop_loop_monitor()
+        self.metrics.finish()
+        self.metrics.write(self.output_dir / 'run_report.json', self.metrics_file)
+        stages = ', '.join(f"{name} {entry['total_s']:.2f}s" for name, entry in self.metrics.stage_totals().items())
+        self.logger.info(f"Stage times: {stages} (run_report.json, {self.metrics_file.name})")
+    
     async def scrape_page(self, url: str):
         """Main scraping function"""
         self.logger.info("=" * 60)
         self.logger.info(f"Starting scrape of: {url}")
         self.logger.info("=" * 60)
         
+        self._start_metrics()
         try:
-            async with async_playwright() as p:
-                self.logger.debug("Launching browser...")
-                # Launch browser with high-quality settings
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=['--disable-blink-features=AutomationControlled']
-                )
-                self.logger.success("Browser launched")
-                
-                self.logger.debug("Creating browser context...")
-                context = await browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                )
-                
-                page = await context.new_page()
-                self.logger.debug("New page created")
-                
-                # Set up network interception
-                self.logger.progress("Setting up network interception...")
-                await self.network_interceptor.setup_interception(page)
-                self.logger.success("Network interception enabled")
-                
-                # Navigate to the page with retry logic
-                self.logger.progress("Navigating to page...")
-                navigation_success = await self._navigate_with_retry(page, url)
-                
-                if not navigation_success:
-                    self.logger.error("Failed to navigate to page after all retries")
-                    await browser.close()
-                    raise Exception("Failed to load page after multiple attempts")
-                
-                # Extract brand and model information
-                self.logger.progress("Extracting brand and model information...")
-                try:
-                    brands_models = await self.brand_model_extractor.extract_brand_model_info(page)
-                    self.logger.success(f"Found {len(brands_models.get('brands', []))} brands")
-                except Exception as e:
-                    self.logger.warning(f"Error extracting brand/model info: {e}")
-                    brands_models = {'brands': [], 'models': {}}
-                
-                # Extract all images
-                self.logger.progress("Extracting images from page...")
-                network_images = self.network_interceptor.get_captured_images()
-                self.logger.debug(f"Captured {len(network_images)} images from network requests")
-                
-                images = await self.image_extractor.extract_images_from_page(page, url, network_images)
-                self.logger.success(f"Found {len(images)} total images")
-                
-                # Filter images
-                self.logger.progress("Filtering images...")
-                phone_images, design_images, other_images = self.image_filter.filter_images(images)
-                self.logger.info(f"  Phone images: {len(phone_images)}")
-                self.logger.info(f"  Design images: {len(design_images)}")
-                self.logger.info(f"  Other images: {len(other_images)}")
-                
-                # Combine phone and design images
-                all_relevant_images = phone_images + design_images
-                
-                # If still no images, use all
-                if not all_relevant_images:
-                    self.logger.warning("No phone/design images found, using all images")
-                    all_relevant_images = images
-                
-                # Download images
-                self.logger.progress(f"Downloading {len(all_relevant_images)} images...")
-                results = await self.image_downloader.download_images(all_relevant_images)
-                downloaded_count = len([r for r in results if r])
-                self.logger.success(f"Downloaded {downloaded_count}/{len(all_relevant_images)} images")
-                
-                # Save metadata
-                self.logger.progress("Saving metadata...")
-                metadata = {
-                    'source_url': url,
-                    'total_images_found': len(images),
-                    'phone_images_count': len(phone_images),
-                    'design_images_count': len(design_images),
-                    'other_images_count': len(other_images),
-                    'images_downloaded': downloaded_count,
-                    'brands_models': brands_models,
-                    'images': [r for r in results if r]
-                }
-                
-                metadata_path = self.output_dir / 'metadata.json'
-                async with aiofiles.open(metadata_path, 'w') as f:
-                    await f.write(json.dumps(metadata, indent=2))
-                
-                self.logger.success("Metadata saved")
-                
-                self.logger.info("")
-                self.logger.info("=" * 60)
-                self.logger.success("Scraping complete!")
-                self.logger.info("=" * 60)
-                self.logger.info(f"  Total images found: {metadata['total_images_found']}")
-                self.logger.info(f"  Phone images: {metadata['phone_images_count']}")
-                self.logger.info(f"  Design images: {metadata['design_images_count']}")
-                self.logger.info(f"  Images downloaded: {metadata['images_downloaded']}")
-                self.logger.info(f"  Output directory: {self.output_dir.absolute()}")
-                self.logger.info(f"  Metadata saved to: {metadata_path}")
-                self.logger.info("=" * 60)
-                
-                await browser.close()
-                self.logger.debug("Browser closed")
-                
+            await self.journal.open(self.resume)
+            self.fingerprints.load()
+            page_result = self.journal.completed_page(url)
+            if page_result is not None:
+                self.logger.info("Page already extracted by the resumed run, skipping the browser")
+            else:
+                unchanged, products = await self._check_fingerprints([url])
+                page_result = unchanged.get(url) or (await self._extract_pages_from_json([url], products)).get(url)
+                if page_result is not None:
+                    await self.journal.record_page(page_result)
+            if page_result is None:
+                async with async_playwright() as p:
+                    with self.metrics.span('browser_launch'):
+                        browser = await self._launch_browser(p)
+                    
+                    try:
+                        self.logger.debug("Creating browser context...")
+                        context = await browser.new_context(**CONTEXT_OPTIONS)
+                        
+                        page = await context.new_page()
+                        self.logger.debug("New page created")
+                        
+                        self.network_interceptor.clear()
+                        with self.metrics.span('page', url=url):
+                            page_result = await self._extract_page(page, url, self.network_interceptor)
+                        await self.journal.record_page(page_result)
+                    finally:
+                        await browser.close()
+                        self.logger.debug("Browser closed")
+            
+            await self._download_and_save(url, [page_result],
+                                          extra_metadata={'extracted_from': page_result.get('source', 'browser')})
         except Exception as e:
             self.logger.error(f"Error during scraping: {e}", exc_info=True)
             raise
+        finally:
+            await self.journal.close()
+            await self._write_metrics()
+    
+    async def scrape_many(self, urls: Optional[List[str]] = None, sitemap_url: Optional[str] = None,
+                          max_concurrent_pages: int = 4, sitemap_filter: Optional[str] = None) -> Dict:
+        """Crawl many pages with one shared browser and a bounded pool of contexts
+        
+        Pages are extracted concurrently (up to max_concurrent_pages at a time);
+        a failing page is recorded and skipped without aborting the run. Images
+        from all pages are deduplicated, downloaded once and written to a single
+        consolidated metadata.json.
+        
+        Args:
+            urls: Page URLs to scrape
+            sitemap_url: Sitemap (or sitemap index) to read additional page URLs from
+            max_concurrent_pages: Number of pages loaded at the same time
+            sitemap_filter: Only take sitemap URLs containing this substring
+        """
+        page_urls = list(urls or [])
+        if sitemap_url:
+            self.logger.progress(f"Reading sitemap: {sitemap_url}")
+            page_urls += await SitemapReader().fetch_urls(sitemap_url, contains=sitemap_filter)
+        # Drop duplicates, keep order
+        page_urls = list(dict.fromkeys(page_urls))
+        
+        self.logger.info("=" * 60)
+        self.logger.info(f"Starting crawl of {len(page_urls)} pages ({max_concurrent_pages} concurrent)")
+        self.logger.info("=" * 60)
+        
+        if not page_urls:
+            raise ValueError("No URLs to scrape")
+        
+        page_reports: List[Dict] = []
+        page_results: List[Dict] = []
+        
+        def report_page(result: Dict, resumed: bool = False):
+            page_results.append(result)
+            page_reports.append({
+                'url': result['url'],
+                'status': 'ok',
+                'resumed': resumed,
+                'source': result.get('source', 'browser'),
+                'total_images_found': result['total_images_found'],
+                'relevant_images': len(result['relevant_images']),
+                'wait_ms': round(sum(t['elapsed_ms'] for t in result['wait_timings']), 1),
+                'scroll_steps': result['scroll']['steps'] if result['scroll'] else 0
+            })
+        
+        async def scrape_one(pool: BrowserContextPool, index: int, url: str):
+            # Any failure (journaling included) stays with this page; the rest of the crawl continues
+            try:
+                async with pool.page() as page:
+                    self.logger.progress(f"[{index + 1}/{len(page_urls)}] {url}")
+                    with self.metrics.span('page', url=url):
+                        result = await self._extract_page(page, url, NetworkInterceptor(self.body_store))
+                await self.journal.record_page(result)
+            except Exception as e:
+                self.logger.error(f"Failed to scrape {url}: {e}")
+                page_reports.append({'url': url, 'status': 'failed', 'error': str(e)})
+                return
+            
+            report_page(result)
+        
+        self._start_metrics()
+        try:
+            await self.journal.open(self.resume)
+            self.fingerprints.load()
+            # Pages extracted by the run being resumed are not loaded again
+            pending = []
+            for idx, url in enumerate(page_urls):
+                result = self.journal.completed_page(url)
+                if result is not None:
+                    report_page(result, resumed=True)
+                else:
+                    pending.append((idx, url))
+            resumed_pages = len(page_results)
+            if resumed_pages:
+                self.logger.info(f"Resuming: {resumed_pages} pages already extracted, {len(pending)} to go")
+            
+            # Delta runs: pages whose product JSON is unchanged keep their previous result
+            unchanged, products = await self._check_fingerprints([url for _idx, url in pending])
+            for url, result in unchanged.items():
+                await self.journal.record_page(result)
+                report_page(result)
+            pending = [(idx, url) for idx, url in pending if url not in unchanged]
+            
+            # Product pages with readable product JSON skip the browser
+            json_results = await self._extract_pages_from_json([url for _idx, url in pending], products)
+            for url, result in json_results.items():
+                await self.journal.record_page(result)
+                report_page(result)
+            pending = [(idx, url) for idx, url in pending if url not in json_results]
+            if json_results:
+                self.logger.info(f"Read {len(json_results)} pages from product JSON, "
+                                 f"{len(pending)} left for the browser")
+            
+            if pending:
+                async with async_playwright() as p:
+                    with self.metrics.span('browser_launch'):
+                        browser = await self._launch_browser(p)
+                    try:
+                        async with BrowserContextPool(browser, max_concurrent_pages, CONTEXT_OPTIONS) as pool:
+                            await asyncio.gather(*(
+                                scrape_one(pool, idx, url) for idx, url in pending
+                            ))
+                    finally:
+                        await browser.close()
+                        self.logger.debug("Browser closed")
+            
+            failed = [r for r in page_reports if r['status'] != 'ok']
+            self.logger.info(f"Extracted {len(page_results)}/{len(page_urls)} pages ({len(failed)} failed)")
+            
+            # Keep report order stable regardless of completion order
+            order = {url: idx for idx, url in enumerate(page_urls)}
+            page_reports.sort(key=lambda r: order[r['url']])
+            page_results.sort(key=lambda r: order[r['url']])
+            
+            return await self._download_and_save(
+                sitemap_url or page_urls[0],
+                page_results,
+                extra_metadata={
+                    'source_urls': page_urls,
+                    'pages_scraped': len(page_results),
+                    'pages_failed': len(failed),
+                    'pages_resumed': resumed_pages,
+                    'pages_from_product_json': len(json_results),
+                    'pages_from_previous_run': len(unchanged),
+                    'pages': page_reports
+                },
+                failed_urls=[r['url'] for r in failed],
+                crawl=PageFingerprints.crawl_key(sitemap_url, sitemap_filter, urls or [])
+            )
+        except Exception as e:
+            self.logger.error(f"Error during crawl: {e}", exc_info=True)
+            raise
+        finally:
+            await self.journal.close()
+            await self._write_metrics()
 
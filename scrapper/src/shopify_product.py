@@ -0,0 +1,140 @@
+"""
+Shopify product JSON fast path: images and brand/model info without a browser
+"""
+
+import json
+import re
+from html import unescape
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+import aiohttp
+from .brand_model_extractor import parse_product_json
+from .image_downloader import CONNECTOR_DEFAULTS
+from .image_index import ImageIndex
+from .url_optimizer import URLOptimizer
+from .logger import get_logger
+
+
+# /products/<handle>, optionally under a locale or collection prefix and with a .js/.json/.html suffix
+PRODUCT_PATH_PATTERN = re.compile(r'^(.*?)(?:/collections/[^/]+)?/products/([^/.]+)(?:\.(?:js|json|html?))?/?$')
+
+# <img> tags in the product description (body_html)
+DESCRIPTION_IMG_PATTERN = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+IMG_ATTR_PATTERN = re.compile(r'\b(src|alt)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.IGNORECASE)
+
+
+def product_json_urls(page_url: str) -> List[str]:
+    """The product's .js and .json endpoints, or [] when the URL is not a product page"""
+    parts = urlsplit(page_url)
+    match = PRODUCT_PATH_PATTERN.match(parts.path)
+    if not match:
+        return []
+    path = f"{match.group(1)}/products/{match.group(2)}"
+    return [urlunsplit((parts.scheme, parts.netloc, f"{path}{suffix}", '', '')) for suffix in ('.js', '.json')]
+
+
+def _image_entries(product: Dict) -> Iterator[Tuple[str, str]]:
+    """(src, alt) of every image the product JSON references, in gallery order"""
+    for media in product.get('media') or []:
+        if not isinstance(media, dict):
+            continue
+        # Videos and 3D models only contribute their preview image
+        source = media if media.get('media_type', 'image') == 'image' else media.get('preview_image') or {}
+        if source.get('src'):
+            yield source['src'], media.get('alt') or ''
+    # product.js lists image URLs, product.json image objects
+    for image in product.get('images') or []:
+        if isinstance(image, dict):
+            if image.get('src'):
+                yield image['src'], image.get('alt') or ''
+        elif image:
+            yield image, ''
+    featured = product.get('featured_image') or product.get('image')
+    if isinstance(featured, dict):
+        featured = featured.get('src')
+    if featured:
+        yield featured, ''
+    for variant in product.get('variants') or []:
+        image = variant.get('featured_image') if isinstance(variant, dict) else None
+        if isinstance(image, dict) and image.get('src'):
+            yield image['src'], image.get('alt') or variant.get('title') or ''
+    for tag in DESCRIPTION_IMG_PATTERN.findall(product.get('body_html') or product.get('description') or ''):
+        attrs = {name.lower(): unescape(double or single) for name, double, single in IMG_ATTR_PATTERN.findall(tag)}
+        if attrs.get('src'):
+            yield attrs['src'], attrs.get('alt', '')
+
+
+class ShopifyProductFetcher:
+    """Reads product pages from Shopify's product JSON over one pooled HTTP session
+    
+    Use as an async context manager; the session (and its keep-alive
+    connections) is shared by every fetch inside the block.
+    """
+    
+    def __init__(self, user_agent: Optional[str] = None, timeout: float = 15.0,
+                 connector_options: Optional[Dict] = None):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.connector_options = {**CONNECTOR_DEFAULTS, **(connector_options or {})}
+        self.url_optimizer = URLOptimizer()
+        self.logger = get_logger("ShopifyProductFetcher")
+        self.session: Optional[aiohttp.ClientSession] = None
+    
+    async def __aenter__(self) -> 'ShopifyProductFetcher':
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(**self.connector_options),
+            headers={'User-Agent': self.user_agent} if self.user_agent else None,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+    
+    async def fetch_product(self, page_url: str) -> Optional[Dict]:
+        """Product JSON for a product page URL, or None when the store doesn't serve it"""
+        for json_url in product_json_urls(page_url):
+            try:
+                async with self.session.get(json_url, headers={'Accept': 'application/json'}) as response:
+                    if response.status != 200:
+                        self.logger.debug("HTTP %d for %s", response.status, json_url)
+                        continue
+                    data = json.loads(await response.text())
+            except Exception as e:
+                self.logger.debug("No product JSON at %s: %s", json_url, e)
+                continue
+            product = data.get('product', data) if isinstance(data, dict) else None
+            if isinstance(product, dict) and isinstance(product.get('variants'), list):
+                return product
+        return None
+    
+    def extract_images(self, product: Dict, page_url: str) -> List[Dict]:
+        """Image records shaped like ImageExtractor's, deduplicated by canonical URL"""
+        images = ImageIndex()
+        title = product.get('title') or ''
+        for src, alt in _image_entries(product):
+            image_url = urljoin(page_url, src)
+            images.add({
+                'url': self.url_optimizer.get_high_res_url(image_url),
+                'original_url': image_url,
+                # Storefront themes use the product title when an image has no alt text
+                'alt': alt or title,
+                'title': '',
+                'type': 'product_json'
+            })
+        return images.images()
+    
+    async def extract(self, page_url: str) -> Optional[Tuple[List[Dict], Dict]]:
+        """(image records, brands/models) of a product page, or None to fall back to the browser"""
+        product = await self.fetch_product(page_url)
+        if product is None:
+            return None
+        return self.extract_product(product, page_url)
+    
+    def extract_product(self, product: Dict, page_url: str) -> Optional[Tuple[List[Dict], Dict]]:
+        """(image records, brands/models) of already fetched product JSON, or None if it has no images"""
+        images = self.extract_images(product, page_url)
+        if not images:
+            return None
+        return images, parse_product_json(product)
@@ -0,0 +1,84 @@
+"""
+Sitemap reader for building crawl URL lists
+"""
+
+import gzip
+import xml.etree.ElementTree as ET
+from typing import List, Optional, Set
+import aiohttp
+from .logger import get_logger
+
+
+class SitemapReader:
+    """Collects page URLs from a sitemap, following nested sitemap indexes"""
+    
+    def __init__(self, max_depth: int = 3):
+        self.max_depth = max_depth
+        self.logger = get_logger("SitemapReader")
+    
+    @staticmethod
+    def _local_name(tag: str) -> str:
+        """Strip the XML namespace from a tag name"""
+        return tag.rsplit('}', 1)[-1]
+    
+    async def _fetch_xml(self, session: aiohttp.ClientSession, url: str) -> Optional[ET.Element]:
+        """Download and parse one sitemap document"""
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                if response.status != 200:
+                    self.logger.warning(f"HTTP {response.status} for sitemap {url}")
+                    return None
+                body = await response.read()
+        except Exception as e:
+            self.logger.warning(f"Error fetching sitemap {url}: {e}")
+            return None
+        
+        if body[:2] == b'\x1f\x8b':
+            body = gzip.decompress(body)
+        try:
+            return ET.fromstring(body)
+        except ET.ParseError as e:
+            self.logger.warning(f"Invalid sitemap XML at {url}: {e}")
+            return None
+    
+    async def fetch_urls(self, sitemap_url: str, contains: Optional[str] = None,
+                         limit: Optional[int] = None) -> List[str]:
+        """Return page URLs listed in a sitemap (or sitemap index)
+
+        Args:
+            sitemap_url: URL of the sitemap or sitemap index
+            contains: Only keep page URLs containing this substring (e.g. '/products/')
+            limit: Maximum number of URLs to return
+        """
+        urls: List[str] = []
+        seen: Set[str] = set()
+        pending = [(sitemap_url, 0)]
+        visited: Set[str] = set()
+        
+        async with aiohttp.ClientSession() as session:
+            while pending:
+                url, depth = pending.pop(0)
+                if url in visited:
+                    continue
+                visited.add(url)
+                
+                root = await self._fetch_xml(session, url)
+                if root is None:
+                    continue
+                
+                is_index = self._local_name(root.tag) == 'sitemapindex'
+                for loc in root.iter():
+                    if self._local_name(loc.tag) != 'loc' or not loc.text:
+                        continue
+                    loc_url = loc.text.strip()
+                    if is_index:
+                        if depth < self.max_depth:
+                            pending.append((loc_url, depth + 1))
+                    elif loc_url not in seen and (contains is None or contains in loc_url):
+                        seen.add(loc_url)
+                        urls.append(loc_url)
+                        if limit and len(urls) >= limit:
+                            return urls
+        
+        self.logger.debug(f"Found {len(urls)} URLs in sitemap {sitemap_url}")
+        return urls
@@ -3,19 +3,32 @@ URL optimizer for extracting highest quality image URLs
 """
 
 import re
+from functools import lru_cache
+from typing import Dict, List, Optional
 
 
-class URLOptimizer:
-    """Handles URL optimization to get highest quality images"""
-    
-    @staticmethod
-    def get_high_res_url(url: str) -> str:
-        """Modify URL to get highest quality version"""
+# Rewrite rule sets, applied in order. Each set:
+#   markers: substrings that must appear in the URL for the set to apply (empty = every URL)
+#   ignore_case: match the rule patterns case-insensitively
+#   rules: (pattern, replacement) pairs, applied one after another
+#   strip_trailing / append_query: after the rules, strip these trailing characters
+#       and append these query parameters
+URL_RULE_SETS: List[Dict] = [
+    {
         # Remove size restrictions
-        url = re.sub(r'[?&](w|width|h|height|size|resize|scale)=\d+', '', url)
-        
+        'name': 'size_params',
+        'markers': [],
+        'ignore_case': False,
+        'rules': [
+            (r'[?&](w|width|h|height|size|resize|scale)=\d+', ''),
+        ],
+    },
+    {
         # Replace common thumbnail patterns with full-size
-        replacements = [
+        'name': 'thumbnails',
+        'markers': [],
+        'ignore_case': True,
+        'rules': [
             (r'_thumb', ''),
             (r'_small', ''),
             (r'_medium', ''),
@@ -24,27 +37,104 @@ class URLOptimizer:
             (r'thumb', 'original'),
             (r'w_\d+', 'w_2048'),  # Set high width
             (r'h_\d+', 'h_2048'),  # Set high height
-        ]
-        
-        for pattern, replacement in replacements:
-            url = re.sub(pattern, replacement, url, flags=re.IGNORECASE)
+        ],
+    },
+    {
+        # Shopify supports up to 4096px width
+        'name': 'shopify',
+        'markers': ['cdn.shopify.com', 'shopifycdn.com'],
+        'ignore_case': False,
+        'rules': [
+            (r'[?&]width=\d+', ''),
+            (r'[?&]height=\d+', ''),
+            (r'[?&]quality=\d+', ''),
+            (r'[?&]crop=\w+', ''),
+        ],
+        'strip_trailing': '?&',
+        'append_query': 'width=4096&quality=100&format=auto',
+    },
+    {
+        # Cloudinary: best quality in the transformation path (w_/h_ are handled above)
+        'name': 'cloudinary',
+        'markers': ['res.cloudinary.com'],
+        'ignore_case': False,
+        'rules': [
+            (r'\bq_\d+', 'q_100'),
+        ],
+    },
+    {
+        # imgix: drop quality/density parameters, then ask for full quality
+        'name': 'imgix',
+        'markers': ['.imgix.net'],
+        'ignore_case': False,
+        'rules': [
+            (r'[?&](q|dpr)=[\d.]+', ''),
+        ],
+        'strip_trailing': '?&',
+        'append_query': 'q=100',
+    },
+]
+
+# Number of rewritten URLs remembered (pages repeat the same URLs a lot)
+URL_CACHE_SIZE = 8192
+
+
+class RuleSet:
+    """A rule set from URL_RULE_SETS with its patterns compiled"""
+    
+    def __init__(self, spec: Dict):
+        self.name = spec['name']
+        self.markers = list(spec.get('markers', []))
+        flags = re.IGNORECASE if spec.get('ignore_case') else 0
+        self.rules = [(re.compile(pattern, flags), replacement) for pattern, replacement in spec['rules']]
+        # One scan over the URL with all patterns combined: if nothing matches,
+        # none of the rules can change the URL and they are all skipped
+        self.gate = re.compile('|'.join(f"(?:{pattern})" for pattern, _ in spec['rules']), flags)
+        self.strip_trailing = spec.get('strip_trailing')
+        self.append_query = spec.get('append_query')
+    
+    def apply(self, url: str) -> str:
+        """Rewrite a URL with this rule set (unchanged if its markers are absent)"""
+        if self.markers and not any(marker in url for marker in self.markers):
+            return url
         
-        # For Shopify/CDN images, try to get original
-        if 'cdn.shopify.com' in url or 'shopifycdn.com' in url or 'cdn.shopifycdn.com' in url:
-            # Remove existing size/quality parameters
-            url = re.sub(r'[?&]width=\d+', '', url)
-            url = re.sub(r'[?&]height=\d+', '', url)
-            url = re.sub(r'[?&]quality=\d+', '', url)
-            url = re.sub(r'[?&]crop=\w+', '', url)
-            
-            # Remove trailing ? or & if present
-            url = url.rstrip('?&')
-            
-            # Add high quality parameters (Shopify supports up to 4096px width)
-            if '?' in url:
-                url += '&width=4096&quality=100&format=auto'
-            else:
-                url += '?width=4096&quality=100&format=auto'
+        # Rules stay sequential: an earlier rewrite can create a match for a later rule
+        if self.gate.search(url):
+            for pattern, replacement in self.rules:
+                url = pattern.sub(replacement, url)
         
+        if self.strip_trailing:
+            url = url.rstrip(self.strip_trailing)
+        if self.append_query:
+            url += ('&' if '?' in url else '?') + self.append_query
         return url
 
+
+class URLRewriter:
+    """Applies a list of rule sets to URLs, memoizing results in a bounded LRU"""
+    
+    def __init__(self, rule_sets: Optional[List[Dict]] = None, cache_size: int = URL_CACHE_SIZE):
+        self.rule_sets = [RuleSet(spec) for spec in (rule_sets or URL_RULE_SETS)]
+        self.rewrite = lru_cache(maxsize=cache_size)(self._rewrite)
+    
+    def _rewrite(self, url: str) -> str:
+        for rule_set in self.rule_sets:
+            url = rule_set.apply(url)
+        return url
+
+
+_default_rewriter = URLRewriter()
+
+
+class URLOptimizer:
+    """Handles URL optimization to get highest quality images"""
+    
+    @staticmethod
+    def get_high_res_url(url: str) -> str:
+        """Modify URL to get highest quality version"""
+        return _default_rewriter.rewrite(url)
+    
+    @staticmethod
+    def cache_info():
+        """Hit/miss statistics of the rewrite cache"""
+        return _default_rewriter.rewrite.cache_info()